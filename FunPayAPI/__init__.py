@@ -3,3 +3,5 @@ from .updater.runner import Runner
 from .updater import events
 from .common import exceptions, utils, enums
 from . import types
+from .async_account import AsyncAccount
+from .updater.async_runner import AsyncRunner
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import html
-from typing import TYPE_CHECKING, Literal, Any, Optional, IO
+from typing import TYPE_CHECKING, Literal, Any, Optional, IO, Generator
 
 import FunPayAPI.common.enums
 from FunPayAPI.common.utils import parse_currency, RegularExpressions, strip_invisible_suffix
@@ -11,7 +11,8 @@ if TYPE_CHECKING:
     from .updater.runner import Runner
 
 from requests_toolbelt import MultipartEncoder
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
+from lxml import etree
 from datetime import datetime, timedelta
 import requests
 import logging
@@ -20,16 +21,90 @@ import string
 import json
 import time
 import re
+import threading
 
 from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, Future
 from urllib3.util.retry import Retry
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib.parse import urlparse
 from . import types
-from .common import exceptions, utils, enums
+from .common import exceptions, utils, enums, metrics
 
 logger = logging.getLogger("FunPayAPI.account")
+
+_shared_adapters: dict[tuple | None, HTTPAdapter] = {}
+"""Общие HTTP-адаптеры {прокси: адаптер}, см. :meth:`Account.get_shared_adapter`."""
+_shared_adapters_lock = threading.Lock()
 PRIVATE_CHAT_ID_RE = re.compile(r"users-\d+-\d+$")
 
 
+def _has_class(class_name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+_MSG_AUTHOR_DIV = etree.XPath(f"//div[{_has_class('media-user-name')}]")
+_MSG_SUCCESS_LABEL = etree.XPath(".//span[@class='chat-msg-author-label label label-success']")
+_MSG_DEFAULT_LABEL = etree.XPath(".//span[@class='chat-msg-author-label label label-default']")
+_MSG_IMAGE_LINK = etree.XPath(f"//a[{_has_class('chat-img-link')}]")
+_MSG_ALERT = etree.XPath("//div[@role='alert']")
+_MSG_TEXT = etree.XPath(f"//div[{_has_class('chat-msg-text')}]")
+_MSG_USERS_LINKS = etree.XPath("//a[contains(@href, '/users/')]")
+
+_SALES_ORDER_ROWS = etree.XPath(f"//a[{_has_class('tc-item')}]")
+_SALES_ORDER_ID = etree.XPath(f".//div[{_has_class('tc-order')}]")
+_SALES_USERNAME = etree.XPath(f"//div[{_has_class('user-link-name')}]")
+_SALES_HEADER = etree.XPath(f"//h1[{_has_class('page-header')} and {_has_class('page-header-no-hr')}]")
+_SALES_GAMES_OPTIONS = etree.XPath("//select[@name='game']/option[@value != '']")
+_SALES_CONTINUE_INPUT = re.compile(r'<input[^>]*name="continue"[^>]*>')
+_SALES_CONTINUE_VALUE = re.compile(r'value="([^"]*)"')
+
+
+def _text(element) -> str:
+    return "".join(element.itertext())
+
+
+def _parse_message_html(message_html: str) -> dict:
+    """
+    Достает из HTML сообщения все необходимые для :meth:`Account.__parse_messages` данные за один разбор.
+
+    :param message_html: HTML сообщения.
+    :type message_html: :obj:`str`
+
+    :return: словарь с данными сообщения.
+    :rtype: :obj:`dict`
+    """
+    root = etree.HTML(message_html.replace("<br>", "\n"))
+    result = {"author": None, "success_badge": None, "default_badge": None, "has_author_div": False,
+              "image_link": None, "image_name": None, "has_image": False, "alert": None, "text": None, "users": []}
+    if root is None:
+        return result
+
+    if author_div := _MSG_AUTHOR_DIV(root):
+        author_div = author_div[0]
+        result["has_author_div"] = True
+        if badge := _MSG_SUCCESS_LABEL(author_div):
+            result["success_badge"] = _text(badge[0])
+        if label := _MSG_DEFAULT_LABEL(author_div):
+            result["default_badge"] = _text(label[0])
+        if (author_link := author_div.find(".//a")) is not None:
+            result["author"] = _text(author_link).strip()
+
+    if image_tag := _MSG_IMAGE_LINK(root):
+        image_tag = image_tag[0]
+        result["has_image"] = True
+        result["image_link"] = image_tag.get("href")
+        if (image := image_tag.find(".//img")) is not None:
+            result["image_name"] = image.get("alt")
+
+    if alert := _MSG_ALERT(root):
+        result["alert"] = _text(alert[0])
+    if text := _MSG_TEXT(root):
+        result["text"] = _text(text[0])
+    result["users"] = [(_text(a), a.get("href")) for a in _MSG_USERS_LINKS(root)]
+    return result
+
+
 class Account:
     """
     Класс для управления аккаунтом FunPay.
@@ -48,11 +123,23 @@ class Account:
 
     :param locale: текущий язык аккаунта, опционально.
     :type locale: :obj:`Literal["ru", "en", "uk"]` or :obj:`None`
+
+    :param adapter: HTTP-адаптер (пул соединений), опционально. Позволяет нескольким аккаунтам в одном процессе
+        использовать общий пул соединений (куки у каждого аккаунта остаются своими).
+        Если не передан, создается новый адаптер (см. :meth:`FunPayAPI.account.Account.create_adapter`).
+        Общий адаптер для аккаунтов с одинаковым прокси: :meth:`FunPayAPI.account.Account.get_shared_adapter`.
+    :type adapter: :class:`requests.adapters.HTTPAdapter` or :obj:`None`
+
+    :param html_retention: что делать с HTML кодом, из которого получены объекты (лоты, заказы, чаты, сообщения,
+        профили): "keep" - хранить как есть, "drop" - не хранить (атрибут `html` будет `None`),
+        "compress" - хранить в сжатом виде (распаковывается при обращении к атрибуту `html`).
+    :type html_retention: :obj:`Literal["keep", "drop", "compress"]`, опционально
     """
 
     def __init__(self, golden_key: str, user_agent: str | None = None,
                  requests_timeout: int | float = 10, proxy: Optional[dict] = None,
-                 locale: Literal["ru", "en", "uk"] | None = None):
+                 locale: Literal["ru", "en", "uk"] | None = None, adapter: HTTPAdapter | None = None,
+                 html_retention: Literal["keep", "drop", "compress"] = "keep"):
         self.golden_key: str = golden_key
         """Токен (golden_key) аккаунта."""
         self.user_agent: str | None = user_agent
@@ -63,6 +150,8 @@ class Account:
         """Прокси"""
         self.html: str | None = None
         """HTML основной страницы FunPay."""
+        self.html_retention: Literal["keep", "drop", "compress"] = html_retention
+        """Политика хранения HTML кода в объектах FunPayAPI.types (см. :meth:`retain_html`)."""
         self.app_data: dict | None = None
         """Appdata."""
         self.id: int | None = None
@@ -75,6 +164,8 @@ class Account:
         """Активные покупки."""
         self.last_429_err_time: float = 0
         """Время последнего возникновения 429 ошибки"""
+        self.last_503_err_time: float = 0
+        """Время последнего возникновения 503 ошибки (в т.ч. после исчерпания повторных попыток)"""
         self.last_flood_err_time: float = 0
         """Время последнего возникновения ошибки \"Нельзя отправлять сообщения слишком часто.\""""
         self.last_multiuser_flood_err_time: float = 0
@@ -111,6 +202,20 @@ class Account:
         self.__initiated: bool = False
 
         self.__saved_chats: dict[int, types.ChatShortcut] = {}
+        self.__chats_directory: dict[int, list[str | None | float]] = {}
+        """Справочник известных чатов {ID: [название, время последнего обращения]} (от старых к новым)."""
+        self.__chats_by_name: dict[str, int] = {}
+        """Индекс {название чата: ID чата}."""
+        self.__chats_lock: threading.RLock = threading.RLock()
+        self.__sales_history: list[types.OrderShortcut] = []
+        """Кэш списка продаж (от новых к старым), см. :meth:`get_sales_history`."""
+        self.__sales_history_lock: threading.Lock = threading.Lock()
+        self.chats_lifetime: int | float = 30 * 24 * 60 * 60
+        """Время (в секундах), по истечении которого чат, к которому не обращались, забывается (0 - не забывать)."""
+        self.chats_limit: int = 20000
+        """Максимальное кол-во запоминаемых чатов (0 - без ограничений)."""
+        self.chats_directory_version: int = 0
+        """Номер версии справочника чатов (увеличивается при каждом добавлении / удалении чата)."""
         self.runner: Runner | None = None
         """Объект Runner'а."""
         self._logout_link: str | None = None
@@ -129,6 +234,36 @@ class Account:
         self.__old_bot_character = "⁤"
         """Старое значение self.__bot_character, для корректной маркировки отправки ботом старых сообщений"""
         self.session = requests.Session()
+        self.cookies = {}
+        self.adapter: HTTPAdapter = adapter or self.create_adapter()
+        """HTTP-адаптер (пул соединений) сессии."""
+        self.session.mount("https://", self.adapter)
+        self.__redirects: dict[tuple[str, str | None], str] = {}
+        """Кэш редиректов GET-запросов {(ссылка, язык аккаунта): ссылка редиректа}, см. :meth:`method`."""
+        self.redirects_cache_limit: int = 1000
+        """Максимальное кол-во запоминаемых редиректов."""
+        self.__endpoint_stats: dict[str, list[int | float]] = {}
+        """Статистика запросов {эндпоинт: [кол-во, кол-во ошибок, суммарное время, максимальное время]}."""
+        self.__endpoint_stats_lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def create_adapter(pool_maxsize: int = 10, pool_connections: int = 4) -> HTTPAdapter:
+        """
+        Создает HTTP-адаптер со стандартной стратегией повторных запросов.
+
+        pool_maxsize стоит выбирать не меньше кол-ва потоков, одновременно отправляющих запросы к FunPay:
+        соединения сверх этого кол-ва после запроса закрываются, и следующий запрос заново устанавливает
+        TCP + TLS соединение (см. :meth:`FunPayAPI.account.Account.get_connection_stats`).
+
+        :param pool_maxsize: максимальное кол-во соединений в пуле для одного хоста.
+        :type pool_maxsize: :obj:`int`, опционально
+
+        :param pool_connections: кол-во хостов (пулов соединений), которые хранятся одновременно.
+        :type pool_connections: :obj:`int`, опционально
+
+        :return: HTTP-адаптер.
+        :rtype: :class:`requests.adapters.HTTPAdapter`
+        """
         retry_strategy = Retry(
             total=6,
             connect=6,
@@ -139,9 +274,102 @@ class Account:
             status_forcelist=[500, 502, 503, 504],
             allowed_methods={"GET", "POST"}
         )
-        self.cookies = {}
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("https://", adapter)
+        return HTTPAdapter(max_retries=retry_strategy, pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+    @staticmethod
+    def get_shared_adapter(proxy: dict | None = None, pool_maxsize: int = 10) -> HTTPAdapter:
+        """
+        Возвращает HTTP-адаптер, общий для всех аккаунтов процесса с одинаковым прокси (создает при первом
+        обращении). Аккаунты, созданные с таким адаптером, используют общий пул соединений.
+
+        :param proxy: прокси аккаунта.
+        :type proxy: :obj:`dict` {:obj:`str`: :obj:`str`} or :obj:`None`, опционально
+
+        :param pool_maxsize: максимальное кол-во соединений в пуле для одного хоста (учитывается только при
+            создании адаптера).
+        :type pool_maxsize: :obj:`int`, опционально
+
+        :return: HTTP-адаптер.
+        :rtype: :class:`requests.adapters.HTTPAdapter`
+        """
+        key = tuple(sorted(proxy.items())) if proxy else None
+        with _shared_adapters_lock:
+            if key not in _shared_adapters:
+                _shared_adapters[key] = Account.create_adapter(pool_maxsize)
+            return _shared_adapters[key]
+
+    def get_connection_stats(self) -> dict:
+        """
+        Возвращает статистику пула соединений адаптера (для проверки, что соединения переиспользуются (keep-alive)).
+
+        :return: словарь {"connections": кол-во установленных соединений, "requests": кол-во отправленных запросов,
+            "idle": кол-во свободных соединений в пулах, "requests_per_connection": запросов на одно соединение}.
+        :rtype: :obj:`dict`
+        """
+        managers = [self.adapter.poolmanager] + list(self.adapter.proxy_manager.values())
+        connections, requests_, idle = 0, 0, 0
+        for manager in managers:
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is None:
+                    continue
+                connections += pool.num_connections
+                requests_ += pool.num_requests
+                idle += len([i for i in list(pool.pool.queue) if i is not None]) if pool.pool else 0
+        return {"connections": connections, "requests": requests_, "idle": idle,
+                "requests_per_connection": round(requests_ / connections, 2) if connections else 0}
+
+    def get_endpoint_stats(self) -> dict[str, dict]:
+        """
+        Возвращает статистику запросов :meth:`method` по эндпоинтам
+        (см. :func:`FunPayAPI.common.metrics.endpoint_label`).
+
+        :return: словарь {эндпоинт: {"requests": кол-во вызовов, "errors": кол-во ошибок и ответов с кодом != 2xx / 3xx,
+            "avg": среднее время (сек.), "max": максимальное время (сек.)}}.
+        :rtype: :obj:`dict`
+        """
+        with self.__endpoint_stats_lock:
+            return {k: {"requests": v[0], "errors": v[1], "avg": round(v[2] / v[0], 4) if v[0] else 0,
+                        "max": round(v[3], 4)} for k, v in self.__endpoint_stats.items()}
+
+    def __record_endpoint(self, request_method: str, endpoint: str, duration: float, ok: bool):
+        metrics.REQUEST_DURATION.observe(request_method, endpoint, value=duration)
+        with self.__endpoint_stats_lock:
+            stats = self.__endpoint_stats.get(endpoint)
+            if stats is None:
+                stats = self.__endpoint_stats[endpoint] = [0, 0, 0, 0]
+            stats[0] += 1
+            stats[1] += not ok
+            stats[2] += duration
+            stats[3] = max(stats[3], duration)
+
+    @staticmethod
+    def __canonical_url(url: str) -> tuple[str, str, str]:
+        parsed = urlparse(url)
+        path = parsed.path.lstrip("/")
+        for locale in ("en/", "uk/"):
+            if path.startswith(locale):
+                path = path[len(locale):]
+                break
+        return parsed.netloc, path.rstrip("/"), parsed.query
+
+    def retain_html(self, html: str | Tag | None) -> str | types.CompressedHTML | None:
+        """
+        Подготавливает HTML код для сохранения в объекте FunPayAPI.types согласно :attr:`html_retention`.
+
+        :param html: HTML код или тег BeautifulSoup (сериализуется, только если HTML нужно сохранить).
+        :type html: :obj:`str` or :class:`bs4.Tag` or :obj:`None`
+
+        :return: HTML код, сжатый HTML код или None.
+        :rtype: :obj:`str` or :class:`FunPayAPI.types.CompressedHTML` or :obj:`None`
+        """
+        if html is None or self.html_retention == "drop":
+            return None
+        if not isinstance(html, str):
+            html = str(html)
+        if self.html_retention == "compress":
+            return types.CompressedHTML(html)
+        return html
 
     def __update_cookies(self, response: requests.Response) -> None:
         cookies = response.cookies.get_dict()
@@ -151,6 +379,19 @@ class Account:
             self.cookies[k] = v
 
 
+    @staticmethod
+    def __is_retry_status(error: requests.exceptions.RetryError, status_code: int) -> bool:
+        """
+        Проверяет, исчерпаны ли повторы запроса из-за ответов с указанным статус кодом (а не, например, из-за
+        кода в URL запроса, который тоже есть в тексте исключения).
+
+        :param error: исключение.
+        :param status_code: статус код.
+        """
+        reason = error.args[0].reason if error.args and isinstance(error.args[0], MaxRetryError) else None
+        return isinstance(reason, ResponseError) and \
+            str(reason) == ResponseError.SPECIFIC_ERROR.format(status_code=status_code)
+
     def method(self, request_method: Literal["post", "get"], api_method: str, headers: dict, payload: Any,
                exclude_phpsessid: bool = False, raise_not_200: bool = False,
                locale: Literal["ru", "en", "uk"] | None = None) -> requests.Response:
@@ -215,14 +456,36 @@ class Account:
                   "timeout": self.requests_timeout,
                   "proxies": self.proxy or {},
                   "cookies": cookies}
+        endpoint = metrics.endpoint_label(link)
+        start = time.perf_counter()
+        # GET-редиректы, которые ведут на ту же страницу (другой языковой префикс / завершающий "/"), запоминаются,
+        # чтобы не тратить на них лишний запрос. Запросы с setlocale не кэшируются: они меняют язык аккаунта.
+        redirect_key = (link, self.__locale) if request_method == "get" and "setlocale=" not in link else None
+        if redirect_key and (cached_link := self.__redirects.get(redirect_key)):
+            link = cached_link
+            update_locale(link)  # как при обычном редиректе
         i = 0
         response = None
         while i < 10 or response.status_code == 429:
             i += 1
-            response = self.session.request(url=link, data=payload, allow_redirects=False, **kwargs)
+            try:
+                response = self.session.request(url=link, data=payload, allow_redirects=False, **kwargs)
+            except requests.exceptions.RetryError as e:
+                if self.__is_retry_status(e, 503):
+                    self.last_503_err_time = time.time()
+                    metrics.THROTTLED.inc("503")
+                metrics.REQUESTS.inc(request_method, endpoint, "error")
+                self.__record_endpoint(request_method, endpoint, time.perf_counter() - start, False)
+                raise
+            except:
+                metrics.REQUESTS.inc(request_method, endpoint, "error")
+                self.__record_endpoint(request_method, endpoint, time.perf_counter() - start, False)
+                raise
+            metrics.REQUESTS.inc(request_method, endpoint, response.status_code)
             self.__update_cookies(response)
             if response.status_code == 429:
                 self.last_429_err_time = time.time()
+                metrics.THROTTLED.inc("429")
                 wait = min(2 ** i, 30)
                 logger.warning(f"Получен код $YELLOW429 (Too Many Requests)$RESET от FunPay "
                                f"($YELLOW{link}$RESET). Попытка $YELLOW{i}$RESET, жду $YELLOW{wait}$RESET сек.")
@@ -236,8 +499,20 @@ class Account:
             update_locale(link)
         else:
             response = self.session.request(url=link, data=payload, allow_redirects=True, **kwargs)
+            metrics.REQUESTS.inc(request_method, endpoint, response.status_code)
             self.__update_cookies(response)
 
+        self.__record_endpoint(request_method, endpoint, time.perf_counter() - start, response.status_code < 400)
+        if (redirect_key and link != redirect_key[0] and response.status_code == 200 and
+                self.__canonical_url(link) == self.__canonical_url(redirect_key[0])):
+            if len(self.__redirects) >= self.redirects_cache_limit:
+                self.__redirects.clear()
+            self.__redirects[redirect_key] = link
+        elif redirect_key and response.status_code != 200:
+            self.__redirects.pop(redirect_key, None)
+        if response.status_code == 503:
+            self.last_503_err_time = time.time()
+            metrics.THROTTLED.inc("503")
         if response.status_code == 403:
             raise exceptions.UnauthorizedError(response)
         elif response.status_code != 200 and raise_not_200:
@@ -489,7 +764,7 @@ class Account:
 
             lot_obj = types.LotShortcut(offer_id, server, side, description, amount, price, currency, subcategory_obj,
                                         seller,
-                                        auto, promo, attributes, str(offer))
+                                        auto, promo, attributes, self.retain_html(offer))
             result.append(lot_obj)
         return result
 
@@ -545,7 +820,7 @@ class Account:
             amount = int(amount) if amount and amount.isdigit() else None
             active = "warning" not in offer.get("class", [])
             lot_obj = types.MyLotShortcut(offer_id, server, side, description, amount, price, currency, subcategory_obj,
-                                          auto, active, str(offer))
+                                          auto, active, self.retain_html(offer))
             result.append(lot_obj)
         return result
 
@@ -899,7 +1174,7 @@ class Account:
             </div>
             """
             message_obj = types.Message(0, message_text, chat_id, chat_name, interlocutor_id, self.username, self.id,
-                                        fake_html, None,
+                                        self.retain_html(fake_html), None,
                                         None)
         else:
             tag = obj["tag"]
@@ -925,7 +1200,7 @@ class Account:
                 raise e
             message_obj = types.Message(int(mes["id"]), message_text, chat_id, chat_name, interlocutor_id,
                                         self.username, self.id,
-                                        mes["html"], image_link, image_name, tag=tag)
+                                        self.retain_html(mes["html"]), image_link, image_name, tag=tag)
         if self.runner and is_private_chat and isinstance(chat_id, int):
             if add_to_ignore_list and message_obj.id:
                 self.runner.mark_as_by_bot(chat_id, message_obj.id)
@@ -1254,7 +1529,7 @@ class Account:
         avatar_link = avatar_link if avatar_link.startswith("https") else f"https://funpay.com{avatar_link}"
         banned = bool(parser.find("span", {"class": "label label-danger"}))
         user_obj = types.UserProfile(user_id, username, avatar_link, "Онлайн" in user_status or "Online" in user_status,
-                                     banned, html_response)
+                                     banned, self.retain_html(html_response))
 
         subcategories_divs = parser.find_all("div", {"class": "offer-list-title-container"})
 
@@ -1296,7 +1571,7 @@ class Account:
                 lot_obj = types.LotShortcut(offer_id, server, side, description, amount, price, currency,
                                             subcategory_obj,
                                             None, auto,
-                                            None, None, str(j))
+                                            None, None, self.retain_html(j))
                 user_obj.add_lot(lot_obj)
         return user_obj
 
@@ -1339,7 +1614,7 @@ class Account:
             history = self.get_chats_histories({chat_id: name}).get(chat_id, [])
         else:
             history = []
-        return types.Chat(chat_id, name, link, text, html_response, history)
+        return types.Chat(chat_id, name, link, text, self.retain_html(html_response), history)
 
     def get_order_shortcut(self, order_id: str) -> types.OrderShortcut:
         """
@@ -1485,18 +1760,38 @@ class Account:
         filters = {name: filters[name] for name in filters if filters[name]}
         filters.update(more_filters)
 
+        locale = locale or self.__profile_parse_locale
+        response = self.__request_sales_page(filters, start_from, locale)
+        return self.__parse_sales_page(response, start_from, include_paid, include_closed, include_refunded,
+                                       exclude_ids, locale, subcategories)
+
+    def __request_sales_page(self, filters: dict, start_from: str | None,
+                             locale: Literal["ru", "en", "uk"] | None) -> requests.Response:
+        """
+        Запрашивает страницу списка заказов https://funpay.com/orders/trade (см. :meth:`get_sales`).
+        """
         link = "https://funpay.com/orders/trade?"
         for name in filters:
             link += f"{name}={filters[name]}&"
         link = link[:-1]
 
+        payload = dict(filters)
         if start_from:
-            filters["continue"] = start_from
+            payload["continue"] = start_from
 
-        locale = locale or self.__profile_parse_locale
-        response = self.method("post" if start_from else "get", link, {}, filters, raise_not_200=True, locale=locale)
+        response = self.method("post" if start_from else "get", link, {}, payload, raise_not_200=True, locale=locale)
         if not start_from:
             self.locale = self.__default_locale
+        return response
+
+    def __parse_sales_page(self, response: requests.Response, start_from: str | None, include_paid: bool,
+                           include_closed: bool, include_refunded: bool, exclude_ids: list[str],
+                           locale: Literal["ru", "en", "uk"] | None,
+                           subcategories: dict[str, types.SubCategory] | None) -> \
+            tuple[str | None, list[types.OrderShortcut], Literal["ru", "en", "uk"], dict[str, types.SubCategory]]:
+        """
+        Парсит страницу списка заказов https://funpay.com/orders/trade (см. :meth:`get_sales`).
+        """
         html_response = response.content.decode()
 
         parser = BeautifulSoup(html_response, "lxml")
@@ -1515,21 +1810,13 @@ class Account:
 
         order_divs = parser.find_all("a", {"class": "tc-item"})
         if not start_from:
-            subcategories = dict()
             app_data = json.loads(parser.find("body").get("data-app-data"))
             locale = app_data.get("locale")
             self.csrf_token = app_data.get("csrf-token") or self.csrf_token
             games_options = parser.find("select", attrs={"name": "game"})
             if games_options:
                 games_options = games_options.find_all(lambda x: x.name == "option" and x.get("value"))
-                for game_option in games_options:
-                    game_name = game_option.text
-                    sections_list = json.loads(game_option.get("data-data"))
-                    for key, section_name in sections_list:
-                        section_type, section_id = key.split("-")
-                        section_type = types.SubCategoryTypes.COMMON if section_type == "lot" else types.SubCategoryTypes.CURRENCY
-                        section_id = int(section_id)
-                        subcategories[f"{game_name}, {section_name}"] = self.get_subcategory(section_type, section_id)
+                subcategories = self.__parse_sales_subcategories([(i.text, i.get("data-data")) for i in games_options])
             else:
                 subcategories = None
         if not order_divs:
@@ -1554,31 +1841,222 @@ class Account:
             order_id = div.find("div", {"class": "tc-order"}).text[1:]
             if order_id in exclude_ids:
                 continue
-
-            description = div.find("div", {"class": "order-desc"}).find("div").text
-            tc_price = div.find("div", {"class": "tc-price"}).text
-            price, currency = tc_price.rsplit(maxsplit=1)
-            price = float(price.replace(" ", ""))
-            currency = parse_currency(currency)
-
-            buyer_div = div.find("div", {"class": "media-user-name"}).find("span")
-            buyer_username = buyer_div.text
-            buyer_id = int(buyer_div.get("data-href")[:-1].split("/users/")[1])
-            subcategory_name = div.find("div", {"class": "text-muted"}).text
-            subcategory = None
-            if subcategories:
-                subcategory = subcategories.get(subcategory_name)
-
-            order_date_text = div.find("div", {"class": "tc-date-time"}).text
-            order_date = utils.parse_funpay_datetime(order_date_text)
-            id1, id2 = sorted([buyer_id, self.id])
-            chat_id = f"users-{id1}-{id2}"
-            order_obj = types.OrderShortcut(order_id, description, price, currency, buyer_username, buyer_id, chat_id,
-                                            order_status, order_date, subcategory_name, subcategory, str(div))
-            sales.append(order_obj)
+            sales.append(self.__parse_order_div(div, order_id, order_status, subcategories))
 
         return next_order_id, sales, locale, subcategories
 
+    def __parse_sales_subcategories(self, games_options: list[tuple[str, str]]) -> dict[str, types.SubCategory]:
+        """
+        Составляет словарь подкатегорий {"<игра>, <раздел>": подкатегория} из фильтра игр страницы продаж.
+
+        :param games_options: список пар (название игры, JSON разделов игры из атрибута data-data).
+        """
+        subcategories = dict()
+        for game_name, data in games_options:
+            sections_list = json.loads(data)
+            for key, section_name in sections_list:
+                section_type, section_id = key.split("-")
+                section_type = types.SubCategoryTypes.COMMON if section_type == "lot" else types.SubCategoryTypes.CURRENCY
+                section_id = int(section_id)
+                subcategories[f"{game_name}, {section_name}"] = self.get_subcategory(section_type, section_id)
+        return subcategories
+
+    def __parse_order_div(self, div: Tag, order_id: str, order_status: types.OrderStatuses,
+                          subcategories: dict[str, types.SubCategory] | None) -> types.OrderShortcut:
+        """
+        Парсит виджет заказа со страницы https://funpay.com/orders/trade.
+        """
+        description = div.find("div", {"class": "order-desc"}).find("div").text
+        tc_price = div.find("div", {"class": "tc-price"}).text
+        price, currency = tc_price.rsplit(maxsplit=1)
+        price = float(price.replace(" ", ""))
+        currency = parse_currency(currency)
+
+        buyer_div = div.find("div", {"class": "media-user-name"}).find("span")
+        buyer_username = buyer_div.text
+        buyer_id = int(buyer_div.get("data-href")[:-1].split("/users/")[1])
+        subcategory_name = div.find("div", {"class": "text-muted"}).text
+        subcategory = None
+        if subcategories:
+            subcategory = subcategories.get(subcategory_name)
+
+        order_date_text = div.find("div", {"class": "tc-date-time"}).text
+        order_date = utils.parse_funpay_datetime(order_date_text)
+        id1, id2 = sorted([buyer_id, self.id])
+        chat_id = f"users-{id1}-{id2}"
+        order_obj = types.OrderShortcut(order_id, description, price, currency, buyer_username, buyer_id, chat_id,
+                                        order_status, order_date, subcategory_name, subcategory,
+                                        self.retain_html(div))
+        return order_obj
+
+    def iter_sales(self, stop_at_id: str | None = None, since: datetime | None = None, max_pages: int | None = None,
+                   include_paid: bool = True, include_closed: bool = True, include_refunded: bool = True,
+                   exclude_ids: list[str] | None = None, locale: Literal["ru", "en", "uk"] | None = None,
+                   **filters) -> Generator[types.OrderShortcut, None, bool | None]:
+        """
+        Генератор заказов со страницы https://funpay.com/orders/trade (от новых к старым) по всем страницам списка.
+
+        Следующая страница запрашивается в фоновом потоке, пока парсится текущая (ID следующей страницы
+        находится в HTML без полного парсинга). Если генератор закрыт раньше времени, лишние страницы не запрашиваются.
+
+        :param stop_at_id: ID заказа, на котором нужно остановиться (сам заказ не возвращается).
+        :type stop_at_id: :obj:`str` or :obj:`None`, опционально
+
+        :param since: остановиться на первом заказе, созданном раньше этого времени.
+        :type since: :class:`datetime.datetime` or :obj:`None`, опционально
+
+        :param max_pages: максимальное кол-во запрашиваемых страниц.
+        :type max_pages: :obj:`int` or :obj:`None`, опционально
+
+        :param include_paid: см. :meth:`get_sales`.
+        :param include_closed: см. :meth:`get_sales`.
+        :param include_refunded: см. :meth:`get_sales`.
+        :param exclude_ids: см. :meth:`get_sales`.
+        :param locale: см. :meth:`get_sales`.
+        :param filters: фильтры (id, buyer, state, game, section, server, side и т.д., см. :meth:`get_sales`).
+
+        :return: генератор заказов (значение генератора (StopIteration.value) - True, если он остановился
+            на заказе stop_at_id).
+        :rtype: :obj:`Generator` of :class:`FunPayAPI.types.OrderShortcut`
+        """
+        if not self.is_initiated:
+            raise exceptions.AccountNotInitiatedError()
+
+        exclude_ids = exclude_ids or []
+        filters = {name: filters[name] for name in filters if filters[name]}
+        request_locale = locale or self.__profile_parse_locale
+        subcategories = None
+        start_from = None
+        pages = 0
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="funpay-sales")
+        try:
+            future: Future | None = executor.submit(self.__request_sales_page, filters, None, request_locale)
+            while future is not None:
+                response = future.result()
+                pages += 1
+                can_continue = max_pages is None or pages < max_pages
+                # если заказ для остановки уже на этой странице, следующую страницу заранее не запрашиваем
+                prefetch = can_continue and not (stop_at_id and f">#{stop_at_id}<" in response.text)
+
+                predicted_id = None
+                if prefetch and (tag := _SALES_CONTINUE_INPUT.search(response.text)):
+                    if value := _SALES_CONTINUE_VALUE.search(tag.group(0)):
+                        predicted_id = value.group(1)
+                        future = executor.submit(self.__request_sales_page, filters, predicted_id, request_locale)
+
+                next_order_id, orders, locale, page_subcategories = \
+                    self.__parse_sales_page(response, start_from, include_paid, include_closed, include_refunded,
+                                            exclude_ids, locale, subcategories)
+                subcategories = subcategories or page_subcategories
+                for order in orders:
+                    if order.id == stop_at_id:
+                        return True
+                    if since is not None and order.date < since:
+                        return
+                    yield order
+
+                if not next_order_id or not can_continue:
+                    return
+                if next_order_id != predicted_id:
+                    future = executor.submit(self.__request_sales_page, filters, next_order_id, request_locale)
+                start_from = next_order_id
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_sales_history(self, update: bool = True, since: datetime | None = None,
+                          max_pages: int | None = 10) -> list[types.OrderShortcut]:
+        """
+        Возвращает историю продаж (от новых к старым) из локального кэша.
+
+        При обновлении запрашиваются только страницы с заказами новее последнего сохраненного заказа, но не больше
+        max_pages страниц (при первом вызове - также не дальше since). Если последний сохраненный заказ не найден
+        за max_pages страниц, кэш заменяется новыми заказами (иначе в нем был бы пропуск). Статусы ранее сохраненных
+        заказов при этом не обновляются.
+
+        :param update: запросить ли новые заказы перед возвратом?
+        :type update: :obj:`bool`, опционально
+
+        :param since: вернуть только заказы, созданные не раньше этого времени.
+        :type since: :class:`datetime.datetime` or :obj:`None`, опционально
+
+        :param max_pages: максимальное кол-во запрашиваемых страниц (None - без ограничения).
+        :type max_pages: :obj:`int` or :obj:`None`, опционально
+
+        :return: список заказов.
+        :rtype: :obj:`list` of :class:`FunPayAPI.types.OrderShortcut`
+        """
+        with self.__sales_history_lock:
+            if update:
+                last_id = self.__sales_history[0].id if self.__sales_history else None
+                new_orders = []
+                sales = self.iter_sales(stop_at_id=last_id, since=since if last_id is None else None,
+                                        max_pages=max_pages)
+                while True:
+                    try:
+                        new_orders.append(next(sales))
+                    except StopIteration as e:
+                        reached = bool(e.value)
+                        break
+                if last_id is not None and not reached:
+                    self.__sales_history = new_orders
+                else:
+                    self.__sales_history[:0] = new_orders
+            if since is None:
+                return list(self.__sales_history)
+            return [i for i in self.__sales_history if i.date >= since]
+
+    def get_sales_updates(self, known_statuses: dict[str, types.OrderStatuses]) -> \
+            tuple[dict[str, types.OrderStatuses], list[types.OrderShortcut]]:
+        """
+        Получает первую страницу https://funpay.com/orders/trade и сравнивает ее с известными статусами заказов.
+
+        Для всех заказов страницы определяются только ID и статус (быстрый разбор lxml), а объекты
+        :class:`FunPayAPI.types.OrderShortcut` создаются только для новых заказов и заказов с изменившимся статусом.
+
+        :param known_statuses: известные статусы заказов {ID заказа: статус}.
+        :type known_statuses: :obj:`dict` {:obj:`str`: :class:`FunPayAPI.common.enums.OrderStatuses`}
+
+        :return: (статусы всех заказов страницы {ID заказа: статус}, новые / изменившиеся заказы).
+        :rtype: :obj:`tuple` (:obj:`dict` {:obj:`str`: :class:`FunPayAPI.common.enums.OrderStatuses`},
+            :obj:`list` of :class:`FunPayAPI.types.OrderShortcut`)
+        """
+        if not self.is_initiated:
+            raise exceptions.AccountNotInitiatedError()
+
+        response = self.__request_sales_page({}, None, self.__profile_parse_locale)
+        root = etree.HTML(response.content.decode())
+        if root is None or not _SALES_USERNAME(root):
+            raise exceptions.UnauthorizedError(response)
+        header = _SALES_HEADER(root)
+        if not header or _text(header[0]).strip().lower() not in ("мої продажі", "мои продажи", "my sales"):
+            raise exceptions.UnauthorizedError(response)
+        app_data = json.loads(root.find("body").get("data-app-data"))
+        self.csrf_token = app_data.get("csrf-token") or self.csrf_token
+
+        statuses = {}
+        changed_rows = []
+        for row in _SALES_ORDER_ROWS(root):
+            classname = row.get("class", "").split()
+            if "warning" in classname:
+                order_status = types.OrderStatuses.REFUNDED
+            elif "info" in classname:
+                order_status = types.OrderStatuses.PAID
+            else:
+                order_status = types.OrderStatuses.CLOSED
+            order_id = _text(_SALES_ORDER_ID(row)[0])[1:]
+            statuses[order_id] = order_status
+            if known_statuses.get(order_id) != order_status:
+                changed_rows.append((row, order_id, order_status))
+
+        orders = []
+        if changed_rows:
+            subcategories = self.__parse_sales_subcategories([(_text(i), i.get("data-data"))
+                                                              for i in _SALES_GAMES_OPTIONS(root)]) or None
+            for row, order_id, order_status in changed_rows:
+                div = BeautifulSoup(etree.tostring(row, encoding="unicode", with_tail=False), "lxml").find("a")
+                orders.append(self.__parse_order_div(div, order_id, order_status, subcategories))
+        return statuses, orders
+
     def get_sells(self, start_from: str | None = None, include_paid: bool = True, include_closed: bool = True,
                   include_refunded: bool = True, exclude_ids: list[str] | None = None,
                   id: Optional[str] = None, buyer: Optional[str] = None,
@@ -1598,8 +2076,83 @@ class Account:
         :param chats: объекты чатов.
         :type chats: :obj:`list` of :class:`FunPayAPI.types.ChatShortcut`
         """
-        for i in chats:
-            self.__saved_chats[i.id] = i
+        now = time.time()
+        with self.__chats_lock:
+            for i in chats:
+                self.__saved_chats[i.id] = i
+                self.__touch_chat(i.id, i.name, now)
+            self.__evict_chats(now)
+
+    def __touch_chat(self, chat_id: int, name: str | None = None, now: float | None = None):
+        """
+        Отмечает обращение к чату: переносит его в конец справочника и обновляет индекс названий.
+        Должен вызываться под self.__chats_lock.
+        """
+        old = self.__chats_directory.pop(chat_id, None)
+        old_name = old[0] if old else None
+        name = name or old_name
+        if old_name and old_name != name and self.__chats_by_name.get(old_name) == chat_id:
+            del self.__chats_by_name[old_name]
+        if name:
+            self.__chats_by_name[name] = chat_id
+        self.__chats_directory[chat_id] = [name, now or time.time()]
+        if old is None or old_name != name:
+            self.chats_directory_version += 1
+
+    def __evict_chats(self, now: float):
+        """
+        Забывает чаты, к которым не обращались дольше :attr:`chats_lifetime`, и самые старые чаты сверх
+        :attr:`chats_limit`. Должен вызываться под self.__chats_lock.
+        """
+        while self.__chats_directory:
+            chat_id, (name, touched) = next(iter(self.__chats_directory.items()))
+            if not (self.chats_lifetime and now - touched > self.chats_lifetime) and \
+                    not (self.chats_limit and len(self.__chats_directory) > self.chats_limit):
+                break
+            del self.__chats_directory[chat_id]
+            self.__saved_chats.pop(chat_id, None)
+            if name and self.__chats_by_name.get(name) == chat_id:
+                del self.__chats_by_name[name]
+            self.chats_directory_version += 1
+
+    def get_chats_directory(self) -> dict[int, list[str | None | float]]:
+        """
+        Возвращает копию справочника известных чатов (для сохранения на диск).
+
+        :return: справочник чатов {ID: [название, время последнего обращения]}.
+        :rtype: :obj:`dict` {:obj:`int`: [:obj:`str` or :obj:`None`, :obj:`float`]}
+        """
+        with self.__chats_lock:
+            return {k: list(v) for k, v in self.__chats_directory.items()}
+
+    def load_chats_directory(self, directory: dict[int, list[str | None | float]]):
+        """
+        Загружает справочник известных чатов (например, сохраненный перед перезапуском), чтобы не узнавать названия
+        чатов заново с помощью :meth:`request_chats`.
+
+        :param directory: справочник чатов {ID: [название, время последнего обращения]}.
+        :type directory: :obj:`dict` {:obj:`int`: [:obj:`str` or :obj:`None`, :obj:`float`]}
+        """
+        with self.__chats_lock:
+            for chat_id, (name, touched) in sorted(directory.items(), key=lambda x: x[1][1]):
+                if chat_id not in self.__chats_directory:
+                    self.__touch_chat(chat_id, name, touched)
+            self.__chats_directory = dict(sorted(self.__chats_directory.items(), key=lambda x: x[1][1]))
+            self.__evict_chats(time.time())
+
+    def __get_known_chat(self, chat_id: int) -> types.ChatShortcut | None:
+        """
+        Возвращает сохраненный чат или, если известно только его название (из справочника), его заглушку.
+        Отмечает обращение к чату. Должен вызываться под self.__chats_lock.
+        """
+        if chat_id not in self.__chats_directory:
+            return self.__saved_chats.get(chat_id)
+        self.__touch_chat(chat_id)
+        if chat := self.__saved_chats.get(chat_id):
+            return chat
+        if name := self.__chats_directory[chat_id][0]:
+            return types.ChatShortcut(chat_id, name, "", 0, 0, False, None, determine_msg_type=False)
+        return None
 
     def request_chats(self) -> list[types.ChatShortcut]:
         """
@@ -1646,7 +2199,8 @@ class Account:
 
             last_msg_text = strip_invisible_suffix(last_msg_text)
 
-            chat_obj = types.ChatShortcut(chat_id, chat_with, last_msg_text, node_msg_id, user_msg_id, unread, str(msg))
+            chat_obj = types.ChatShortcut(chat_id, chat_with, last_msg_text, node_msg_id, user_msg_id, unread,
+                                          self.retain_html(msg))
             if not is_image:
                 chat_obj.last_by_bot = by_bot
                 chat_obj.last_by_vertex = by_vertex
@@ -1673,7 +2227,7 @@ class Account:
 
     def get_chat_by_name(self, name: str, make_request: bool = False) -> types.ChatShortcut | None:
         """
-        Возвращает чат по его названию (если он сохранен).
+        Возвращает чат по его названию (если он сохранен или известен из справочника чатов).
 
         :param name: название чата.
         :type name: :obj:`str`
@@ -1687,9 +2241,10 @@ class Account:
         if not self.is_initiated:
             raise exceptions.AccountNotInitiatedError()
 
-        for i in self.__saved_chats:
-            if self.__saved_chats[i].name == name:
-                return self.__saved_chats[i]
+        with self.__chats_lock:
+            chat_id = self.__chats_by_name.get(name)
+            if chat_id is not None and (chat := self.__get_known_chat(chat_id)):
+                return chat
 
         if make_request:
             self.add_chats(self.request_chats())
@@ -1699,7 +2254,7 @@ class Account:
 
     def get_chat_by_id(self, chat_id: int, make_request: bool = False) -> types.ChatShortcut | None:
         """
-        Возвращает личный чат по его ID (если он сохранен).
+        Возвращает личный чат по его ID (если он сохранен или известен из справочника чатов).
 
         :param chat_id: ID чата.
         :type chat_id: :obj:`int`
@@ -1713,8 +2268,10 @@ class Account:
         if not self.is_initiated:
             raise exceptions.AccountNotInitiatedError()
 
-        if not make_request or chat_id in self.__saved_chats:
-            return self.__saved_chats.get(chat_id)
+        with self.__chats_lock:
+            chat = self.__get_known_chat(chat_id)
+        if chat or not make_request:
+            return chat
 
         self.add_chats(self.request_chats())
         return self.get_chat_by_id(chat_id)
@@ -2124,20 +2681,19 @@ class Account:
         if None not in (interlocutor_id, interlocutor_username):
             ids[interlocutor_id] = interlocutor_username
 
+        parsed = []
         for i in json_messages:
             if i["id"] < from_id:
                 continue
             author_id = i["author"]
-            parser = BeautifulSoup(i["html"].replace("<br>", "\n"), "lxml")
+            data = _parse_message_html(i["html"])
+            parsed.append(data)
 
             # Если ник или бейдж написавшего неизвестен, но есть блок с данными об авторе сообщения
-            if None in [ids.get(author_id), badges.get(author_id)] and (
-                    author_div := parser.find("div", {"class": "media-user-name"})):
+            if None in [ids.get(author_id), badges.get(author_id)] and data["has_author_div"]:
                 if badges.get(author_id) is None:
-                    badge = author_div.find("span", {"class": "chat-msg-author-label label label-success"})
-                    badges[author_id] = badge.text if badge else 0
-                if ids.get(author_id) is None:
-                    author = author_div.find("a").text.strip()
+                    badges[author_id] = data["success_badge"] if data["success_badge"] is not None else 0
+                if ids.get(author_id) is None and (author := data["author"]) is not None:
                     ids[author_id] = author
                     if mb_chat_is_private:
                         if author_id == interlocutor_id and not interlocutor_username:
@@ -2148,10 +2704,9 @@ class Account:
             by_bot = False
             by_vertex = False
             image_name = None
-            if mb_chat_is_private and (image_tag := parser.find("a", {"class": "chat-img-link"})):
-                image_name = image_tag.find("img")
-                image_name = image_name.get('alt') if image_name else None
-                image_link = image_tag.get("href")
+            if mb_chat_is_private and data["has_image"]:
+                image_name = data["image_name"]
+                image_link = data["image_link"]
                 message_text = None
                 # "Отправлено_с_помощью_бота_FunPay_Cardinal.png", "funpay_cardinal_image.png"
                 if isinstance(image_name, str) and "funpay_cardinal" in image_name.lower():
@@ -2162,9 +2717,9 @@ class Account:
             else:
                 image_link = None
                 if author_id == 0:
-                    message_text = parser.find("div", role="alert").text.strip()
+                    message_text = (data["alert"] or "").strip()
                 else:
-                    message_text = parser.find("div", {"class": "chat-msg-text"}).text
+                    message_text = data["text"] or ""
 
                 message_text = strip_invisible_suffix(message_text)
 
@@ -2177,7 +2732,7 @@ class Account:
                 #     by_vertex = True
 
             message_obj = types.Message(i["id"], message_text, chat_id, interlocutor_username, interlocutor_id,
-                                        None, author_id, i["html"], image_link, image_name,
+                                        None, author_id, self.retain_html(i["html"]), image_link, image_name,
                                         determine_msg_type=False,
                                         tag=tag)
             message_obj.by_bot = by_bot
@@ -2186,12 +2741,11 @@ class Account:
 
             messages.append(message_obj)
 
-        for i in messages:
+        for i, data in zip(messages, parsed):
             i.author = ids.get(i.author_id)
             i.chat_name = interlocutor_username
             i.interlocutor_id = interlocutor_id
             i.badge = badges.get(i.author_id) if badges.get(i.author_id) != 0 else None
-            parser = BeautifulSoup(i.html, "lxml")
             if i.badge:
                 i.is_employee = True
                 if i.badge in ("поддержка", "підтримка", "support"):
@@ -2200,18 +2754,16 @@ class Account:
                     i.is_moderation = True
                 elif i.badge in ("арбитраж", "арбітраж", "arbitration"):
                     i.is_arbitration = True
-            default_label = parser.find("div", {"class": "media-user-name"})
-            default_label = default_label.find("span", {
-                "class": "chat-msg-author-label label label-default"}) if default_label else None
-            if default_label:
-                if default_label.text in ("автовідповідь", "автоответ", "auto-reply"):
+            default_label = data["default_badge"]
+            if default_label is not None:
+                if default_label in ("автовідповідь", "автоответ", "auto-reply"):
                     i.is_autoreply = True
-            i.badge = default_label.text if (i.badge is None and default_label is not None) else i.badge
+            i.badge = default_label if (i.badge is None and default_label is not None) else i.badge
             if i.type != types.MessageTypes.NON_SYSTEM:
-                users = parser.find_all('a', href=lambda href: href and '/users/' in href)
+                users = data["users"]
                 if users:
-                    i.initiator_username = users[0].text
-                    i.initiator_id = int(users[0]["href"].split("/")[-2])
+                    i.initiator_username = users[0][0]
+                    i.initiator_id = int(users[0][1].split("/")[-2])
                     if i.type in (types.MessageTypes.ORDER_PURCHASED, types.MessageTypes.ORDER_CONFIRMED,
                                   types.MessageTypes.NEW_FEEDBACK,
                                   types.MessageTypes.FEEDBACK_CHANGED,
@@ -2231,7 +2783,7 @@ class Account:
                             i.i_am_seller = False
                             i.i_am_buyer = True
                     elif len(users) > 1:
-                        last_user_id = int(users[-1]["href"].split("/")[-2])
+                        last_user_id = int(users[-1][1].split("/")[-2])
                         if i.type == types.MessageTypes.ORDER_CONFIRMED_BY_ADMIN:
                             if last_user_id == self.id:
                                 i.i_am_seller = True
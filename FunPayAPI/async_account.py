@@ -0,0 +1,186 @@
+"""
+В данном модуле описан асинхронный интерфейс к :class:`FunPayAPI.account.Account`.
+
+Все HTTP-запросы по-прежнему выполняются синхронной сессией `requests` (отдельного асинхронного HTTP-клиента в
+зависимостях нет), но вместо отдельного потока на каждое действие используется один ограниченный пул потоков,
+поэтому сотни одновременных корутин не порождают сотни потоков ОС.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Literal, Any, Optional, IO, Callable, TypeVar
+
+import requests
+
+if TYPE_CHECKING:
+    from .account import Account
+    from . import types
+    from .common import enums
+
+T = TypeVar("T")
+
+
+class AsyncAccount:
+    """
+    Асинхронная обертка над :class:`FunPayAPI.account.Account`.
+
+    :param account: экземпляр аккаунта.
+    :type account: :class:`FunPayAPI.account.Account`
+
+    :param max_workers: максимальное кол-во одновременно выполняемых запросов к FunPay.
+    :type max_workers: :obj:`int`, опционально
+    """
+
+    def __init__(self, account: Account, max_workers: int = 8):
+        self.account: Account = account
+        """Синхронный экземпляр аккаунта."""
+        self.max_workers: int = max_workers
+        """Максимальное кол-во одновременно выполняемых запросов к FunPay."""
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max_workers,
+                                                               thread_name_prefix="funpay-async")
+        """Пул потоков, в котором выполняются запросы."""
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Выполняет синхронную функцию в пуле потоков аккаунта.
+
+        :param func: функция.
+        :param args: позиционные аргументы.
+        :param kwargs: именованные аргументы.
+
+        :return: результат выполнения функции.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def get(self, update_phpsessid: bool = False) -> AsyncAccount:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.get`.
+        """
+        await self.run(self.account.get, update_phpsessid)
+        return self
+
+    async def method(self, request_method: Literal["post", "get"], api_method: str, headers: dict, payload: Any,
+                     exclude_phpsessid: bool = False, raise_not_200: bool = False,
+                     locale: Literal["ru", "en", "uk"] | None = None) -> requests.Response:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.method`.
+        """
+        return await self.run(self.account.method, request_method, api_method, headers, payload,
+                              exclude_phpsessid=exclude_phpsessid, raise_not_200=raise_not_200, locale=locale)
+
+    async def runner_request(self, payload: dict) -> requests.Response:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.runner_request`.
+        """
+        return await self.run(self.account.runner_request, payload)
+
+    async def get_sales(self, *args, **kwargs) -> tuple[str | None, list[types.OrderShortcut],
+                                                        Literal["ru", "en", "uk"], dict[str, types.SubCategory]]:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.get_sales`.
+        """
+        return await self.run(self.account.get_sales, *args, **kwargs)
+
+    async def get_order(self, order_id: str, *args, **kwargs) -> types.Order:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.get_order`.
+        """
+        return await self.run(self.account.get_order, order_id, *args, **kwargs)
+
+    async def get_chats_histories(self, chats_data: dict[int | str, str | None],
+                                  include_runner_context: bool = False) -> dict[int | str, list[types.Message]]:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.get_chats_histories`.
+        """
+        return await self.run(self.account.get_chats_histories, chats_data, include_runner_context)
+
+    async def get_chat_history(self, chat_id: int | str, *args, **kwargs) -> list[types.Message]:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.get_chat_history`.
+        """
+        return await self.run(self.account.get_chat_history, chat_id, *args, **kwargs)
+
+    async def get_chat(self, chat_id: int, *args, **kwargs) -> types.Chat:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.get_chat`.
+        """
+        return await self.run(self.account.get_chat, chat_id, *args, **kwargs)
+
+    async def request_chats(self) -> list[types.ChatShortcut]:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.request_chats`.
+        """
+        return await self.run(self.account.request_chats)
+
+    async def send_message(self, chat_id: int | str, text: Optional[str] = None, chat_name: Optional[str] = None,
+                           *args, **kwargs) -> types.Message:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.send_message`.
+        """
+        return await self.run(self.account.send_message, chat_id, text, chat_name, *args, **kwargs)
+
+    async def send_image(self, chat_id: int, image: int | str | IO[bytes], chat_name: Optional[str] = None,
+                         *args, **kwargs) -> types.Message:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.send_image`.
+        """
+        return await self.run(self.account.send_image, chat_id, image, chat_name, *args, **kwargs)
+
+    async def send_review(self, order_id: str, text: str, rating: Literal[1, 2, 3, 4, 5] = 5) -> str:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.send_review`.
+        """
+        return await self.run(self.account.send_review, order_id, text, rating)
+
+    async def refund(self, order_id: str):
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.refund`.
+        """
+        return await self.run(self.account.refund, order_id)
+
+    async def get_raise_modal(self, category_id: int) -> dict:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.get_raise_modal`.
+        """
+        return await self.run(self.account.get_raise_modal, category_id)
+
+    async def raise_lots(self, category_id: int, subcategories: Optional[list[int | types.SubCategory]] = None,
+                         exclude: list[int] | None = None) -> int:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.raise_lots`.
+        """
+        return await self.run(self.account.raise_lots, category_id, subcategories, exclude)
+
+    async def get_user(self, user_id: int, locale: Literal["ru", "en", "uk"] | None = None) -> types.UserProfile:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.get_user`.
+        """
+        return await self.run(self.account.get_user, user_id, locale)
+
+    async def get_balance(self, lot_id: int) -> types.Balance:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.get_balance`.
+        """
+        return await self.run(self.account.get_balance, lot_id)
+
+    async def withdraw(self, currency: enums.Currency, wallet: enums.Wallet, amount: int | float,
+                       address: str) -> float:
+        """
+        Асинхронная версия :meth:`FunPayAPI.account.Account.withdraw`.
+        """
+        return await self.run(self.account.withdraw, currency, wallet, amount, address)
+
+    def close(self):
+        """
+        Останавливает пул потоков аккаунта.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def __getattr__(self, item):
+        if item == "account":
+            raise AttributeError(item)
+        return getattr(self.account, item)
@@ -0,0 +1,271 @@
+"""
+В данном модуле описаны метрики (счетчики, измерители, гистограммы) и их реестр,
+который умеет отдавать значения в текстовом формате Prometheus.
+
+Метрики собираются всегда (обновление метрики - это одна операция со словарем под блокировкой),
+а отдавать их или нет, решает приложение (см. :meth:`Registry.render`).
+"""
+from __future__ import annotations
+
+from typing import Callable, Iterable
+from urllib.parse import urlparse
+import threading
+import re
+
+_ID_SEGMENT = re.compile(r"^\d+$")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    labels = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def _format_value(value: int | float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Базовый класс метрики.
+
+    :param name: название метрики.
+    :type name: :obj:`str`
+
+    :param documentation: описание метрики.
+    :type documentation: :obj:`str`
+
+    :param labels: названия меток.
+    :type labels: :obj:`tuple` of :obj:`str`, опционально
+    """
+    type_: str = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name: str = name
+        """Название метрики."""
+        self.documentation: str = documentation
+        """Описание метрики."""
+        self.labels: tuple[str, ...] = tuple(labels)
+        """Названия меток."""
+        self._values: dict[tuple, int | float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: tuple) -> tuple:
+        if len(labels) != len(self.labels):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.labels}, получено: {labels}.")
+        return tuple(str(i) for i in labels)
+
+    def samples(self) -> list[tuple[str, str, int | float]]:
+        """
+        Возвращает значения метрики.
+
+        :return: список кортежей (название, метки в формате Prometheus, значение).
+        """
+        with self._lock:
+            return [(self.name, _format_labels(self.labels, k), v) for k, v in self._values.items()]
+
+    def render(self) -> str:
+        """
+        Возвращает метрику в текстовом формате Prometheus.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """
+    Счетчик (только увеличивается).
+    """
+    type_ = "counter"
+
+    def inc(self, *labels, amount: int | float = 1):
+        """
+        Увеличивает счетчик.
+
+        :param labels: значения меток (в порядке :attr:`Metric.labels`).
+        :param amount: на сколько увеличить.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, *labels) -> int | float:
+        """
+        Возвращает значение счетчика.
+        """
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Counter):
+    """
+    Измеритель (текущее значение).
+    """
+    type_ = "gauge"
+
+    def set(self, *labels, value: int | float):
+        """
+        Устанавливает значение.
+
+        :param labels: значения меток (в порядке :attr:`Metric.labels`).
+        :param value: значение.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """
+    Гистограмма.
+
+    :param buckets: верхние границы корзин (по возрастанию, без +Inf).
+    :type buckets: :obj:`tuple` of :obj:`float`, опционально
+    """
+    type_ = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labels)
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets))
+        """Верхние границы корзин."""
+        self._values: dict[tuple, list]  # {метки: [кол-во в корзинах..., сумма, кол-во]}
+
+    def observe(self, *labels, value: int | float):
+        """
+        Добавляет наблюдение.
+
+        :param labels: значения меток (в порядке :attr:`Metric.labels`).
+        :param value: значение.
+        """
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+                    break
+            data[-2] += value
+            data[-1] += 1
+
+    def samples(self) -> list[tuple[str, str, int | float]]:
+        with self._lock:
+            values = [(k, list(v)) for k, v in self._values.items()]
+        result = []
+        for key, data in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                result.append((f"{self.name}_bucket",
+                               _format_labels(self.labels, key, f'le="{_format_value(float(bound))}"'), cumulative))
+            result.append((f"{self.name}_bucket", _format_labels(self.labels, key, 'le="+Inf"'), data[-1]))
+            result.append((f"{self.name}_sum", _format_labels(self.labels, key), data[-2]))
+            result.append((f"{self.name}_count", _format_labels(self.labels, key), data[-1]))
+        return result
+
+
+class Registry:
+    """
+    Реестр метрик.
+    """
+
+    def __init__(self):
+        self.__metrics: dict[str, Metric] = {}
+        self.__collectors: list[Callable[[], None]] = []
+        self.__lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Регистрирует метрику. Если метрика с таким названием уже зарегистрирована, возвращает ее.
+
+        :param metric: метрика.
+
+        :return: зарегистрированная метрика.
+        """
+        with self.__lock:
+            return self.__metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """
+        Добавляет функцию, которая вызывается перед каждой выгрузкой метрик (:meth:`render`).
+        Используется для измерителей, значения которых дорого обновлять при каждом изменении
+        (длина очередей, остаток товаров и т.д.).
+
+        :param collector: функция без аргументов, обновляющая значения метрик.
+        """
+        with self.__lock:
+            self.__collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Возвращает все метрики в текстовом формате Prometheus.
+        """
+        with self.__lock:
+            collectors = list(self.__collectors)
+            metrics = list(self.__metrics.values())
+        for collector in collectors:
+            try:
+                collector()
+            except:
+                pass
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+"""Общий реестр метрик."""
+
+
+def endpoint_label(url: str) -> str:
+    """
+    Возвращает метку эндпоинта для ссылки: путь без домена, языкового префикса, параметров и ID
+    (например, "https://funpay.com/en/orders/123/" -> "orders/:id").
+
+    :param url: ссылка / метод API.
+
+    :return: метка эндпоинта.
+    """
+    path = urlparse(url).path.strip("/").split("/")
+    if path and path[0] in ("en", "uk"):
+        path = path[1:]
+    return "/".join(":id" if _ID_SEGMENT.match(i) else i for i in path if i) or "/"
+
+
+# FunPayAPI.account.Account.method
+REQUESTS = REGISTRY.counter("funpay_requests_total", "Запросы к FunPay (включая повторные попытки).",
+                            ("method", "endpoint", "status"))
+REQUEST_DURATION = REGISTRY.histogram("funpay_request_duration_seconds",
+                                      "Время выполнения Account.method (включая повторные попытки и редиректы).",
+                                      ("method", "endpoint"))
+THROTTLED = REGISTRY.counter("funpay_throttled_total", "Ответы FunPay с кодом 429 / 503.", ("status",))
+
+# FunPayAPI.updater.runner.Runner.loop
+RUNNER_REQUESTS = REGISTRY.counter("funpay_runner_requests_total", "Запросы к runner FunPay.", ("result",))
+RUNNER_BATCH_FILL = REGISTRY.histogram("funpay_runner_batch_fill_ratio",
+                                       "Заполненность запроса к runner (объектов / максимум объектов в запросе).",
+                                       buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1))
+RUNNER_QUEUE = REGISTRY.gauge("funpay_runner_queue_size", "Полезных нагрузок в очереди Runner.loop.")
+
+# FunPayAPI.updater.runner.Runner.listen
+EVENTS = REGISTRY.counter("funpay_events_total", "События, отданные Runner.listen.", ("type",))
+EVENT_LAG = REGISTRY.histogram("funpay_event_lag_seconds", "Время между созданием события и его передачей обработчикам.")
+POLL_DELAY = REGISTRY.gauge("funpay_poll_delay_seconds", "Текущая задержка между запросами Runner.listen.")
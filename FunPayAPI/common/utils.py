@@ -8,7 +8,7 @@ import re
 import unicodedata
 from datetime import datetime, timedelta, timezone
 
-from .enums import Currency
+from .enums import Currency, MessageTypes
 
 MONTHS = {
     "января": 1,
@@ -135,6 +135,8 @@ class RegularExpressions(object):
         return getattr(cls, "instance")
 
     def __init__(self):
+        if hasattr(self, "SYSTEM_MESSAGE"):  # singleton: не перекомпилируем выражения при каждом вызове
+            return
         self.ORDER_PURCHASED = \
             re.compile(r"(Покупатель|The buyer) [a-zA-Z0-9]+ (оплатил заказ|has paid for order) #[A-Z0-9]{8}\.")
         """
@@ -266,3 +268,61 @@ class RegularExpressions(object):
         """
         Скомпилированное регулярное выражение, описывающее фразу о смене валюты.
         """
+
+        self.__system_messages = (
+            (MessageTypes.DISCORD.name, self.DISCORD),
+            (MessageTypes.DEAR_VENDORS.name, self.DEAR_VENDORS),
+            (MessageTypes.ORDER_PURCHASED.name, self.ORDER_PURCHASED),
+            ("ORDER_PURCHASED2", self.ORDER_PURCHASED2),
+            # Регулярные выражения выставлены в порядке от самых часто-используемых к самым редко-используемым
+            (MessageTypes.ORDER_CONFIRMED.name, self.ORDER_CONFIRMED),
+            (MessageTypes.NEW_FEEDBACK.name, self.NEW_FEEDBACK),
+            (MessageTypes.NEW_FEEDBACK_ANSWER.name, self.NEW_FEEDBACK_ANSWER),
+            (MessageTypes.FEEDBACK_CHANGED.name, self.FEEDBACK_CHANGED),
+            (MessageTypes.FEEDBACK_DELETED.name, self.FEEDBACK_DELETED),
+            (MessageTypes.REFUND.name, self.REFUND),
+            (MessageTypes.FEEDBACK_ANSWER_CHANGED.name, self.FEEDBACK_ANSWER_CHANGED),
+            (MessageTypes.FEEDBACK_ANSWER_DELETED.name, self.FEEDBACK_ANSWER_DELETED),
+            (MessageTypes.ORDER_CONFIRMED_BY_ADMIN.name, self.ORDER_CONFIRMED_BY_ADMIN),
+            (MessageTypes.PARTIAL_REFUND.name, self.PARTIAL_REFUND),
+            (MessageTypes.ORDER_REOPENED.name, self.ORDER_REOPENED),
+            (MessageTypes.REFUND_BY_ADMIN.name, self.REFUND_BY_ADMIN),
+        )
+
+        self.SYSTEM_MESSAGE = re.compile("|".join(f"(?P<{name}>{regex.pattern})"
+                                                  for name, regex in self.__system_messages))
+        """
+        Скомпилированное регулярное выражение, объединяющее все регулярные выражения системных сообщений
+        (каждое - в именованной группе с названием типа сообщения).
+        Используется в :meth:`FunPayAPI.common.utils.RegularExpressions.classify_message`.
+        """
+
+    def classify_message(self, text: str | None) -> tuple[MessageTypes, str | None]:
+        """
+        Определяет тип сообщения и ID заказа, к которому оно относится, за один проход по тексту.
+
+        Приоритет типов совпадает с порядком проверок в :meth:`FunPayAPI.types.Message.get_message_type`.
+
+        :param text: текст сообщения.
+        :type text: :obj:`str` or :obj:`None`
+
+        :return: кортеж (тип сообщения, ID заказа без # или None).
+        :rtype: :obj:`tuple` (:class:`FunPayAPI.common.enums.MessageTypes`, :obj:`str` or :obj:`None`)
+        """
+        if not text:
+            return MessageTypes.NON_SYSTEM, None
+
+        found = {}
+        for match in self.SYSTEM_MESSAGE.finditer(text):
+            found.setdefault(match.lastgroup, match)
+        if not found:
+            return MessageTypes.NON_SYSTEM, None
+
+        for name, _ in self.__system_messages:
+            if name not in found or name == "ORDER_PURCHASED2":
+                continue
+            if name == MessageTypes.ORDER_PURCHASED.name and "ORDER_PURCHASED2" not in found:
+                continue
+            order_id = self.ORDER_ID.search(found[name].group())
+            return MessageTypes[name], order_id.group()[1:] if order_id else None
+        return MessageTypes.NON_SYSTEM, None
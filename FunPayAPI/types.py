@@ -4,6 +4,7 @@
 from __future__ import annotations
 
 import re
+import zlib
 from typing import Literal, overload, Optional
 
 import FunPayAPI.common.enums
@@ -12,10 +13,51 @@ from .common.enums import MessageTypes, OrderStatuses, SubCategoryTypes, Currenc
 import datetime
 
 
+class CompressedHTML:
+    """
+    Сжатый (zlib) HTML код. Используется при :attr:`FunPayAPI.account.Account.html_retention` == "compress".
+
+    :param html: HTML код.
+    :type html: :obj:`str`
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, html: str):
+        self.data: bytes = zlib.compress(html.encode(), 6)
+        """Сжатый HTML код."""
+
+    def __str__(self):
+        return zlib.decompress(self.data).decode()
+
+    def __len__(self):
+        return len(self.data)
+
+
+class HTMLAttribute:
+    """
+    Дескриптор атрибута `html` типов FunPayAPI.
+
+    Хранит значение в атрибуте `_html` и прозрачно распаковывает :class:`FunPayAPI.types.CompressedHTML` при обращении,
+    поэтому `obj.html` всегда возвращает :obj:`str` (или :obj:`None`, если HTML не сохраняется).
+    """
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = instance._html
+        if isinstance(value, CompressedHTML):
+            return str(value)
+        return value
+
+    def __set__(self, instance, value: str | CompressedHTML | None):
+        instance._html = value
+
+
 class BaseOrderInfo:
     """
     Класс, представляющий информацию о заказе.
     """
+    __slots__ = ("_order", "_order_attempt_made", "_order_attempt_error", "__dict__", "__weakref__")
 
     def __init__(self):
         self._order: Order | None = None
@@ -48,6 +90,9 @@ class ChatShortcut(BaseOrderInfo):
     :param determine_msg_type: определять ли тип последнего сообщения?
     :type determine_msg_type: :obj:`bool`, опционально
     """
+    __slots__ = ("id", "name", "last_message_text", "last_by_bot", "last_by_vertex", "unread", "node_msg_id",
+                 "user_msg_id", "last_message_type", "_html")
+    html = HTMLAttribute()
 
     def __init__(self, id_: int, name: str, last_message_text: str, node_msg_id: int, user_msg_id: int,
                  unread: bool, html: str, determine_msg_type: bool = True):
@@ -69,7 +114,7 @@ class ChatShortcut(BaseOrderInfo):
         """ID последнего прочитанного сообщения."""
         self.last_message_type: MessageTypes | None = None if not determine_msg_type else self.get_last_message_type()
         """Тип последнего сообщения."""
-        self.html: str = html
+        self.html: str | None = html
         """HTML код виджета чата."""
         BaseOrderInfo.__init__(self)
 
@@ -85,40 +130,7 @@ class ChatShortcut(BaseOrderInfo):
         :return: тип последнего сообщения.
         :rtype: :class:`FunPayAPI.common.enums.MessageTypes`
         """
-        res = RegularExpressions()
-        if res.DISCORD.search(self.last_message_text):
-            return MessageTypes.DISCORD
-
-        if res.DEAR_VENDORS.search(self.last_message_text):
-            return MessageTypes.DEAR_VENDORS
-
-        if res.ORDER_PURCHASED.findall(self.last_message_text) and res.ORDER_PURCHASED2.findall(self.last_message_text):
-            return MessageTypes.ORDER_PURCHASED
-
-        if res.ORDER_ID.search(self.last_message_text) is None:
-            return MessageTypes.NON_SYSTEM
-
-        # Регулярные выражения выставлены в порядке от самых часто-используемых к самым редко-используемым
-        sys_msg_types = {
-            MessageTypes.ORDER_CONFIRMED: res.ORDER_CONFIRMED,
-            MessageTypes.NEW_FEEDBACK: res.NEW_FEEDBACK,
-            MessageTypes.NEW_FEEDBACK_ANSWER: res.NEW_FEEDBACK_ANSWER,
-            MessageTypes.FEEDBACK_CHANGED: res.FEEDBACK_CHANGED,
-            MessageTypes.FEEDBACK_DELETED: res.FEEDBACK_DELETED,
-            MessageTypes.REFUND: res.REFUND,
-            MessageTypes.FEEDBACK_ANSWER_CHANGED: res.FEEDBACK_ANSWER_CHANGED,
-            MessageTypes.FEEDBACK_ANSWER_DELETED: res.FEEDBACK_ANSWER_DELETED,
-            MessageTypes.ORDER_CONFIRMED_BY_ADMIN: res.ORDER_CONFIRMED_BY_ADMIN,
-            MessageTypes.PARTIAL_REFUND: res.PARTIAL_REFUND,
-            MessageTypes.ORDER_REOPENED: res.ORDER_REOPENED,
-            MessageTypes.REFUND_BY_ADMIN: res.REFUND_BY_ADMIN
-        }
-
-        for i in sys_msg_types:
-            if sys_msg_types[i].search(self.last_message_text):
-                return i
-        else:
-            return MessageTypes.NON_SYSTEM
+        return RegularExpressions().classify_message(self.last_message_text)[0]
 
     def __str__(self):
         return self.last_message_text
@@ -128,6 +140,7 @@ class BuyerViewing:
     """
     Данный класс представляет поле "Покупатель смотрит"
     """
+    html = HTMLAttribute()
 
     def __init__(self, buyer_id: int, link: str | None, text: str | None, tag: str | None, html: str | None = None):
         """
@@ -184,6 +197,7 @@ class Chat:
     :param messages: последние 100 сообщений чата.
     :type messages: :obj:`list` of :class:`FunPayAPI.types.Message` or :obj:`None`
     """
+    html = HTMLAttribute()
 
     def __init__(self, id_: int, name: str, looking_link: str | None, looking_text: str | None,
                  html: str, messages: Optional[list[Message]] = None):
@@ -195,7 +209,7 @@ class Chat:
         """Ссылка на лот, который в данный момент смотрит собеседник."""
         self.looking_text: str | None = looking_text
         """Название лота, который в данный момент смотрит собеседник."""
-        self.html: str = html
+        self.html: str | None = html
         """HTML код чата."""
         self.messages: list[Message] = messages or []
         """Последние 100 сообщений чата."""
@@ -232,6 +246,11 @@ class Message(BaseOrderInfo):
     :param determine_msg_type: определять ли тип сообщения.
     :type determine_msg_type: :obj:`bool`, опционально
     """
+    __slots__ = ("id", "text", "chat_id", "chat_name", "interlocutor_id", "buyer_viewing", "type", "author",
+                 "author_id", "_html", "image_link", "image_name", "by_bot", "by_vertex", "badge", "is_employee",
+                 "is_support", "is_moderation", "is_arbitration", "is_autoreply", "initiator_username", "initiator_id",
+                 "i_am_seller", "i_am_buyer", "tag")
+    html = HTMLAttribute()
 
     def __init__(self, id_: int, text: str | None, chat_id: int | str, chat_name: str | None,
                  interlocutor_id: int | None,
@@ -256,7 +275,7 @@ class Message(BaseOrderInfo):
         """Автор сообщения."""
         self.author_id: int = author_id
         """ID автора сообщения."""
-        self.html: str = html
+        self.html: str | None = html
         """HTML-код сообщения."""
         self.image_link: str | None = image_link
         """Ссылка на изображение в сообщении (если оно есть)."""
@@ -302,42 +321,7 @@ class Message(BaseOrderInfo):
         :return: тип последнего сообщения в чате.
         :rtype: :class:`FunPayAPI.common.enums.MessageTypes`
         """
-        if not self.text:
-            return MessageTypes.NON_SYSTEM
-
-        res = RegularExpressions()
-        if res.DISCORD.search(self.text):
-            return MessageTypes.DISCORD
-        if res.DEAR_VENDORS.search(self.text):
-            return MessageTypes.DEAR_VENDORS
-
-        if res.ORDER_PURCHASED.findall(self.text) and res.ORDER_PURCHASED2.findall(self.text):
-            return MessageTypes.ORDER_PURCHASED
-
-        if res.ORDER_ID.search(self.text) is None:
-            return MessageTypes.NON_SYSTEM
-
-        # Регулярные выражения выставлены в порядке от самых часто-используемых к самым редко-используемым
-        sys_msg_types = {
-            MessageTypes.ORDER_CONFIRMED: res.ORDER_CONFIRMED,
-            MessageTypes.NEW_FEEDBACK: res.NEW_FEEDBACK,
-            MessageTypes.NEW_FEEDBACK_ANSWER: res.NEW_FEEDBACK_ANSWER,
-            MessageTypes.FEEDBACK_CHANGED: res.FEEDBACK_CHANGED,
-            MessageTypes.FEEDBACK_DELETED: res.FEEDBACK_DELETED,
-            MessageTypes.REFUND: res.REFUND,
-            MessageTypes.FEEDBACK_ANSWER_CHANGED: res.FEEDBACK_ANSWER_CHANGED,
-            MessageTypes.FEEDBACK_ANSWER_DELETED: res.FEEDBACK_ANSWER_DELETED,
-            MessageTypes.ORDER_CONFIRMED_BY_ADMIN: res.ORDER_CONFIRMED_BY_ADMIN,
-            MessageTypes.PARTIAL_REFUND: res.PARTIAL_REFUND,
-            MessageTypes.ORDER_REOPENED: res.ORDER_REOPENED,
-            MessageTypes.REFUND_BY_ADMIN: res.REFUND_BY_ADMIN
-        }
-
-        for i in sys_msg_types:
-            if sys_msg_types[i].search(self.text):
-                return i
-        else:
-            return MessageTypes.NON_SYSTEM
+        return RegularExpressions().classify_message(self.text)[0]
 
     def __str__(self):
         return self.text if self.text is not None else self.image_link if self.image_link is not None else ""
@@ -386,6 +370,9 @@ class OrderShortcut(BaseOrderInfo):
     :param dont_search_amount: не искать кол-во товара.
     :type dont_search_amount: :obj:`bool`, опционально
     """
+    __slots__ = ("id", "description", "price", "currency", "amount", "buyer_username", "buyer_id", "chat_id", "status",
+                 "date", "subcategory_name", "subcategory", "_html")
+    html = HTMLAttribute()
 
     def __init__(self, id_: str, description: str, price: float, currency: Currency,
                  buyer_username: str, buyer_id: int, chat_id: int | str, status: OrderStatuses,
@@ -415,7 +402,7 @@ class OrderShortcut(BaseOrderInfo):
         """Название подкатегории, к которой относится заказ."""
         self.subcategory: SubCategory | None = subcategory
         """Подкатегория, к которой относится заказ."""
-        self.html: str = html
+        self.html: str | None = html
         """HTML код виджета заказа."""
         BaseOrderInfo.__init__(self)
 
@@ -1106,6 +1093,8 @@ class SellerShortcut:
     """
     Класс, описывающий объект пользователя из таблицы предложений.
     """
+    __slots__ = ("id", "username", "online", "stars", "reviews", "_html", "__dict__", "__weakref__")
+    html = HTMLAttribute()
 
     def __init__(self, id_: int, username: str, online: bool, stars: None | int, reviews: int,
                  html: str):
@@ -1119,7 +1108,7 @@ class SellerShortcut:
         """Количество звезд."""
         self.reviews: int = reviews
         """Количество отзывов."""
-        self.html: str = html
+        self.html: str | None = html
         """HTML код страницы пользователя."""
 
     @property
@@ -1155,6 +1144,9 @@ class LotShortcut:
     :param html: HTML код виджета лота.
     :type html: :obj:`str`
     """
+    __slots__ = ("id", "server", "side", "description", "title", "amount", "price", "currency", "seller", "auto",
+                 "promo", "attributes", "subcategory", "_html", "public_link", "__dict__", "__weakref__")
+    html = HTMLAttribute()
 
     def __init__(self, id_: int | str, server: str | None, side: str | None,
                  description: str | None, amount: int | None, price: float, currency: Currency,
@@ -1189,7 +1181,7 @@ class LotShortcut:
         """Атрибуты лота (только для лотов из таблицы)"""
         self.subcategory: SubCategory = subcategory
         """Подкатегория лота."""
-        self.html: str = html
+        self.html: str | None = html
         """HTML-код виджета лота."""
         self.public_link: str = f"https://funpay.com/chips/offer?id={self.id}" \
             if self.subcategory.type is SubCategoryTypes.CURRENCY else f"https://funpay.com/lots/offer?id={self.id}"
@@ -1224,6 +1216,9 @@ class MyLotShortcut:
     :param html: HTML код виджета лота.
     :type html: :obj:`str`
     """
+    __slots__ = ("id", "server", "side", "description", "title", "amount", "price", "currency", "auto", "subcategory",
+                 "active", "_html", "public_link", "__dict__", "__weakref__")
+    html = HTMLAttribute()
 
     def __init__(self, id_: int | str, server: str | None, side: str | None,
                  description: str | None, amount: int | None, price: float, currency: Currency,
@@ -1253,7 +1248,7 @@ class MyLotShortcut:
         """Подкатегория лота."""
         self.active: bool = active
         """Активен ли лот?"""
-        self.html: str = html
+        self.html: str | None = html
         """HTML-код виджета лота."""
         self.public_link: str = f"https://funpay.com/chips/offer?id={self.id}" \
             if self.subcategory.type is SubCategoryTypes.CURRENCY else f"https://funpay.com/lots/offer?id={self.id}"
@@ -1282,6 +1277,7 @@ class UserProfile:
     :param html: HTML код страницы пользователя.
     :type html: :obj:`str`
     """
+    html = HTMLAttribute()
 
     def __init__(self, id_: int, username: str, profile_photo: str, online: bool, banned: bool, html: str):
         self.id: int = id_
@@ -1294,7 +1290,7 @@ class UserProfile:
         """Онлайн ли пользователь."""
         self.banned: bool = banned
         """Заблокирован ли пользователь."""
-        self.html: str = html
+        self.html: str | None = html
         """HTML код страницы пользователя."""
         self.__lots_ids: dict[int | str, LotShortcut] = {}
         """Все лоты пользователя в виде словаря {ID: лот}}"""
@@ -1444,6 +1440,7 @@ class Review:
     :param reply_by_bot: оставлен ли ответ на отзыв ботом?
     :type reply_by_bot: :obj:`bool`
     """
+    html = HTMLAttribute()
 
     def __init__(self, stars: int | None, text: str | None, reply: str | None, anonymous: bool, html: str, hidden: bool,
                  order_id: str | None = None, author: str | None = None, author_id: int | None = None,
@@ -1456,7 +1453,7 @@ class Review:
         """Текст ответа на отзыв."""
         self.anonymous: bool = anonymous
         """Анонимный ли отзыв?"""
-        self.html: str = html
+        self.html: str | None = html
         """HTML код отзыва."""
         self.hidden: bool = hidden
         """Скрыт ли отзыв?"""
@@ -0,0 +1,127 @@
+"""
+В данном модуле описан асинхронный интерфейс к :class:`FunPayAPI.updater.runner.Runner`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import logging
+from typing import TYPE_CHECKING, AsyncGenerator
+
+if TYPE_CHECKING:
+    from ..async_account import AsyncAccount
+
+from .runner import Runner
+from .events import *
+
+logger = logging.getLogger("FunPayAPI.async_runner")
+
+
+class AsyncRunner:
+    """
+    Асинхронная обертка над :class:`FunPayAPI.updater.runner.Runner`.
+
+    Цикл :meth:`FunPayAPI.updater.runner.Runner.loop` и генератор :meth:`FunPayAPI.updater.runner.Runner.listen`
+    работают в двух фоновых потоках, а события передаются в цикл событий через :class:`asyncio.Queue`.
+
+    :param account: экземпляр асинхронного аккаунта (должен быть инициализирован с помощью
+        :meth:`FunPayAPI.async_account.AsyncAccount.get`).
+    :type account: :class:`FunPayAPI.async_account.AsyncAccount`
+
+    :param disable_message_requests: см. :class:`FunPayAPI.updater.runner.Runner`.
+    :type disable_message_requests: :obj:`bool`, опционально
+
+    :param disabled_order_requests: см. :class:`FunPayAPI.updater.runner.Runner`.
+    :type disabled_order_requests: :obj:`bool`, опционально
+
+    :param max_queue_size: максимальное кол-во событий, ожидающих обработки. Если очередь заполнена, поток
+        получения событий ждет, пока она освободится.
+    :type max_queue_size: :obj:`int`, опционально
+    """
+
+    def __init__(self, account: AsyncAccount, disable_message_requests: bool = False,
+                 disabled_order_requests: bool = False, max_queue_size: int = 1000):
+        self.account: AsyncAccount = account
+        """Экземпляр асинхронного аккаунта."""
+        self.runner: Runner = account.account.runner or Runner(account.account, disable_message_requests,
+                                                               disabled_order_requests)
+        """Синхронный экземпляр Runner'а."""
+        self.max_queue_size: int = max_queue_size
+        """Максимальное кол-во событий, ожидающих обработки."""
+        self.__loop_thread: threading.Thread | None = None
+
+    def start_loop(self):
+        """
+        Запускает :meth:`FunPayAPI.updater.runner.Runner.loop` в фоновом потоке (если он еще не запущен).
+        """
+        if self.__loop_thread is not None and self.__loop_thread.is_alive():
+            return
+        self.__loop_thread = threading.Thread(target=self.runner.loop, daemon=True, name="funpay-runner")
+        self.__loop_thread.start()
+
+    async def listen(self, requests_delay: int | float = 6.0,
+                     ignore_exceptions: bool = True, min_delay: int | float | None = None,
+                     max_delay: int | float | None = None) -> AsyncGenerator[InitialChatEvent | ChatsListChangedEvent |
+                                                                       LastChatMessageChangedEvent | NewMessageEvent |
+                                                                       InitialOrderEvent | OrdersListChangedEvent |
+                                                                       NewOrderEvent | OrderStatusChangedEvent, None]:
+        """
+        Асинхронная версия :meth:`FunPayAPI.updater.runner.Runner.listen`.
+
+        :param requests_delay: задержка между запросами (в секундах).
+        :type requests_delay: :obj:`int` or :obj:`float`, опционально
+
+        :param ignore_exceptions: игнорировать ошибки?
+        :type ignore_exceptions: :obj:`bool`, опционально
+
+        :param min_delay: см. :meth:`FunPayAPI.updater.runner.Runner.listen`.
+        :type min_delay: :obj:`int` or :obj:`float` or :obj:`None`, опционально
+
+        :param max_delay: см. :meth:`FunPayAPI.updater.runner.Runner.listen`.
+        :type max_delay: :obj:`int` or :obj:`float` or :obj:`None`, опционально
+
+        :return: асинхронный генератор событий FunPay.
+        """
+        self.start_loop()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        slots = threading.Semaphore(self.max_queue_size)
+        sentinel = object()
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:  # цикл событий закрыт
+                stop.set()
+
+        def producer():
+            try:
+                for event in self.runner.listen(requests_delay, ignore_exceptions, min_delay, max_delay, stop):
+                    # слот занимает только событие, исключение и sentinel передаются без него
+                    while not slots.acquire(timeout=1):
+                        if stop.is_set():
+                            return
+                    if stop.is_set():
+                        return
+                    put(event)
+            except Exception as e:
+                put(e)
+            finally:
+                if not loop.is_closed():
+                    put(sentinel)
+
+        thread = threading.Thread(target=producer, daemon=True, name="funpay-listener")
+        thread.start()
+        try:
+            while True:
+                item = await queue.get()
+                if item is sentinel:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                slots.release()
+                yield item
+        finally:
+            stop.set()
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import bisect
 import random
 import re
+import threading
 import time
 import uuid
 from typing import TYPE_CHECKING, Generator
@@ -15,13 +17,70 @@ import json
 import logging
 from bs4 import BeautifulSoup
 
-from ..common import exceptions
+from ..common import exceptions, metrics
 from ..common.utils import strip_invisible_suffix
 from .events import *
 
 logger = logging.getLogger("FunPayAPI.runner")
 
 
+class AdaptivePollDelay:
+    """
+    Регулятор задержки между запросами :meth:`Runner.listen` (AIMD).
+
+    * Пока в чатах / заказах есть активность, задержка уменьшается на `step` секунд (но не ниже `min_delay`).
+    * Если активности нет дольше `idle_time` секунд, задержка увеличивается на `step` секунд (но не выше `max_delay`).
+    * Если FunPay ответил 429 / 503, задержка умножается на 2 (но не выше `max_delay`), и в течение
+      `cooldown` секунд после этого не уменьшается.
+
+    Если `min_delay == max_delay`, задержка постоянна.
+
+    :param delay: начальная задержка (в секундах).
+    :param min_delay: минимальная задержка (в секундах).
+    :param max_delay: максимальная задержка (в секундах).
+    :param step: шаг изменения задержки (в секундах).
+    :param idle_time: через сколько секунд без активности начинать увеличивать задержку.
+    :param cooldown: сколько секунд не уменьшать задержку после 429 / 503.
+    """
+
+    def __init__(self, delay: float, min_delay: float | None = None, max_delay: float | None = None,
+                 step: float = 0.5, idle_time: float = 120, cooldown: float = 60):
+        self.min_delay: float = min(delay, min_delay) if min_delay is not None else delay
+        self.max_delay: float = max(delay, max_delay) if max_delay is not None else delay
+        self.delay: float = delay
+        """Текущая задержка."""
+        self.step = step
+        self.idle_time = idle_time
+        self.cooldown = cooldown
+        self.last_activity_time: float = time.time()
+        """Время последней активности (нового сообщения / заказа)."""
+        self.last_throttle_time: float = 0
+        """Время последнего ответа 429 / 503, на который отреагировал регулятор."""
+
+    def update(self, active: bool, throttle_time: float) -> float:
+        """
+        Пересчитывает задержку по итогам очередной итерации.
+
+        :param active: были ли на итерации новые сообщения / заказы.
+        :param throttle_time: время последнего ответа FunPay с кодом 429 / 503.
+
+        :return: новая задержка (в секундах).
+        """
+        now = time.time()
+        if active:
+            self.last_activity_time = now
+        if throttle_time > self.last_throttle_time:
+            self.last_throttle_time = throttle_time
+            self.delay = min(self.max_delay, self.delay * 2)
+        elif now - self.last_throttle_time < self.cooldown:
+            pass
+        elif active:
+            self.delay = max(self.min_delay, self.delay - self.step)
+        elif now - self.last_activity_time > self.idle_time:
+            self.delay = min(self.max_delay, self.delay + self.step)
+        return self.delay
+
+
 class Runner:
     """
     Класс для получения новых событий FunPay.
@@ -68,6 +127,11 @@ class Runner:
 
         self.saved_orders: dict[str, types.OrderShortcut] | None = None
         """Сохраненные состояния заказов ({ID заказа: экземпляр types.OrderShortcut})."""
+        self.saved_orders_statuses: dict[str, types.OrderStatuses] | None = None
+        """Сохраненные статусы заказов ({ID заказа: статус}), по которым определяются изменения."""
+        self.incremental_orders: bool = True
+        """Получать ли изменения заказов инкрементально (см. :meth:`parse_order_updates`)?"""
+        self.__last_orders_counters: tuple[int, int] | None = None
 
         self.runner_last_messages: dict[int, list[int, int, str | None]] = {}
         """ID последний сообщений {ID чата: [ID последего сообщения чата, ID последнего прочитанного сообщения чата, 
@@ -96,6 +160,12 @@ class Runner:
 
         self.runner_results: dict [str, requests.Response | Exception] = {}
         """uuid4 - response/exception"""
+
+        self.result_timeout: float = 30.0
+        """Сколько секунд ждать результат после того, как полезная нагрузка была взята в работу."""
+
+        self.latency_buckets: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+        """Границы корзин гистограммы времени ожидания результата (в секундах)."""
         self.account: Account = account
         """Экземпляр аккаунта, к которому привязан Runner."""
 
@@ -103,21 +173,72 @@ class Runner:
         self.__chat_bookmarks: list[dict] = []
         self.__chat_nodes: dict[int, tuple[dict, int]] = {}
         self.__chat_bookmarks_time = 0
+        self.poll_delay: AdaptivePollDelay | None = None
+        """Регулятор задержки между запросами :meth:`listen` (создается при запуске :meth:`listen`)."""
+        self.__polls_times: list[float] = []
+        self.__events_count = 0
+        self.__events_lag_sum = 0.0
+        self.__queue_condition = threading.Condition()
+        self.__waiters: dict[str, tuple[threading.Event, float]] = {}
+        self.__latency_histogram: list[int] = [0] * (len(self.latency_buckets) + 1)
+        self.__latency_sum = 0.0
         self.account.runner = self
 
-    def __add_payload(self, payload: dict):
+    def __add_payload(self, payload: dict) -> tuple[str, threading.Event]:
         """
         Добавляет полезную нагрузку в очередь и присваивает ей уникальный идентификатор.
 
         :param payload: словарь с данными для добавления в очередь.
         :type payload: dict
 
-        :return: уникальный идентификатор добавленной полезной нагрузки.
-        :rtype: str
+        :return: уникальный идентификатор добавленной полезной нагрузки и событие, которое будет установлено
+            после получения результата (событие возвращается сразу: поток Runner'а может выполнить запрос
+            и убрать его из ожидающих раньше, чем вызывающий код к нему обратится).
+        :rtype: :obj:`tuple` (:obj:`str`, :class:`threading.Event`)
         """
         id_ = str(uuid.uuid4())
-        self.payload_queue[id_] = payload
-        return id_
+        event = threading.Event()
+        with self.__queue_condition:
+            self.__waiters[id_] = (event, time.time())
+            self.payload_queue[id_] = payload
+            self.__queue_condition.notify()
+        return id_, event
+
+    def __set_results(self, ids: set[str], result: requests.Response | Exception):
+        """
+        Сохраняет результат выполнения запроса и будит потоки, ожидающие его в :meth:`get_result`.
+
+        :param ids: идентификаторы полезных нагрузок, вошедших в запрос.
+        :type ids: :obj:`set` of :obj:`str`
+
+        :param result: ответ FunPay или исключение.
+        :type result: :class:`requests.Response` or :class:`Exception`
+        """
+        now = time.time()
+        for id_ in ids:
+            self.runner_results[id_] = result
+            waiter = self.__waiters.pop(id_, None)
+            if waiter is None:
+                continue
+            event, added_at = waiter
+            latency = now - added_at
+            self.__latency_histogram[bisect.bisect_left(self.latency_buckets, latency)] += 1
+            self.__latency_sum += latency
+            event.set()
+
+    def get_latency_stats(self) -> dict:
+        """
+        Возвращает гистограмму времени ожидания результатов :meth:`get_result`.
+
+        :return: словарь {"buckets": {верхняя граница корзины: кол-во}, "count": общее кол-во, "sum": суммарное время}.
+            Граница `inf` - все запросы, не попавшие в остальные корзины. Значения не накопительные.
+        :rtype: :obj:`dict`
+        """
+        histogram = list(self.__latency_histogram)
+        bounds = list(self.latency_buckets) + [float("inf")]
+        return {"buckets": dict(zip(bounds, histogram)),
+                "count": sum(histogram),
+                "sum": self.__latency_sum}
 
     def get_result(self, payload: dict) -> requests.Response:
         """
@@ -132,13 +253,13 @@ class Runner:
         :raises Exception: если результат не был получен в течение ожидания или произошла ошибка при обработке.
         """
 
-        id_ = self.__add_payload(payload)
-        while id_ in self.payload_queue:
-            time.sleep(0.1)
-        for i in range(300):
-            if id_ in self.runner_results:
-                break
-            time.sleep(0.1)
+        id_, event = self.__add_payload(payload)
+        # Пока нагрузка в очереди, ждем без ограничения по времени (как и раньше), но проверяем очередь раз в секунду
+        # на случай, если нагрузку из нее кто-то убрал.
+        while not event.wait(1) and id_ in self.payload_queue:
+            pass
+        event.wait(self.result_timeout)
+        self.__waiters.pop(id_, None)
         result = self.runner_results.pop(id_, Exception("Что-то пошло не так во время получения результата"))
         if isinstance(result, Exception):
             raise result
@@ -227,24 +348,27 @@ class Runner:
                                 "request": False}
                 ids = set()
 
-                for id_ in list(self.payload_queue.keys()):
-                    payload = self.payload_queue.get(id_)
-                    if payload is None:
-                        continue
-                    if ((not request_data["objects"] and not request_data["request"])
-                            or ((len(request_data["objects"]) + len(payload["objects"]) <= self.runner_len and
-                            int(bool(request_data["request"])) + int(bool(payload["request"])) <= 1))):
-                        request_data["objects"].extend(payload["objects"])
-                        request_data["request"] = request_data["request"] or payload["request"]
-                        ids.add(id_)
-                        self.payload_queue.pop(id_, None)
-                    else:
-                        break
-
+                with self.__queue_condition:
+                    if not self.payload_queue:
+                        self.__queue_condition.wait(1)
+                    for id_ in list(self.payload_queue.keys()):
+                        payload = self.payload_queue.get(id_)
+                        if payload is None:
+                            continue
+                        if ((not request_data["objects"] and not request_data["request"])
+                                or ((len(request_data["objects"]) + len(payload["objects"]) <= self.runner_len and
+                                int(bool(request_data["request"])) + int(bool(payload["request"])) <= 1))):
+                            request_data["objects"].extend(payload["objects"])
+                            request_data["request"] = request_data["request"] or payload["request"]
+                            ids.add(id_)
+                            self.payload_queue.pop(id_, None)
+                        else:
+                            break
+                    metrics.RUNNER_QUEUE.set(value=len(self.payload_queue))
 
                 if not request_data["objects"] and not request_data["request"]:
-                    time.sleep(0.1)
                     continue
+                metrics.RUNNER_BATCH_FILL.observe(value=min(1, len(request_data["objects"]) / self.runner_len))
                 types_ = [i["type"] for i in request_data["objects"]]
                 if "orders_counters" in types_ and "chat_bookmarks" in types_:
                     is_listener_request = True
@@ -254,11 +378,12 @@ class Runner:
 
                 try:
                     result = self.account.runner_request(request_data)
+                    metrics.RUNNER_REQUESTS.inc("ok")
                 except Exception as e:
                     result = e
+                    metrics.RUNNER_REQUESTS.inc("error")
 
-                for id_ in ids:
-                    self.runner_results[id_] = result
+                self.__set_results(ids, result)
                 if isinstance(result, Exception):
                     time.sleep(5)
                     continue
@@ -383,7 +508,7 @@ class Runner:
 
             chat_with = chat.find("div", {"class": "media-user-name"}).text
             chat_obj = types.ChatShortcut(chat_id, chat_with, last_msg_text, node_msg_id,
-                                          user_msg_id, unread, str(chat))
+                                          user_msg_id, unread, self.account.retain_html(chat))
             if last_msg_text_or_none is not None:
                 chat_obj.last_by_bot = by_bot
                 chat_obj.last_by_vertex = by_vertex
@@ -540,10 +665,30 @@ class Runner:
         if not self.make_order_requests:
             return events
 
+        counters = (obj["data"]["buyer"], obj["data"]["seller"])
+        last_counters = self.__last_orders_counters
+        incremental = self.incremental_orders and self.saved_orders_statuses is not None
+        if incremental and last_counters is not None and last_counters[1] == counters[1] == 0 and \
+                last_counters[0] != counters[0]:
+            # изменился только счетчик покупок, а счетчик активных продаж остался равен 0 - событие вызвано
+            # покупкой, список продаж не запрашиваем. Если не изменился ни один счетчик, список запрашивается:
+            # продажа могла быть создана и закрыта (или статус закрытой продажи изменен) между опросами.
+            # Если активные продажи есть, одинаковый счетчик не гарантирует отсутствия новых продаж
+            # (новая продажа и закрытие другой в одном опросе), поэтому список запрашивается.
+            self.__last_orders_counters = counters
+            return events
+
         attempts = 3
         while attempts:
             attempts -= 1
             try:
+                if incremental:
+                    events += self.__parse_orders_statuses(*self.account.get_sales_updates(
+                        self.saved_orders_statuses))
+                    # счетчики сохраняются только после успешного получения продаж, иначе изменения,
+                    # пропущенные из-за ошибки, не будут запрошены при следующем событии с теми же счетчиками.
+                    self.__last_orders_counters = counters
+                    return events
                 orders_list = self.account.get_sales()[1]  # todo добавить возможность реакции на подтверждение очень старых заказов
                 break
             except exceptions.RequestFailedError as e:
@@ -573,6 +718,49 @@ class Runner:
             elif order.status != self.saved_orders[order.id].status:
                 events.append(OrderStatusChangedEvent(self.__last_order_event_tag, order))
         self.saved_orders = now_orders
+        self.saved_orders_statuses = {order_id: order.status for order_id, order in now_orders.items()}
+        self.__last_orders_counters = counters
+        return events
+
+    def __parse_orders_statuses(self, statuses: dict[str, types.OrderStatuses],
+                                changed_orders: list[types.OrderShortcut]) -> list[NewOrderEvent |
+                                                                                   OrderStatusChangedEvent]:
+        """
+        Генерирует события по результату :meth:`FunPayAPI.account.Account.get_sales_updates` и обновляет
+        сохраненные заказы.
+
+        :param statuses: статусы всех заказов первой страницы продаж {ID заказа: статус}.
+        :type statuses: :obj:`dict` {:obj:`str`: :class:`FunPayAPI.common.enums.OrderStatuses`}
+
+        :param changed_orders: новые / изменившиеся заказы.
+        :type changed_orders: :obj:`list` of :class:`FunPayAPI.types.OrderShortcut`
+
+        :return: список событий, связанных с продажами.
+        :rtype: :obj:`list` of :class:`FunPayAPI.updater.events.NewOrderEvent`,
+            :class:`FunPayAPI.updater.events.OrderStatusChangedEvent`
+        """
+        events = []
+        if len(self.saved_orders_statuses) > len(statuses) or len(statuses) > 100:
+            logger.error(f"Что-то пошло не так при получении списка заказов.")
+            logger.debug(f"SAVED: {list(self.saved_orders_statuses.keys())}")
+            logger.debug(f"ORDERS_LIST ({len(statuses)}): {list(statuses.keys())}")
+            return events
+
+        changed = {order.id: order for order in changed_orders}
+        for order in changed_orders:
+            if order.id not in self.saved_orders_statuses:
+                events.append(NewOrderEvent(self.__last_order_event_tag, order))
+                if order.status == types.OrderStatuses.CLOSED:
+                    events.append(OrderStatusChangedEvent(self.__last_order_event_tag, order))
+            else:
+                events.append(OrderStatusChangedEvent(self.__last_order_event_tag, order))
+
+        saved_orders = {}
+        for order_id in statuses:
+            if order := changed.get(order_id) or self.saved_orders.get(order_id):
+                saved_orders[order_id] = order
+        self.saved_orders = saved_orders
+        self.saved_orders_statuses = statuses
         return events
 
     def update_last_message(self, chat_id: int, message_id: int, message_text: str | None):
@@ -606,19 +794,33 @@ class Runner:
             self.by_bot_ids[chat_id].append(message_id)
 
     def listen(self, requests_delay: int | float = 6.0,
-               ignore_exceptions: bool = True) -> Generator[InitialChatEvent | ChatsListChangedEvent |
-                                                            LastChatMessageChangedEvent | NewMessageEvent |
-                                                            InitialOrderEvent | OrdersListChangedEvent | NewOrderEvent |
-                                                            OrderStatusChangedEvent]:
+               ignore_exceptions: bool = True, min_delay: int | float | None = None,
+               max_delay: int | float | None = None,
+               stop: threading.Event | None = None) -> Generator[InitialChatEvent | ChatsListChangedEvent |
+                                                                  LastChatMessageChangedEvent | NewMessageEvent |
+                                                                  InitialOrderEvent | OrdersListChangedEvent |
+                                                                  NewOrderEvent | OrderStatusChangedEvent]:
         """
         Бесконечно отправляет запросы для получения новых событий.
 
         :param requests_delay: задержка между запросами (в секундах).
         :type requests_delay: :obj:`int` or :obj:`float`, опционально
 
+        :param min_delay: минимальная задержка между запросами при активности в чатах / заказах (в секундах).
+            Если не указана, равна `requests_delay`. См. :class:`AdaptivePollDelay`.
+        :type min_delay: :obj:`int` or :obj:`float` or :obj:`None`, опционально
+
+        :param max_delay: максимальная задержка между запросами при простое и ответах 429 / 503 (в секундах).
+            Если не указана, равна `requests_delay`. См. :class:`AdaptivePollDelay`.
+        :type max_delay: :obj:`int` or :obj:`float` or :obj:`None`, опционально
+
         :param ignore_exceptions: игнорировать ошибки?
         :type ignore_exceptions: :obj:`bool`, опционально
 
+        :param stop: событие остановки: если установлено, генератор завершается, не дожидаясь окончания задержки
+            между запросами.
+        :type stop: :class:`threading.Event` or :obj:`None`, опционально
+
         :return: генератор событий FunPay.
         :rtype: :obj:`Generator` of :class:`FunPayAPI.updater.events.InitialChatEvent`,
             :class:`FunPayAPI.updater.events.ChatsListChangedEvent`,
@@ -629,8 +831,12 @@ class Runner:
             :class:`FunPayAPI.updater.events.OrderStatusChangedEvent`
         """
 
-        while True:
+        self.poll_delay = AdaptivePollDelay(requests_delay, min_delay, max_delay)
+        sleep = stop.wait if stop is not None else time.sleep
+        while stop is None or not stop.is_set():
             start_time = time.time()
+            self.__polls_times = [i for i in self.__polls_times if start_time - i < 60] + [start_time]
+            active = False
             try:
                 if not (self.__orders_counters and self.__chat_bookmarks):
                     updates_objects = self.get_updates()["objects"]
@@ -653,6 +859,13 @@ class Runner:
                     # если сделали запрос и не получили эвентов, то сохраненные чаты нам больше не понадобятся
                     self.__chat_nodes = {}
                 for event in events:
+                    if isinstance(event, (NewMessageEvent, NewOrderEvent)):
+                        active = True
+                    lag = time.time() - event.time
+                    self.__events_count += 1
+                    self.__events_lag_sum += lag
+                    metrics.EVENTS.inc(event.type.name)
+                    metrics.EVENT_LAG.observe(value=lag)
                     yield event
             except Exception as e:
                 if not ignore_exceptions:
@@ -662,9 +875,27 @@ class Runner:
                                  "(ничего страшного, если это сообщение появляется нечасто).")
                     logger.debug("TRACEBACK", exc_info=True)
             iteration_time = time.time() - start_time
-            if time.time() - self.account.last_429_err_time > 60:
-                rt = requests_delay - iteration_time
+            throttle_time = max(self.account.last_429_err_time, self.account.last_503_err_time)
+            delay = self.poll_delay.update(active, throttle_time)
+            metrics.POLL_DELAY.set(value=delay)
+            if time.time() - throttle_time > 60:
+                rt = delay - iteration_time
                 if rt > 0:
-                    time.sleep(rt)
+                    sleep(rt)
             else:
-                time.sleep(requests_delay)
+                sleep(delay)
+
+    def get_poll_stats(self) -> dict:
+        """
+        Возвращает статистику опроса FunPay в :meth:`listen`.
+
+        :return: словарь {"delay": текущая задержка между запросами (сек.), "polls_per_minute": кол-во итераций за
+            последнюю минуту, "events": кол-во отданных событий, "events_lag_sum": суммарное время между созданием
+            события и его передачей обработчикам (сек.)}.
+        :rtype: :obj:`dict`
+        """
+        now = time.time()
+        return {"delay": self.poll_delay.delay if self.poll_delay else None,
+                "polls_per_minute": len([i for i in self.__polls_times if now - i < 60]),
+                "events": self.__events_count,
+                "events_lag_sum": self.__events_lag_sum}
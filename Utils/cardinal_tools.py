@@ -12,9 +12,11 @@ if TYPE_CHECKING:
 import FunPayAPI.types
 
 from datetime import datetime
+from typing import BinaryIO, Callable, Iterable, TypeVar
 import Utils.exceptions
-import itertools
 import threading
+import tempfile
+import shutil
 import psutil
 import json
 import sys
@@ -31,6 +33,14 @@ _ = localizer.translate
 
 _products_file_locks: dict[str, threading.Lock] = {}
 _products_file_locks_guard = threading.Lock()
+_PRODUCTS_CHUNK_SIZE = 1024 * 1024
+_products_counts: dict[str, tuple[int, int, int]] = {}
+"""Кэш кол-ва товаров {нормализованный путь: (mtime_ns, размер, кол-во товаров)}."""
+T = TypeVar("T")
+
+
+def _normalize_products_path(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
 
 
 def get_products_file_lock(path: str) -> threading.Lock:
@@ -43,16 +53,126 @@ def get_products_file_lock(path: str) -> threading.Lock:
 
     :return: Lock, специфичный для данного файла.
     """
-    normalized = os.path.normcase(os.path.abspath(path))
+    normalized = _normalize_products_path(path)
     with _products_file_locks_guard:
         if normalized not in _products_file_locks:
             _products_file_locks[normalized] = threading.Lock()
         return _products_file_locks[normalized]
 
 
+def _split_lines(chunks: Iterable[bytes]) -> Iterable[list[bytes]]:
+    """
+    Разбивает поток байтов на строки, не загружая его в память целиком.
+    Переносы строк \\n, \\r\\n и \\r учитываются так же, как при чтении файла в текстовом режиме.
+
+    :param chunks: куски потока байтов.
+
+    :return: генератор списков строк (по одному списку на кусок, пустые строки не удаляются).
+    """
+    tail = b""
+    for chunk in chunks:
+        data = tail + chunk
+        # \r в конце куска может оказаться первой половиной \r\n - оставляем его до следующего куска.
+        end = len(data) - 1 if data.endswith(b"\r") else len(data)
+        lines = data[:end].replace(b"\r\n", b"\n").replace(b"\r", b"\n").split(b"\n")
+        tail = lines.pop() + data[end:]
+        yield lines
+    if tail := tail.strip(b"\r"):
+        yield [tail]
+
+
+def _count_lines(chunks: Iterable[bytes]) -> int:
+    """
+    Считает кол-во непустых строк в потоке байтов, не загружая его в память целиком.
+
+    :param chunks: куски потока байтов.
+
+    :return: кол-во непустых строк.
+    """
+    return sum(len(lines) - lines.count(b"") for lines in _split_lines(chunks))
+
+
+def _iter_chunks(f: BinaryIO) -> Iterable[bytes]:
+    while chunk := f.read(_PRODUCTS_CHUNK_SIZE):
+        yield chunk
+
+
+def _replace_file(path: str, write: Callable[[BinaryIO], T]) -> T:
+    """
+    Атомарно перезаписывает файл: данные пишутся во временный файл в той же папке, который затем заменяет
+    исходный (с сохранением прав доступа исходного файла). Если во время записи программа упадет, исходный
+    файл останется нетронутым.
+
+    write должна закрыть исходный файл до возврата: на Windows открытый файл нельзя заменить.
+
+    :param path: путь до файла.
+    :param write: функция, записывающая новое содержимое в переданный бинарный файл.
+
+    :return: результат выполнения write.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            result = write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return result
+
+
+def _get_cached_products_count(path: str) -> int | None:
+    """
+    Возвращает кол-во товаров из кэша, если файл не изменился с момента подсчета.
+    Вызывать под блокировкой файла.
+
+    :param path: путь до файла с товарами.
+
+    :return: кол-во товаров или None, если в кэше нет актуального значения.
+    """
+    cached = _products_counts.get(_normalize_products_path(path))
+    if cached is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if (stat.st_mtime_ns, stat.st_size) != cached[:2]:
+        return None
+    return cached[2]
+
+
+def _cache_products_count(path: str, count: int) -> None:
+    """
+    Сохраняет в кэш кол-во товаров для текущего состояния файла. Вызывать под блокировкой файла.
+
+    :param path: путь до файла с товарами.
+    :param count: кол-во товаров.
+    """
+    stat = os.stat(path)
+    _products_counts[_normalize_products_path(path)] = (stat.st_mtime_ns, stat.st_size, count)
+
+
+def invalidate_products_count(path: str) -> None:
+    """
+    Удаляет кол-во товаров указанного файла из кэша.
+    Необходимо вызывать после изменения товарного файла в обход :func:`get_products` / :func:`add_products`.
+
+    :param path: путь до файла с товарами.
+    """
+    _products_counts.pop(_normalize_products_path(path), None)
+
+
 def count_products(path: str) -> int:
     """
     Считает кол-во товара в указанном файле.
+    Результат кэшируется до изменения файла (по времени изменения и размеру файла).
 
     :param path: путь до файла с товарами.
 
@@ -60,12 +180,14 @@ def count_products(path: str) -> int:
     """
     with get_products_file_lock(path):
         if not os.path.exists(path):
+            invalidate_products_count(path)
             return 0
-        with open(path, "r", encoding="utf-8") as f:
-            products = f.read()
-    products = products.split("\n")
-    products = list(itertools.filterfalse(lambda el: not el, products))
-    return len(products)
+        if (count := _get_cached_products_count(path)) is not None:
+            return count
+        with open(path, "rb") as f:
+            count = _count_lines(_iter_chunks(f))
+        _cache_products_count(path, count)
+        return count
 
 
 def cache_blacklist(blacklist: list[str]) -> None:
@@ -260,11 +382,13 @@ def load_pinned_plugins() -> list[str]:
 def cache_old_users(old_users: dict[int, float]):
     """
     Сохраняет в кэш список пользователей, которые уже писали на аккаунт.
+    Вызывающий код должен держать :attr:`cardinal.Cardinal.old_users_lock`, если old_users может изменяться
+    из других потоков.
     """
     if not os.path.exists("storage/cache"):
         os.makedirs("storage/cache")
-    with open(f"storage/cache/old_users.json", "w", encoding="utf-8") as f:
-        f.write(json.dumps(old_users, ensure_ascii=False))
+    data = json.dumps(old_users, ensure_ascii=False).encode("utf-8")
+    _replace_file("storage/cache/old_users.json", lambda f: f.write(data))
 
 
 def load_old_users(greetings_cooldown: float) -> dict[int, float]:
@@ -291,6 +415,76 @@ def load_old_users(greetings_cooldown: float) -> dict[int, float]:
     return users
 
 
+def cache_raise_times(raise_time: dict[int, float], raised_time: dict[int, int]) -> None:
+    """
+    Кэширует время следующего и последнего поднятия лотов категорий.
+
+    :param raise_time: время следующего поднятия {ID категории: время}.
+    :param raised_time: время последнего поднятия {ID категории: время}.
+    """
+    if not os.path.exists("storage/cache"):
+        os.makedirs("storage/cache")
+
+    data = json.dumps({"raise_time": raise_time, "raised_time": raised_time}, indent=4).encode("utf-8")
+    _replace_file("storage/cache/raise_times.json", lambda f: f.write(data))
+
+
+def load_raise_times() -> tuple[dict[int, float], dict[int, int]]:
+    """
+    Загружает из кэша время следующего и последнего поднятия лотов категорий.
+
+    :return: (время следующего поднятия {ID категории: время}, время последнего поднятия {ID категории: время}).
+    """
+    if not os.path.exists("storage/cache/raise_times.json"):
+        return {}, {}
+
+    with open("storage/cache/raise_times.json", "r", encoding="utf-8") as f:
+        data = f.read()
+
+    try:
+        data = json.loads(data)
+        raise_time = {int(k): float(v) for k, v in data.get("raise_time", {}).items()}
+        raised_time = {int(k): int(v) for k, v in data.get("raised_time", {}).items()}
+    except (json.decoder.JSONDecodeError, AttributeError, ValueError, TypeError):
+        return {}, {}
+    return raise_time, raised_time
+
+
+def cache_chats_directory(account_id: int, directory: dict[int, list[str | None | float]]) -> None:
+    """
+    Кэширует справочник известных чатов аккаунта.
+
+    :param account_id: ID аккаунта.
+    :param directory: справочник чатов {ID чата: [название, время последнего обращения]}.
+    """
+    if not os.path.exists("storage/cache"):
+        os.makedirs("storage/cache")
+
+    data = json.dumps(directory, ensure_ascii=False).encode("utf-8")
+    _replace_file(f"storage/cache/chats_directory_{account_id}.json", lambda f: f.write(data))
+
+
+def load_chats_directory(account_id: int) -> dict[int, list[str | None | float]]:
+    """
+    Загружает из кэша справочник известных чатов аккаунта.
+
+    :param account_id: ID аккаунта.
+
+    :return: справочник чатов {ID чата: [название, время последнего обращения]}.
+    """
+    if not os.path.exists(f"storage/cache/chats_directory_{account_id}.json"):
+        return {}
+
+    with open(f"storage/cache/chats_directory_{account_id}.json", "r", encoding="utf-8") as f:
+        data = f.read()
+
+    try:
+        data = json.loads(data)
+        return {int(k): [v[0], float(v[1])] for k, v in data.items()}
+    except (json.decoder.JSONDecodeError, AttributeError, ValueError, TypeError, IndexError):
+        return {}
+
+
 def create_greeting_text(cardinal: Cardinal):
     """
     Генерирует приветствие для вывода в консоль после загрузки данных о пользователе.
@@ -375,33 +569,48 @@ def get_products(path: str, amount: int = 1) -> list[list[str] | int] | None:
     """
     Берет из товарного файла товар/-ы, удаляет их из товарного файла.
 
+    Читаются только первые строки файла, оставшаяся часть копируется как есть, после чего файл атомарно
+    заменяется (см. :func:`_replace_file`).
+
     :param path: путь до файла с товарами.
     :param amount: кол-во товара.
 
     :return: [[Товар/-ы], оставшееся кол-во товара]
     """
     with get_products_file_lock(path):
-        with open(path, "r", encoding="utf-8") as f:
-            products = f.read()
-
-        products = products.split("\n")
-
-        # Убираем пустые элементы
-        products = list(itertools.filterfalse(lambda el: not el, products))
-
-        if not products:
-            raise Utils.exceptions.NoProductsError(path)
-
-        elif len(products) < amount:
-            raise Utils.exceptions.NotEnoughProductsError(path, len(products), amount)
-
-        got_products = products[:amount]
-        save_products = products[amount:]
-        amount = len(save_products)
-
-        with open(path, "w", encoding="utf-8") as f:
-            f.write("\n".join(save_products))
-
+        def write_rest(new_file: BinaryIO) -> list[str | int]:
+            with open(path, "rb") as f:
+                got_products = []
+                leftover = []
+                while len(got_products) < amount and (line := f.readline()):
+                    parts = line.splitlines()
+                    for index, part in enumerate(parts):
+                        if not part:
+                            continue
+                        if len(got_products) == amount:
+                            leftover = parts[index:]
+                            break
+                        got_products.append(part.decode("utf-8"))
+
+                if not got_products:
+                    raise Utils.exceptions.NoProductsError(path)
+
+                elif len(got_products) < amount:
+                    raise Utils.exceptions.NotEnoughProductsError(path, len(got_products), amount)
+
+                left = len([i for i in leftover if i])
+                if leftover:
+                    new_file.write(b"\n".join(leftover) + b"\n")
+
+                def copy():
+                    for chunk in _iter_chunks(f):
+                        new_file.write(chunk)
+                        yield chunk
+
+                return [got_products, left + _count_lines(copy())]
+
+        got_products, amount = _replace_file(path, write_rest)
+        _cache_products_count(path, amount)
         return [got_products, amount]
 
 
@@ -415,13 +624,110 @@ def add_products(path: str, products: list[str], at_zero_position=False):
     """
     with get_products_file_lock(path):
         if not at_zero_position:
+            count = _get_cached_products_count(path)
             with open(path, "a", encoding="utf-8") as f:
                 f.write("\n" + "\n".join(products))
+            if count is not None:
+                _cache_products_count(path, count + len([i for i in products if i]))
+            else:
+                invalidate_products_count(path)
         else:
-            with open(path, "r", encoding="utf-8") as f:
-                text = f.read()
-            with open(path, "w", encoding="utf-8") as f:
-                f.write("\n".join(products) + "\n" + text)
+            def write(new_file: BinaryIO) -> int:
+                head = ("\n".join(products) + "\n").encode("utf-8")
+                new_file.write(head)
+                if not os.path.exists(path):
+                    return _count_lines([head])
+
+                def copy():
+                    yield head
+                    with open(path, "rb") as f:
+                        for chunk in _iter_chunks(f):
+                            new_file.write(chunk)
+                            yield chunk
+
+                return _count_lines(copy())
+
+            _cache_products_count(path, _replace_file(path, write))
+
+
+def ingest_products(path: str, source: BinaryIO | Iterable[bytes], max_length: int = 4096,
+                    dedupe: bool = True) -> dict[str, int | list]:
+    """
+    Добавляет товары в конец товарного файла, пропуская некорректные строки и (если dedupe) дубликаты
+    (уже существующие в файле и повторяющиеся в источнике).
+
+    Источник и файл читаются кусками. Переносы строк (\\n, \\r\\n, \\r) приводятся к \\n, пробелы по краям
+    строк и BOM в начале источника удаляются. Для поиска дубликатов в памяти хранятся только хэши строк,
+    а не сами строки. Файл заменяется атомарно (см. :func:`_replace_file`).
+
+    :param path: путь до файла с товарами (создается, если не существует).
+    :param source: источник товаров: файл, открытый в бинарном режиме, или куски байтов.
+    :param max_length: максимальная длина товара (в байтах).
+    :param dedupe: пропускать ли дубликаты. Без этого товары добавляются как есть (например, несколько
+        одинаковых товаров, добавленных вручную).
+
+    :return: отчет {"added": добавлено товаров, "duplicates": пропущено дубликатов,
+        "rejected": отклонено строк (не UTF-8, нулевой байт, длиннее max_length),
+        "rejected_lines": номера первых 20 отклоненных строк источника, "total": товаров в файле}.
+    """
+    chunks = _iter_chunks(source) if hasattr(source, "read") else source
+    report = {"added": 0, "duplicates": 0, "rejected": 0, "rejected_lines": [], "total": 0}
+    with get_products_file_lock(path):
+        def write(new_file: BinaryIO) -> int:
+            seen: set[int] = set()
+            existing = 0
+            if os.path.exists(path):
+                last = b"\n"
+
+                def copy():
+                    nonlocal last
+                    with open(path, "rb") as f:
+                        for chunk in _iter_chunks(f):
+                            new_file.write(chunk)
+                            last = chunk[-1:]
+                            yield chunk
+
+                # Товаром считается любая непустая строка (как в _count_lines), в т.ч. из одних пробелов.
+                for lines in _split_lines(copy()):
+                    existing += len(lines) - lines.count(b"")
+                    if dedupe:
+                        seen.update(hash(i) for line in lines if (i := line.strip()))
+                if last != b"\n":
+                    new_file.write(b"\n")
+
+            line_number = 0
+            for lines in _split_lines(chunks):
+                batch = []
+                for line in lines:
+                    line_number += 1
+                    if line_number == 1:
+                        line = line.removeprefix(b"\xef\xbb\xbf")
+                    if not (line := line.strip()):
+                        continue
+                    try:
+                        valid = len(line) <= max_length and b"\x00" not in line and line.decode("utf-8")
+                    except UnicodeDecodeError:
+                        valid = False
+                    if not valid:
+                        report["rejected"] += 1
+                        if len(report["rejected_lines"]) < 20:
+                            report["rejected_lines"].append(line_number)
+                        continue
+                    if dedupe:
+                        line_hash = hash(line)
+                        if line_hash in seen:
+                            report["duplicates"] += 1
+                            continue
+                        seen.add(line_hash)
+                    batch.append(line)
+                if batch:
+                    new_file.write(b"\n".join(batch) + b"\n")
+                    report["added"] += len(batch)
+            return existing + report["added"]
+
+        report["total"] = _replace_file(path, write)
+        _cache_products_count(path, report["total"])
+    return report
 
 
 def safe_text(text: str):
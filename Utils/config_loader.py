@@ -10,6 +10,7 @@ from Utils.exceptions import (ParamNotFoundError, EmptyValueError, ValueNotValid
                               ConfigParseError, ProductsFileNotFoundError, NoProductVarError,
                               SubCommandAlreadyExists, DuplicateSectionErrorWrapper)
 from Utils.cardinal_tools import hash_password, build_proxy
+from Utils.lot_matcher import LotNameMatcher
 
 
 def check_param(param_name: str, section: SectionProxy, valid_values: list[str | None] | None = None,
@@ -43,15 +44,54 @@ def check_param(param_name: str, section: SectionProxy, valid_values: list[str |
     return value
 
 
-def create_config_obj(config_path: str) -> ConfigParser:
+class AutoDeliveryConfig(ConfigParser):
+    """
+    Конфиг автовыдачи с индексом названий секций для быстрого поиска секции по названию лота.
+    Индекс строится при первом поиске и сбрасывается при добавлении / удалении / чтении секций.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.__matcher: LotNameMatcher | None = None
+        super().__init__(*args, **kwargs)
+
+    def add_section(self, section: str) -> None:
+        super().add_section(section)
+        self.__matcher = None
+
+    def remove_section(self, section: str) -> bool:
+        existed = super().remove_section(section)
+        self.__matcher = None
+        return existed
+
+    def _read(self, fp, fpname):
+        super()._read(fp, fpname)
+        self.__matcher = None
+
+    def get_lot_section(self, lot_name: str) -> SectionProxy | None:
+        """
+        Ищет первую секцию, название которой входит в название лота.
+
+        :param lot_name: название лота.
+
+        :return: секцию конфига или None.
+        """
+        matcher = self.__matcher
+        if matcher is None:
+            matcher = self.__matcher = LotNameMatcher(self.sections())
+        section = matcher.find(lot_name)
+        return self[section] if section is not None and self.has_section(section) else None
+
+
+def create_config_obj(config_path: str, config_class: type[ConfigParser] = ConfigParser) -> ConfigParser:
     """
     Создает объект конфига с нужными настройками.
 
     :param config_path: путь до файла конфига.
+    :param config_class: класс объекта конфига.
 
     :return: объект конфига.
     """
-    config = ConfigParser(delimiters=(":",), interpolation=None)
+    config = config_class(delimiters=(":",), interpolation=None)
     config.optionxform = str
     config.read_file(codecs.open(config_path, "r", "utf8"))
     return config
@@ -86,7 +126,8 @@ def load_main_config(config_path: str):
             "token": "any+empty",
             "secretKeyHash": "any",
             "proxy": "any+empty",
-            "blockLogin": ["0", "1"]
+            "blockLogin": ["0", "1"],
+            "notificationsEditWindow": [str(i) for i in range(0, 3601)]
         },
 
         "BlockList": {
@@ -143,6 +184,13 @@ def load_main_config(config_path: str):
         "Other": {
             "watermark": "any+empty",
             "requestsDelay": [str(i) for i in range(1, 101)],
+            "requestsDelayMin": [str(i) for i in range(1, 101)],
+            "requestsDelayMax": [str(i) for i in range(1, 101)],
+            "handlersLanes": [str(i) for i in range(1, 33)],
+            "handlerTimeout": [str(i) for i in range(1, 601)],
+            "metricsPort": [str(i) for i in range(0, 65536)],
+            "metricsHost": "any",
+            "structuredLogs": ["0", "1"],
             "language": ["ru", "en", "uk"]
         }
     }
@@ -203,6 +251,11 @@ def load_main_config(config_path: str):
                 config.set("Telegram", "blockLogin", "0")
                 with open("configs/_main.cfg", "w", encoding="utf-8") as f:
                     config.write(f)
+            elif section_name == "Telegram" and param_name == "notificationsEditWindow" and \
+                    param_name not in config[section_name]:
+                config.set("Telegram", "notificationsEditWindow", "0")
+                with open("configs/_main.cfg", "w", encoding="utf-8") as f:
+                    config.write(f)
             elif section_name == "Telegram" and param_name == "secretKeyHash" and \
                     param_name not in config[section_name]:
                 config.set(section_name, "secretKeyHash", hash_password(config[section_name]["secretKey"]))
@@ -241,6 +294,29 @@ def load_main_config(config_path: str):
                 config.set("Telegram", "proxy", "")
                 with open("configs/_main.cfg", "w", encoding="utf-8") as f:
                     config.write(f)
+            elif section_name == "Other" and param_name in ("requestsDelayMin", "requestsDelayMax") and \
+                    param_name not in config[section_name]:
+                config.set(section_name, param_name, config[section_name].get("requestsDelay", "4"))
+                with open("configs/_main.cfg", "w", encoding="utf-8") as f:
+                    config.write(f)
+            elif section_name == "Other" and param_name in ("handlersLanes", "handlerTimeout") and \
+                    param_name not in config[section_name]:
+                # для уже существующих конфигов события по умолчанию обрабатываются в одном канале (как раньше)
+                config.set(section_name, param_name, "1" if param_name == "handlersLanes" else "30")
+                with open("configs/_main.cfg", "w", encoding="utf-8") as f:
+                    config.write(f)
+            elif section_name == "Other" and param_name == "metricsPort" and param_name not in config[section_name]:
+                config.set(section_name, param_name, "0")
+                with open("configs/_main.cfg", "w", encoding="utf-8") as f:
+                    config.write(f)
+            elif section_name == "Other" and param_name == "metricsHost" and param_name not in config[section_name]:
+                config.set(section_name, param_name, "127.0.0.1")
+                with open("configs/_main.cfg", "w", encoding="utf-8") as f:
+                    config.write(f)
+            elif section_name == "Other" and param_name == "structuredLogs" and param_name not in config[section_name]:
+                config.set(section_name, param_name, "0")
+                with open("configs/_main.cfg", "w", encoding="utf-8") as f:
+                    config.write(f)
 
             # END OF UPDATE
 
@@ -317,7 +393,7 @@ def load_raw_auto_response_config(config_path: str):
     return config
 
 
-def load_auto_delivery_config(config_path: str):
+def load_auto_delivery_config(config_path: str) -> AutoDeliveryConfig:
     """
     Парсит и проверяет на правильность конфиг автовыдачи.
 
@@ -326,7 +402,7 @@ def load_auto_delivery_config(config_path: str):
     :return: спарсеный конфиг товаров для автовыдачи.
     """
     try:
-        config = create_config_obj(config_path)
+        config = create_config_obj(config_path, AutoDeliveryConfig)
     except configparser.DuplicateSectionError as e:
         raise ConfigParseError(config_path, e.section, DuplicateSectionErrorWrapper())
 
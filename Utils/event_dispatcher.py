@@ -0,0 +1,148 @@
+"""
+В данном модуле описан диспетчер событий FunPay, который распределяет события по каналам (потокам):
+события одного собеседника (чата / заказа) обрабатываются по порядку в одном канале,
+а события разных собеседников - параллельно в разных каналах.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable
+import threading
+import logging
+import queue
+import time
+
+if TYPE_CHECKING:
+    from cardinal import Cardinal
+    from FunPayAPI import Account
+
+from FunPayAPI.updater.events import *
+
+logger = logging.getLogger("FPC.event_dispatcher")
+
+
+def get_event_key(event: BaseEvent, account: Account | None = None) -> int | str | None:
+    """
+    Возвращает ключ, по которому событие закрепляется за каналом.
+
+    События сообщений, чатов и заказов одного пользователя получают один и тот же ключ - никнейм собеседника
+    (покупателя), поэтому, например, выдача товара по заказу и ответ на сообщение того же покупателя не выполняются
+    одновременно. Если никнейм в событии не указан, он берется из справочника чатов аккаунта по ID чата; если чат
+    неизвестен, ключом становится ID чата. События без чата / заказа
+    (например, :class:`FunPayAPI.updater.events.OrdersListChangedEvent`) получают ключ None.
+
+    :param event: событие.
+    :param account: аккаунт (для поиска никнейма собеседника в справочнике чатов).
+
+    :return: ключ события.
+    """
+    if isinstance(event, NewMessageEvent):
+        chat_id, name = event.message.chat_id, event.message.chat_name
+    elif isinstance(event, (InitialChatEvent, LastChatMessageChangedEvent)):
+        chat_id, name = event.chat.id, event.chat.name
+    elif isinstance(event, (InitialOrderEvent, NewOrderEvent, OrderStatusChangedEvent)):
+        chat_id, name = event.order.chat_id, event.order.buyer_username
+    else:
+        return None
+    if not name and account is not None and isinstance(chat_id, int) and (chat := account.get_chat_by_id(chat_id)):
+        name = chat.name
+    return name.lower() if name else chat_id
+
+
+class EventDispatcher:
+    """
+    Диспетчер событий FunPay.
+
+    :param cardinal: экземпляр кардинала.
+    :type cardinal: :class:`cardinal.Cardinal`
+
+    :param lanes: кол-во каналов (потоков обработки).
+    :type lanes: :obj:`int`
+
+    :param handler_timeout: время (в секундах), после которого выполняющийся хэндлер считается зависшим
+        (о нем пишется предупреждение в лог).
+    :type handler_timeout: :obj:`int` or :obj:`float`
+
+    :param max_queue: максимальное кол-во событий в очереди одного канала. Если очередь заполнена, поток получения
+        событий ждет, пока она освободится.
+    :type max_queue: :obj:`int`
+    """
+
+    def __init__(self, cardinal: Cardinal, lanes: int = 4, handler_timeout: int | float = 30,
+                 max_queue: int = 1000):
+        self.cardinal: Cardinal = cardinal
+        self.lanes_count: int = max(1, lanes)
+        """Кол-во каналов."""
+        self.handler_timeout: int | float = handler_timeout
+        """Время, после которого выполняющийся хэндлер считается зависшим."""
+        self.__queues: list[queue.Queue] = [queue.Queue(maxsize=max_queue) for _ in range(self.lanes_count)]
+        self.__processed: list[int] = [0] * self.lanes_count
+        self.__running: list[tuple[Callable, float] | None] = [None] * self.lanes_count
+        self.__reported: list[tuple[Callable, float] | None] = [None] * self.lanes_count
+        self.__threads: list[threading.Thread] = []
+
+    def start(self):
+        """
+        Запускает потоки каналов и поток проверки зависших хэндлеров.
+        """
+        if self.__threads:
+            return
+        for lane in range(self.lanes_count):
+            thread = threading.Thread(target=self.__lane_loop, args=(lane,), daemon=True, name=f"events-lane-{lane}")
+            thread.start()
+            self.__threads.append(thread)
+        threading.Thread(target=self.__watchdog_loop, daemon=True, name="events-watchdog").start()
+
+    def dispatch(self, handlers_list: list[Callable], event: BaseEvent):
+        """
+        Ставит событие в очередь канала, закрепленного за ключом события (см. :func:`get_event_key`).
+
+        :param handlers_list: хэндлеры события.
+        :param event: событие.
+        """
+        key = get_event_key(event, self.cardinal.account)
+        lane = hash(key) % self.lanes_count if key is not None else 0
+        self.__queues[lane].put((handlers_list, event))
+
+    def __lane_loop(self, lane: int):
+        lane_queue = self.__queues[lane]
+        while True:
+            handlers_list, event = lane_queue.get()
+            try:
+                self.cardinal.run_handlers(handlers_list, (self.cardinal, event), self.__set_running(lane))
+            finally:
+                self.__running[lane] = None
+                self.__processed[lane] += 1
+
+    def __set_running(self, lane: int) -> Callable[[Callable | None], None]:
+        def set_running(func: Callable | None):
+            self.__running[lane] = (func, time.time()) if func is not None else None
+        return set_running
+
+    def __watchdog_loop(self):
+        while True:
+            time.sleep(1)
+            now = time.time()
+            for lane in range(self.lanes_count):
+                running = self.__running[lane]
+                if running is None or running is self.__reported[lane] or now - running[1] < self.handler_timeout:
+                    continue
+                self.__reported[lane] = running
+                logger.warning(f"Хэндлер $YELLOW{self.cardinal.get_handler_name(running[0])}$RESET выполняется "  # locale
+                               f"уже $YELLOW{int(now - running[1])}$RESET сек. В очереди канала $YELLOW{lane}$RESET "  # locale
+                               f"ожидают $YELLOW{self.__queues[lane].qsize()}$RESET событий.")  # locale
+
+    def get_stats(self) -> list[dict]:
+        """
+        Возвращает статистику каналов.
+
+        :return: список словарей {"lane": номер канала, "queued": событий в очереди, "processed": обработано событий,
+            "running": выполняющийся хэндлер или None, "running_time": время его выполнения (сек.)}.
+        """
+        now = time.time()
+        result = []
+        for lane in range(self.lanes_count):
+            running = self.__running[lane]
+            result.append({"lane": lane, "queued": self.__queues[lane].qsize(), "processed": self.__processed[lane],
+                           "running": self.cardinal.get_handler_name(running[0]) if running else None,
+                           "running_time": round(now - running[1], 3) if running else 0})
+        return result
@@ -0,0 +1,116 @@
+"""
+В данном модуле описан профилировщик хэндлеров: кол-во вызовов, время выполнения (всего / p50 / p99) и кол-во
+ошибок каждого хэндлера в разрезе плагина и типа события.
+"""
+from __future__ import annotations
+
+from collections import deque
+import threading
+import json
+import os
+
+
+class HandlerStats:
+    """
+    Статистика одного хэндлера для одного типа события.
+    """
+    __slots__ = ("name", "plugin_uuid", "event_type", "calls", "errors", "total_time", "max_time", "samples")
+
+    def __init__(self, name: str, plugin_uuid: str | None, event_type: str, samples_limit: int):
+        self.name: str = name
+        self.plugin_uuid: str | None = plugin_uuid
+        self.event_type: str = event_type
+        self.calls: int = 0
+        self.errors: int = 0
+        self.total_time: float = 0
+        self.max_time: float = 0
+        self.samples: deque[float] = deque(maxlen=samples_limit)
+        """Время последних вызовов (для перцентилей)."""
+
+    def percentile(self, q: float) -> float:
+        """
+        Возвращает перцентиль времени выполнения по последним вызовам.
+
+        :param q: перцентиль (от 0 до 1).
+        """
+        if not self.samples:
+            return 0
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "plugin_uuid": self.plugin_uuid, "event_type": self.event_type,
+                "calls": self.calls, "errors": self.errors, "total": round(self.total_time, 6),
+                "p50": round(self.percentile(0.5), 6), "p99": round(self.percentile(0.99), 6),
+                "max": round(self.max_time, 6)}
+
+
+class HandlersProfiler:
+    """
+    Профилировщик хэндлеров. Пока он выключен, :meth:`cardinal.Cardinal.run_handlers` не вызывает
+    :meth:`record` (проверяется только флаг :attr:`enabled`).
+
+    :param samples_limit: сколько последних вызовов каждого хэндлера хранить для расчета перцентилей.
+    :type samples_limit: :obj:`int`, опционально
+    """
+
+    def __init__(self, samples_limit: int = 1000):
+        self.enabled: bool = False
+        """Включен ли профилировщик."""
+        self.samples_limit: int = samples_limit
+        self.__stats: dict[tuple[str, str | None, str], HandlerStats] = {}
+        self.__lock = threading.Lock()
+
+    def record(self, name: str, plugin_uuid: str | None, event_type: str, duration: float, failed: bool):
+        """
+        Записывает результат вызова хэндлера.
+
+        :param name: название хэндлера.
+        :param plugin_uuid: UUID плагина, к которому относится хэндлер (None для встроенных хэндлеров).
+        :param event_type: тип события.
+        :param duration: время выполнения (в секундах).
+        :param failed: завершился ли хэндлер ошибкой.
+        """
+        key = (name, plugin_uuid, event_type)
+        with self.__lock:
+            stats = self.__stats.get(key)
+            if stats is None:
+                stats = self.__stats[key] = HandlerStats(name, plugin_uuid, event_type, self.samples_limit)
+            stats.calls += 1
+            stats.errors += failed
+            stats.total_time += duration
+            stats.max_time = max(stats.max_time, duration)
+            stats.samples.append(duration)
+
+    def get_stats(self) -> list[dict]:
+        """
+        Возвращает статистику хэндлеров, отсортированную по суммарному времени выполнения.
+
+        :return: список словарей {"name", "plugin_uuid", "event_type", "calls", "errors", "total", "p50", "p99",
+            "max"} (время в секундах).
+        """
+        with self.__lock:
+            stats = [i.to_dict() for i in self.__stats.values()]
+        return sorted(stats, key=lambda x: x["total"], reverse=True)
+
+    def reset(self):
+        """
+        Очищает статистику.
+        """
+        with self.__lock:
+            self.__stats.clear()
+
+    def dump(self, path: str = "storage/cache/handlers_profile.json") -> str:
+        """
+        Сохраняет статистику в JSON файл.
+
+        :param path: путь до файла.
+
+        :return: путь до файла.
+        """
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.get_stats(), indent=4, ensure_ascii=False))
+        return path
@@ -0,0 +1,146 @@
+"""
+В данном модуле написаны инструменты для чтения файлов лога: чтение с конца блоками (без загрузки всего файла
+в память), поиск последних ошибок и сжатие логов для отправки.
+"""
+from __future__ import annotations
+
+from typing import Generator, BinaryIO
+import tarfile
+import gzip
+import io
+import os
+import re
+
+from Utils import logger as logger_tools
+
+RECORD_SEPARATOR = b"\n["
+TRACEBACK_MARK = b": TRACEBACK"
+"""Текст записи с трейсбеком. После него идет перевод строки ("\\n" или "\\r\\n" в логах, записанных на Windows)."""
+
+
+def _rfind_traceback_mark(buffer: bytes) -> int:
+    """
+    Ищет последнюю запись "TRACEBACK" в буфере.
+
+    :param buffer: буфер.
+
+    :return: смещение :data:`TRACEBACK_MARK` или -1, если записи нет.
+    """
+    index = buffer.rfind(TRACEBACK_MARK)
+    while index != -1 and not buffer.startswith((b"\n", b"\r\n"), index + len(TRACEBACK_MARK)):
+        index = buffer.rfind(TRACEBACK_MARK, 0, index)
+    return index
+
+
+def iter_errors_backward(f: BinaryIO, block_size: int = 256 * 1024) -> Generator[bytes, None, None]:
+    """
+    Генератор ошибок из файла лога от последней к первой. Ошибка - запись "TRACEBACK" с трейсбеком вместе
+    с предыдущей записью (текстом ошибки), переводы строк "\\r\\n" заменяются на "\\n". Файл читается с конца
+    блоками по block_size байт, в памяти хранится только непросмотренная часть последнего блока.
+
+    :param f: файл, открытый в бинарном режиме.
+    :param block_size: размер блока (в байтах).
+
+    :return: генератор ошибок.
+    """
+    position = f.seek(0, os.SEEK_END)
+    buffer = b""
+    while True:
+        index = _rfind_traceback_mark(buffer)
+        if index != -1:
+            record_start = buffer.rfind(RECORD_SEPARATOR, 0, index) + 1
+            error_start = buffer.rfind(RECORD_SEPARATOR, 0, max(record_start - 1, 0)) + 1
+            if (record_start and error_start) or position == 0:
+                end = buffer.find(RECORD_SEPARATOR, index)
+                error = buffer[error_start:end if end != -1 else len(buffer)]
+                yield error.rstrip(b"\r\n").replace(b"\r\n", b"\n")
+                buffer = buffer[:error_start]
+                continue
+        elif position == 0:
+            return
+        else:
+            # в более ранних блоках нужен только конец записи, начатой до этого буфера
+            buffer = buffer[:buffer.find(RECORD_SEPARATOR) + 1 or len(buffer)]
+        size = min(block_size, position)
+        position -= size
+        f.seek(position)
+        buffer = f.read(size) + buffer
+
+
+def get_last_errors(path: str = "logs/log.log", n: int = 1) -> list[str]:
+    """
+    Возвращает последние ошибки из файла лога (запись с трейсбеком вместе с предыдущей записью - текстом ошибки).
+
+    Если файл пишется текущим процессом и в индексе ошибок (:class:`Utils.logger.ErrorIndexingFileHandler`)
+    достаточно записей, ошибки читаются по смещениям из индекса. Иначе файл читается с конца блоками,
+    пока не найдется n ошибок.
+
+    :param path: путь до файла лога.
+    :param n: кол-во ошибок.
+
+    :return: список текстов ошибок (от новых к старым).
+    """
+    handler = logger_tools.FILE_HANDLER
+    if handler is not None and os.path.abspath(path) == handler.baseFilename:
+        entries = list(handler.errors_index)[-n:]
+        if len(entries) == n or not handler.indexed_from:
+            with open(path, "rb") as f:
+                result = []
+                for start, end in reversed(entries):
+                    f.seek(start)
+                    result.append(f.read(end - start).decode("utf-8", errors="replace").rstrip("\r\n")
+                                  .replace("\r\n", "\n"))
+                return result
+
+    result = []
+    with open(path, "rb") as f:
+        for error in iter_errors_backward(f):
+            result.append(error.decode("utf-8", errors="replace"))
+            if len(result) >= n:
+                break
+    return result
+
+
+def compress_log(path: str = "logs/log.log") -> io.BytesIO:
+    """
+    Сжимает файл лога (gzip), не загружая его в память целиком.
+
+    :param path: путь до файла лога.
+
+    :return: сжатый файл (в памяти), name - имя файла.
+    """
+    result = io.BytesIO()
+    with open(path, "rb") as f, gzip.GzipFile(filename=os.path.basename(path), mode="wb", fileobj=result) as gz:
+        while chunk := f.read(1024 * 1024):
+            gz.write(chunk)
+    result.name = f"{os.path.basename(path)}.gz"
+    result.seek(0)
+    return result
+
+
+def compress_logs(folder: str = "logs", max_size: int = 45 * 1024 * 1024) -> io.BytesIO:
+    """
+    Сжимает текущий и ротированные файлы лога (от новых к старым) в архив tar.gz.
+    Файлы добавляются, пока суммарный размер исходных файлов не превышает max_size
+    (текущий файл добавляется всегда).
+
+    :param folder: папка с логами.
+    :param max_size: максимальный суммарный размер исходных файлов (в байтах).
+
+    :return: архив (в памяти), name - имя файла.
+    """
+    files = [i for i in os.listdir(folder) if i == "log.log" or re.fullmatch(r"log\.log\.\d+", i)]
+    files.sort(key=lambda x: int(x.rsplit(".", 1)[1]) if x != "log.log" else 0)
+    result = io.BytesIO()
+    total = 0
+    with tarfile.open(fileobj=result, mode="w:gz") as tar:
+        for file in files:
+            path = os.path.join(folder, file)
+            size = os.path.getsize(path)
+            if total and total + size > max_size:
+                break
+            total += size
+            tar.add(path, arcname=file)
+    result.name = "logs.tar.gz"
+    result.seek(0)
+    return result
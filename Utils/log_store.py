@@ -0,0 +1,328 @@
+"""
+В данном модуле описано структурированное хранилище логов: записи пишутся в JSON-lines сегменты
+(с полями заказа, чата и плагина), заполненные сегменты сжимаются (gzip), а для каждого сегмента
+сохраняется индекс (время, уровни, ID заказов / чатов / плагинов), по которому поиск пропускает
+сегменты без подходящих записей.
+
+Запуск как скрипта: python -m Utils.log_store --order ABCD1234 --level W --since 2h
+"""
+from __future__ import annotations
+
+from typing import Generator
+import logging
+import threading
+import datetime
+import argparse
+import json
+import gzip
+import time
+import os
+import re
+
+from Utils import logger as logger_tools
+
+logger = logging.getLogger("FPC.log_store")
+ORDER_ID_RE = re.compile(r"#([A-Z0-9]{8})\b")
+CHAT_ID_RE = re.compile(r"(?:CID: |node=|chat_id=|ID чата:? )(\d+)")
+LEVELS = {"D": logging.DEBUG, "I": logging.INFO, "W": logging.WARNING, "E": logging.ERROR, "C": logging.CRITICAL}
+
+
+class StructuredLogHandler(logging.Handler):
+    """
+    Хэндлер, пишущий записи лога в JSON-lines сегменты.
+
+    Каждая строка сегмента - объект {"ts": время, "level": уровень (D / I / W / E / C), "logger": имя логгера,
+    "file": файл, "line": строка, "msg": сообщение, "orders": [ID заказов], "chats": [ID чатов],
+    "plugin": UUID плагина, "exc": трейсбек}. ID заказов и чатов берутся из extra (order_id / chat_id)
+    или из текста сообщения, UUID плагина - из extra (plugin_uuid) или из контекста
+    (см. :data:`Utils.logger.LOG_CONTEXT`).
+
+    :param folder: папка с сегментами.
+    :param segment_size: размер сегмента (в байтах), после которого он сжимается и начинается новый.
+    :param max_segments: сколько сжатых сегментов хранить.
+    """
+
+    def __init__(self, folder: str = "logs/structured", segment_size: int = 5 * 1024 * 1024,
+                 max_segments: int = 50):
+        super(StructuredLogHandler, self).__init__(logging.DEBUG)
+        self.folder: str = folder
+        self.segment_size: int = segment_size
+        self.max_segments: int = max_segments
+        os.makedirs(folder, exist_ok=True)
+        self.__stream = None
+        self.__path: str | None = None
+        self.__index: dict | None = None
+        self.__compress_lock = threading.Lock()
+        # сегменты, оставшиеся несжатыми после прошлого запуска
+        for file in os.listdir(folder):
+            if file.endswith(".jsonl"):
+                self.__compress(os.path.join(folder, file))
+
+    def __open_segment(self):
+        name = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        self.__path = os.path.join(self.folder, f"{name}.jsonl")
+        self.__stream = open(self.__path, "a", encoding="utf-8")
+        self.__index = new_index()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Вызывается под self.lock (см. logging.Handler.handle).
+        try:
+            entry = record_to_entry(record)
+            if self.__stream is None:
+                self.__open_segment()
+            self.__stream.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.__stream.flush()
+            update_index(self.__index, entry)
+            if self.__stream.tell() >= self.segment_size:
+                self.rotate()
+        except Exception:
+            self.handleError(record)
+
+    def get_current_segment(self) -> tuple[str | None, dict | None]:
+        """
+        Возвращает путь до текущего (несжатого) сегмента и копию его индекса (индекс изменяется
+        потоком-слушателем очереди логов).
+        """
+        with self.lock:
+            index = {k: set(v) if isinstance(v, set) else v for k, v in self.__index.items()} \
+                if self.__index is not None else None
+            return self.__path, index
+
+    def rotate(self):
+        """
+        Закрывает текущий сегмент и сжимает его в отдельном потоке.
+        """
+        with self.lock:
+            if self.__stream is None:
+                return
+            self.__stream.close()
+            path, index = self.__path, self.__index
+            self.__stream, self.__path, self.__index = None, None, None
+        threading.Thread(target=self.__compress, args=(path, index), daemon=True).start()
+
+    def __compress(self, path: str, index: dict | None = None):
+        with self.__compress_lock:
+            try:
+                if index is None:
+                    index = new_index()
+                    with open(path, "r", encoding="utf-8") as f:
+                        for line in f:
+                            try:
+                                update_index(index, json.loads(line))
+                            except json.JSONDecodeError:
+                                continue
+                with open(path, "rb") as src, gzip.open(f"{path}.gz.tmp", "wb") as dst:
+                    while chunk := src.read(1024 * 1024):
+                        dst.write(chunk)
+                with open(f"{path}.idx.tmp", "w", encoding="utf-8") as f:
+                    f.write(json.dumps(index_to_json(index)))
+                os.replace(f"{path}.idx.tmp", f"{path}.gz.idx")
+                os.replace(f"{path}.gz.tmp", f"{path}.gz")
+                os.remove(path)
+                segments = sorted(i for i in os.listdir(self.folder) if i.endswith(".jsonl.gz"))
+                for old in segments[:-self.max_segments]:
+                    os.remove(os.path.join(self.folder, old))
+                    if os.path.exists(os.path.join(self.folder, f"{old}.idx")):
+                        os.remove(os.path.join(self.folder, f"{old}.idx"))
+            except:
+                logger.error(f"Не удалось сжать сегмент структурированного лога $YELLOW{path}$RESET.")  # locale
+                logger.debug("TRACEBACK", exc_info=True)
+
+    def close(self):
+        if self.__stream is not None:
+            self.__stream.close()
+            self.__stream = None
+        super(StructuredLogHandler, self).close()
+
+
+def record_to_entry(record: logging.LogRecord) -> dict:
+    """
+    Преобразует запись лога в словарь для JSON-lines сегмента.
+
+    :param record: запись лога.
+    """
+    msg = logger_tools.CLEAR_RE.sub("", record.getMessage())
+    for color in ("$RESET", "$YELLOW", "$CYAN", "$MAGENTA", "$BLUE", "$GREEN", "$BLACK", "$WHITE"):
+        msg = msg.replace(color, "")
+    orders = getattr(record, "order_id", None)
+    orders = [orders] if orders else ORDER_ID_RE.findall(msg)
+    chats = getattr(record, "chat_id", None)
+    chats = [int(chats)] if chats else [int(i) for i in CHAT_ID_RE.findall(msg)]
+    entry = {"ts": round(record.created, 3), "level": record.levelname[:1], "logger": record.name,
+             "file": record.filename, "line": record.lineno, "msg": msg}
+    if orders:
+        entry["orders"] = list(dict.fromkeys(orders))
+    if chats:
+        entry["chats"] = list(dict.fromkeys(chats))
+    if plugin_uuid := getattr(record, "plugin_uuid", None):
+        entry["plugin"] = plugin_uuid
+    if record.exc_info:
+        entry["exc"] = logging.Formatter().formatException(record.exc_info)
+    return entry
+
+
+def new_index() -> dict:
+    return {"from": None, "to": None, "records": 0, "levels": set(), "orders": set(), "chats": set(),
+            "plugins": set()}
+
+
+def update_index(index: dict, entry: dict):
+    index["from"] = entry["ts"] if index["from"] is None else index["from"]
+    index["to"] = entry["ts"]
+    index["records"] += 1
+    index["levels"].add(entry["level"])
+    index["orders"].update(entry.get("orders", ()))
+    index["chats"].update(entry.get("chats", ()))
+    if "plugin" in entry:
+        index["plugins"].add(entry["plugin"])
+
+
+def index_to_json(index: dict) -> dict:
+    return {k: sorted(v) if isinstance(v, set) else v for k, v in index.items()}
+
+
+def parse_time(value: str) -> float:
+    """
+    Разбирает время для фильтров: относительное ("30m", "2h", "1d" - столько времени назад)
+    или абсолютное в формате ISO ("2024-01-31T12:00").
+
+    :param value: строка времени.
+
+    :return: timestamp.
+    """
+    if match := re.fullmatch(r"(\d+)([smhd])", value):
+        seconds = int(match.group(1)) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+        return time.time() - seconds
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def _segment_matches(index: dict, order: str | None, chat: int | None, level: int | None, plugin: str | None,
+                     since: float | None, until: float | None) -> bool:
+    if not index.get("records"):
+        return False
+    if since is not None and index["to"] < since or until is not None and index["from"] > until:
+        return False
+    if order and order not in index["orders"] or chat is not None and chat not in index["chats"]:
+        return False
+    if plugin and plugin not in index["plugins"]:
+        return False
+    if level is not None and not any(LEVELS[i] >= level for i in index["levels"] if i in LEVELS):
+        return False
+    return True
+
+
+def _entry_matches(entry: dict, order: str | None, chat: int | None, level: int | None, plugin: str | None,
+                   since: float | None, until: float | None, text: str | None) -> bool:
+    if since is not None and entry["ts"] < since or until is not None and entry["ts"] > until:
+        return False
+    if order and order not in entry.get("orders", ()) or chat is not None and chat not in entry.get("chats", ()):
+        return False
+    if plugin and entry.get("plugin") != plugin:
+        return False
+    if level is not None and LEVELS.get(entry["level"], 0) < level:
+        return False
+    if text and text.lower() not in entry["msg"].lower():
+        return False
+    return True
+
+
+def _iter_segment(path: str) -> Generator[dict, None, None]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def query_logs(folder: str = "logs/structured", order: str | None = None, chat: int | None = None,
+               level: str | None = None, plugin: str | None = None, since: float | None = None,
+               until: float | None = None, text: str | None = None, limit: int = 50) -> list[dict]:
+    """
+    Ищет записи в структурированном логе. Сегменты, индекс которых не содержит подходящих записей, не читаются.
+
+    :param folder: папка с сегментами.
+    :param order: ID заказа (без #).
+    :param chat: ID чата.
+    :param level: минимальный уровень (D / I / W / E / C).
+    :param plugin: UUID плагина.
+    :param since: начало интервала (timestamp).
+    :param until: конец интервала (timestamp).
+    :param text: подстрока сообщения (без учета регистра).
+    :param limit: максимальное кол-во записей (не меньше 1).
+
+    :return: последние limit подходящих записей (от старых к новым).
+    """
+    limit = max(limit, 1)
+    level_no = LEVELS.get(level[:1].upper()) if level else None
+    order = order.lstrip("#").upper() if order else None
+    filters = (order, chat, level_no, plugin, since, until)
+
+    segments = []
+    handler = logger_tools.STRUCTURED_HANDLER
+    current_path, current_index = handler.get_current_segment() if handler and handler.folder == folder \
+        else (None, None)
+    if current_path and current_index and _segment_matches(current_index, *filters):
+        segments.append(current_path)
+    if os.path.exists(folder):
+        for file in sorted(os.listdir(folder), reverse=True):
+            path = os.path.join(folder, file)
+            if file.endswith(".jsonl.gz"):
+                try:
+                    with open(f"{path}.idx", "r", encoding="utf-8") as f:
+                        index = json.loads(f.read())
+                except (OSError, json.JSONDecodeError):
+                    index = None
+                if index is None or _segment_matches(index, *filters):
+                    segments.append(path)
+            elif file.endswith(".jsonl") and path != current_path:
+                segments.append(path)
+
+    result = []
+    for path in segments:
+        try:
+            matches = [i for i in _iter_segment(path) if _entry_matches(i, *filters, text)]
+        except OSError:
+            continue
+        result = matches[-(limit - len(result)):] + result
+        if len(result) >= limit:
+            break
+    return result
+
+
+def format_entry(entry: dict) -> str:
+    """
+    Форматирует запись структурированного лога в строку в формате обычного файла лога.
+
+    :param entry: запись.
+    """
+    ts = datetime.datetime.fromtimestamp(entry["ts"]).strftime(logger_tools.FILE_TIME_FORMAT)
+    text = f"[{ts}][{entry['file']}][{entry['line']}]> {entry['level']}: {entry['msg']}"
+    if entry.get("exc"):
+        text += f"\n{entry['exc']}"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Поиск по структурированному логу FunPay Cardinal.")
+    parser.add_argument("--folder", default="logs/structured")
+    parser.add_argument("--order", help="ID заказа")
+    parser.add_argument("--chat", type=int, help="ID чата")
+    parser.add_argument("--level", help="минимальный уровень: D, I, W, E, C")
+    parser.add_argument("--plugin", help="UUID плагина")
+    parser.add_argument("--since", help="начало интервала: 30m, 2h, 1d или 2024-01-31T12:00")
+    parser.add_argument("--until", help="конец интервала (в том же формате)")
+    parser.add_argument("--text", help="подстрока сообщения")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="выводить записи в формате JSON")
+    args = parser.parse_args()
+    entries = query_logs(args.folder, args.order, args.chat, args.level, args.plugin,
+                         parse_time(args.since) if args.since else None,
+                         parse_time(args.until) if args.until else None, args.text, args.limit)
+    for entry in entries:
+        print(json.dumps(entry, ensure_ascii=False) if args.json else format_entry(entry))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 """
 В данном модуле написаны форматтеры для логгера.
 """
+from __future__ import annotations
+
 from colorama import Fore, Back, Style
 import logging.handlers
+import collections
+import threading
 import logging
 import atexit
 import queue
@@ -99,6 +103,60 @@ class FileLoggerFormatter(logging.Formatter):
         return formatter.format(record)
 
 
+class ErrorIndexingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler, запоминающий смещения (в байтах) последних ошибок в текущем файле лога.
+
+    Ошибкой считается запись с трейсбеком (exc_info, обычно logger.debug("TRACEBACK", exc_info=True))
+    вместе с предыдущей записью (текстом ошибки). Индекс хранится в памяти и очищается при ротации файла,
+    поэтому после перезапуска ошибки из старой части файла ищутся чтением файла с конца
+    (см. :func:`Utils.log_reader.get_last_errors`).
+
+    :param index_size: сколько последних ошибок запоминать.
+    """
+    def __init__(self, *args, index_size: int = 100, **kwargs):
+        super(ErrorIndexingFileHandler, self).__init__(*args, **kwargs)
+        self.errors_index: collections.deque[tuple[int, int]] = collections.deque(maxlen=index_size)
+        """Смещения последних ошибок [(начало, конец)] (от старых к новым)."""
+        self.indexed_from: int = 0
+        """Смещение, начиная с которого ошибки попадают в индекс (размер файла при запуске)."""
+        self.__last_start: int = 0
+        if self.stream is not None:
+            self.indexed_from = self.__last_start = self.stream.tell()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            start = self.stream.tell()
+            logging.FileHandler.emit(self, record)
+            if record.exc_info:
+                self.errors_index.append((self.__last_start, self.stream.tell()))
+            self.__last_start = start
+        except Exception:
+            self.handleError(record)
+
+    def doRollover(self) -> None:
+        super(ErrorIndexingFileHandler, self).doRollover()
+        self.errors_index.clear()
+        self.indexed_from = self.__last_start = 0
+
+
+FILE_HANDLER: ErrorIndexingFileHandler | None = None
+"""Хэндлер файла лога (создается в :func:`configure_logging`)."""
+
+STRUCTURED_HANDLER = None
+"""Хэндлер структурированного лога (:class:`Utils.log_store.StructuredLogHandler`, см. :func:`add_structured_sink`)."""
+
+LOG_CONTEXT = threading.local()
+"""
+Контекст логирования текущего потока. plugin_uuid - UUID плагина, хэндлер которого выполняется
+(устанавливается в :meth:`cardinal.Cardinal.run_handlers`), попадает в записи структурированного лога.
+"""
+
+
 LOGGER_NAMES = ["main", "FunPayAPI", "FPC", "TGBot"]
 """Логгеры, пишущие и в консоль, и в файл лога (в т.ч. дочерние, например FPC.<имя_плагина>)."""
 
@@ -113,8 +171,13 @@ class _QueueHandler(logging.handlers.QueueHandler):
     а её побочный эффект вреден: exc_info схлопывается в record.msg одной строкой, из-за чего
     FileLoggerFormatter (вырезающий переносы строк из message) заодно съедает и переносы строк
     внутри трейсбека.
+
+    Контекст логирования (:data:`LOG_CONTEXT`) копируется в record здесь, т.к. prepare() выполняется
+    в потоке вызывающего кода, а не в потоке-слушателе.
     """
     def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if not hasattr(record, "plugin_uuid"):
+            record.plugin_uuid = getattr(LOG_CONTEXT, "plugin_uuid", None)
         return record
 
 
@@ -137,7 +200,8 @@ def configure_logging() -> logging.handlers.QueueListener:
     # TeleBot исторически пишет только в файл лога (внутренние ошибки telebot слишком шумные для консоли).
     cli_handler.addFilter(lambda record: record.name != "TeleBot")
 
-    file_handler = logging.handlers.RotatingFileHandler(
+    global FILE_HANDLER
+    file_handler = ErrorIndexingFileHandler(
         filename="logs/log.log",
         maxBytes=20 * 1024 * 1024,  # 20 мегабайт в байтах
         backupCount=25,  # Сколько ротаций оставить
@@ -145,6 +209,7 @@ def configure_logging() -> logging.handlers.QueueListener:
     )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(FileLoggerFormatter())
+    FILE_HANDLER = file_handler
 
     log_queue = queue.SimpleQueue()
     queue_handler = _QueueHandler(log_queue)
@@ -163,3 +228,21 @@ def configure_logging() -> logging.handlers.QueueListener:
     listener.start()
     atexit.register(listener.stop)
     return listener
+
+
+def add_structured_sink(listener: logging.handlers.QueueListener, folder: str = "logs/structured"):
+    """
+    Добавляет к слушателю очереди логов хэндлер структурированного лога (JSON-lines сегменты
+    со сжатием и индексом, см. :mod:`Utils.log_store`).
+
+    :param listener: слушатель очереди логов (результат :func:`configure_logging`).
+    :param folder: папка с сегментами.
+    """
+    global STRUCTURED_HANDLER
+    if STRUCTURED_HANDLER is not None:
+        return
+    from Utils.log_store import StructuredLogHandler
+    STRUCTURED_HANDLER = StructuredLogHandler(folder)
+    # Хэндлеры читаются потоком-слушателем при каждой записи, замена кортежа атомарна.
+    # Незавершенный сегмент сжимается при следующем запуске.
+    listener.handlers = listener.handlers + (STRUCTURED_HANDLER,)
@@ -0,0 +1,75 @@
+"""
+В данном модуле описан индекс для быстрого поиска секции конфига автовыдачи по названию лота.
+"""
+from __future__ import annotations
+
+from collections import deque
+
+
+class LotNameMatcher:
+    """
+    Индекс подстрок на основе алгоритма Ахо-Корасик.
+
+    Ищет среди переданных названий (секций конфига автовыдачи) те, что входят в строку (описание лота), за один проход
+    по строке и возвращает первое из них в порядке, в котором они были переданы.
+    Это полностью повторяет поведение линейного поиска `for i in sections: if i in name: return i`.
+
+    :param patterns: названия в порядке приоритета.
+    :type patterns: :obj:`list` of :obj:`str`
+    """
+
+    def __init__(self, patterns: list[str]):
+        self.patterns: list[str] = list(patterns)
+        """Названия в порядке приоритета."""
+
+        no_match = len(self.patterns)
+        self.__goto: list[dict[str, int]] = [{}]
+        self.__fail: list[int] = [0]
+        self.__best: list[int] = [no_match]
+
+        for index, pattern in enumerate(self.patterns):
+            node = 0
+            for char in pattern:
+                next_node = self.__goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self.__goto)
+                    self.__goto[node][char] = next_node
+                    self.__goto.append({})
+                    self.__fail.append(0)
+                    self.__best.append(no_match)
+                node = next_node
+            self.__best[node] = min(self.__best[node], index)
+
+        queue = deque(self.__goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.__goto[node].items():
+                queue.append(child)
+                fail = self.__fail[node]
+                while fail and char not in self.__goto[fail]:
+                    fail = self.__fail[fail]
+                self.__fail[child] = self.__goto[fail].get(char, 0)
+                self.__best[child] = min(self.__best[child], self.__best[self.__fail[child]])
+
+    def find(self, text: str) -> str | None:
+        """
+        Ищет первое (в порядке приоритета) название, входящее в переданную строку.
+
+        :param text: строка (описание лота).
+        :type text: :obj:`str`
+
+        :return: найденное название или None.
+        :rtype: :obj:`str` or :obj:`None`
+        """
+        goto, fail, best_of = self.__goto, self.__fail, self.__best
+        best = best_of[0]
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if best_of[node] < best:
+                best = best_of[node]
+                if not best:
+                    break
+        return self.patterns[best] if best < len(self.patterns) else None
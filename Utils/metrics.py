@@ -0,0 +1,125 @@
+"""
+В данном модуле описаны метрики кардинала и HTTP сервер, отдающий метрики (кардинала и FunPayAPI)
+в текстовом формате Prometheus (GET /metrics).
+"""
+from __future__ import annotations
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import TYPE_CHECKING
+import threading
+import logging
+import os
+
+if TYPE_CHECKING:
+    from cardinal import Cardinal
+
+from FunPayAPI.common.metrics import REGISTRY
+from Utils import cardinal_tools
+
+logger = logging.getLogger("FPC.metrics")
+
+# cardinal.Cardinal.run_handlers
+HANDLER_DURATION = REGISTRY.histogram("fpc_handler_duration_seconds", "Время выполнения хэндлеров.",
+                                      ("event_type",))
+HANDLER_ERRORS = REGISTRY.counter("fpc_handler_errors_total", "Хэндлеры, завершившиеся ошибкой.", ("event_type",))
+
+# tg_bot.notifications.NotificationQueue
+NOTIFICATIONS = REGISTRY.counter("fpc_telegram_notifications_total", "Уведомления, отправленные в Telegram.",
+                                 ("type", "result"))
+NOTIFICATION_DURATION = REGISTRY.histogram("fpc_telegram_notification_duration_seconds",
+                                           "Время отправки уведомления в один чат.", ("type",))
+NOTIFICATIONS_QUEUED = REGISTRY.gauge("fpc_telegram_notifications_queued", "Уведомления в очереди отправки.")
+
+# Обновляются перед каждой выгрузкой (см. MetricsExporter.collect)
+POOL_ACTIVE = REGISTRY.gauge("fpc_pool_active", "Выполняемые задачи пула потоков.", ("pool",))
+POOL_QUEUED = REGISTRY.gauge("fpc_pool_queued", "Задачи, ожидающие выполнения в пуле потоков.", ("pool",))
+POOL_FAILED = REGISTRY.gauge("fpc_pool_failed", "Задачи пула потоков, завершившиеся ошибкой.", ("pool",))
+LANE_QUEUED = REGISTRY.gauge("fpc_events_lane_queued", "События в очереди канала диспетчера событий.", ("lane",))
+PRODUCTS_LEFT = REGISTRY.gauge("fpc_products_left", "Остаток товаров в файле автовыдачи.", ("file",))
+
+
+class MetricsExporter:
+    """
+    HTTP сервер метрик. По умолчанию слушает только локальный адрес (адрес задается параметром metricsHost
+    секции [Other] основного конфига; метрики отдаются без авторизации).
+
+    :param cardinal: экземпляр кардинала.
+    :type cardinal: :class:`cardinal.Cardinal`
+
+    :param port: порт.
+    :type port: :obj:`int`
+
+    :param host: адрес.
+    :type host: :obj:`str`, опционально
+    """
+
+    def __init__(self, cardinal: Cardinal, port: int, host: str = "127.0.0.1"):
+        self.cardinal: Cardinal = cardinal
+        self.port: int = port
+        """Порт."""
+        self.host: str = host
+        """Адрес."""
+        self.server: ThreadingHTTPServer | None = None
+        """HTTP сервер."""
+        REGISTRY.add_collector(self.collect)
+
+    def collect(self):
+        """
+        Обновляет измерители, значения которых берутся из состояния кардинала: очереди пулов потоков и каналов
+        диспетчера событий, остатки товаров (кол-во товаров кэшируется до изменения файла).
+        """
+        for stats in self.cardinal.get_pools_stats():
+            POOL_ACTIVE.set(stats["name"], value=stats["active"])
+            POOL_QUEUED.set(stats["name"], value=stats["queued"])
+            POOL_FAILED.set(stats["name"], value=stats["failed"])
+        for stats in self.cardinal.dispatcher.get_stats():
+            LANE_QUEUED.set(stats["lane"], value=stats["queued"])
+
+        files = {i.get("productsFileName") for i in self.cardinal.AD_CFG.values()}
+        for file_name in files:
+            if not file_name:
+                continue
+            path = os.path.join("storage/products", file_name)
+            PRODUCTS_LEFT.set(file_name, value=cardinal_tools.count_products(path))
+
+    def start(self):
+        """
+        Запускает HTTP сервер в отдельном потоке.
+        """
+        if self.server is not None:
+            return
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = REGISTRY.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self.server.daemon_threads = True
+        except:
+            logger.error(f"Не удалось запустить сервер метрик на $YELLOW{self.host}:{self.port}$RESET.")  # locale
+            logger.debug("TRACEBACK", exc_info=True)
+            return
+        threading.Thread(target=self.server.serve_forever, daemon=True, name="metrics-exporter").start()
+        logger.info(f"Сервер метрик запущен: $YELLOW http://{self.host}:{self.port}/metrics$RESET")  # locale
+
+    def stop(self):
+        """
+        Останавливает HTTP сервер.
+        """
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
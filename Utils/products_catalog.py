@@ -0,0 +1,183 @@
+"""
+В данном модуле описан каталог товарных файлов (storage/products): список файлов хранится в памяти
+и перечитывается только при изменении папки, каждому файлу выдается постоянный ID, который используется
+в callback'ах Telegram бота вместо позиции файла в списке.
+"""
+from __future__ import annotations
+
+import threading
+import json
+import os
+
+from Utils import cardinal_tools
+
+
+class ProductsCatalog:
+    """
+    Каталог товарных файлов.
+
+    Папка перечитывается, только если изменилось время ее изменения (файл создан, удален или переименован)
+    или каталог помечен устаревшим (:meth:`invalidate`). Изменение содержимого файлов время изменения папки
+    не меняет: кол-во товаров берется из кэша :func:`Utils.cardinal_tools.count_products`, который
+    обновляется при записи (:func:`Utils.cardinal_tools.get_products` / :func:`Utils.cardinal_tools.add_products`).
+
+    ID файлов сохраняются в storage/cache, поэтому кнопки в старых сообщениях указывают на тот же файл
+    после создания / удаления других файлов и перезапуска.
+
+    :param folder: папка с товарными файлами.
+    :param ids_path: путь до файла с ID товарных файлов.
+    """
+
+    def __init__(self, folder: str = "storage/products", ids_path: str = "storage/cache/products_files.json"):
+        self.folder: str = folder
+        self.ids_path: str = ids_path
+        self.__lock = threading.RLock()
+        self.__files: list[str] = []
+        """Имена товарных файлов (отсортированы без учета регистра)."""
+        self.__ids: dict[str, int] | None = None
+        """ID товарных файлов {имя файла: ID}."""
+        self.__names: dict[int, str] = {}
+        """Имена товарных файлов {ID: имя файла}."""
+        self.__next_id: int = 0
+        self.__mtime: int | None = None
+
+    def __load_ids(self):
+        self.__ids = {}
+        if os.path.exists(self.ids_path):
+            try:
+                with open(self.ids_path, "r", encoding="utf-8") as f:
+                    data = json.loads(f.read())
+                self.__ids = {str(k): int(v) for k, v in data["files"].items()}
+                self.__next_id = int(data["next_id"])
+            except:
+                self.__ids = {}
+        self.__next_id = max([self.__next_id, *[i + 1 for i in self.__ids.values()]])
+
+    def __save_ids(self):
+        folder = os.path.dirname(self.ids_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(f"{self.ids_path}.tmp", "w", encoding="utf-8") as f:
+            f.write(json.dumps({"next_id": self.__next_id, "files": self.__ids}, ensure_ascii=False, indent=4))
+        os.replace(f"{self.ids_path}.tmp", self.ids_path)
+
+    def refresh(self, force: bool = False):
+        """
+        Перечитывает папку, если она изменилась с прошлого чтения.
+
+        :param force: перечитать папку в любом случае.
+        """
+        with self.__lock:
+            try:
+                mtime = os.stat(self.folder).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if not force and self.__ids is not None and mtime == self.__mtime:
+                return
+            if self.__ids is None:
+                self.__load_ids()
+
+            # Временные файлы (см. cardinal_tools._replace_file) начинаются с "."
+            files = [i for i in os.listdir(self.folder) if i.endswith(".txt") and not i.startswith(".")] \
+                if mtime is not None else []
+            files.sort(key=lambda x: (x.lower(), x))
+            changed = False
+            for name in files:
+                if name not in self.__ids:
+                    self.__ids[name] = self.__next_id
+                    self.__next_id += 1
+                    changed = True
+            existing = set(files)
+            for name in [i for i in self.__ids if i not in existing]:
+                del self.__ids[name]
+                changed = True
+            if changed:
+                try:
+                    self.__save_ids()
+                except:
+                    pass
+            self.__files = files
+            self.__names = {v: k for k, v in self.__ids.items()}
+            self.__mtime = mtime
+
+    def invalidate(self):
+        """
+        Помечает каталог устаревшим: папка будет перечитана при следующем обращении.
+        Необходимо вызывать после создания / удаления товарного файла, если разрешение времени изменения
+        папки в файловой системе может не отразить изменение.
+        """
+        with self.__lock:
+            self.__mtime = None
+
+    def get_files(self) -> list[str]:
+        """
+        Возвращает имена товарных файлов (отсортированы без учета регистра).
+        """
+        self.refresh()
+        return list(self.__files)
+
+    def __len__(self):
+        self.refresh()
+        return len(self.__files)
+
+    def get_page(self, offset: int, amount: int) -> list[tuple[int, str, int]]:
+        """
+        Возвращает страницу списка товарных файлов. Кол-во товаров считается только для файлов страницы.
+
+        :param offset: смещение.
+        :param amount: кол-во файлов на странице.
+
+        :return: [(ID файла, имя файла, кол-во товаров)].
+        """
+        self.refresh()
+        with self.__lock:
+            page = [(self.__ids[i], i) for i in self.__files[offset:offset + amount]]
+        return [(file_id, name, cardinal_tools.count_products(os.path.join(self.folder, name)))
+                for file_id, name in page]
+
+    def get_name(self, file_id: int) -> str | None:
+        """
+        Возвращает имя товарного файла по ID.
+
+        :param file_id: ID файла.
+
+        :return: имя файла или None, если файла с таким ID нет.
+        """
+        self.refresh()
+        name = self.__names.get(file_id)
+        if name is not None and not os.path.exists(os.path.join(self.folder, name)):
+            self.refresh(force=True)
+            name = self.__names.get(file_id)
+        return name
+
+    def get_id(self, name: str) -> int | None:
+        """
+        Возвращает ID товарного файла по имени.
+
+        :param name: имя файла.
+
+        :return: ID файла или None, если файла нет.
+        """
+        self.refresh()
+        if name not in self.__ids and os.path.exists(os.path.join(self.folder, name)):
+            self.refresh(force=True)
+        return self.__ids.get(name)
+
+    def get_position(self, name: str) -> int:
+        """
+        Возвращает позицию товарного файла в списке (для вычисления смещения списка).
+
+        :param name: имя файла.
+
+        :return: позиция файла или 0, если файла нет.
+        """
+        self.refresh()
+        with self.__lock:
+            try:
+                return self.__files.index(name)
+            except ValueError:
+                return 0
+
+
+CATALOG = ProductsCatalog()
+"""Каталог товарных файлов storage/products."""
@@ -0,0 +1,125 @@
+"""
+В данном модуле описаны ограниченные пулы потоков для побочных действий хэндлеров (отправка сообщений в FunPay,
+уведомлений в Telegram и т.д.).
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable
+import threading
+import logging
+import time
+
+logger = logging.getLogger("FPC.worker_pools")
+
+
+class WorkerPool:
+    """
+    Пул потоков с ограниченной очередью.
+
+    Если в пуле уже max_workers + max_queue задач (выполняемых и ожидающих), :meth:`submit` блокирует вызывающий
+    поток, пока не освободится место (обратное давление), вместо того чтобы бесконечно наращивать очередь.
+
+    :param name: название пула (используется как префикс названий потоков).
+    :type name: :obj:`str`
+
+    :param max_workers: максимальное кол-во одновременно выполняемых задач.
+    :type max_workers: :obj:`int`
+
+    :param max_queue: максимальное кол-во задач, ожидающих выполнения.
+    :type max_queue: :obj:`int`
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name: str = name
+        """Название пула."""
+        self.max_workers: int = max_workers
+        """Максимальное кол-во одновременно выполняемых задач."""
+        self.max_queue: int = max_queue
+        """Максимальное кол-во задач, ожидающих выполнения."""
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        """Пул потоков."""
+
+        self.__slots: threading.BoundedSemaphore = threading.BoundedSemaphore(max_workers + max_queue)
+        self.__lock: threading.Lock = threading.Lock()
+        self.__pending: int = 0
+        self.__active: int = 0
+        self.__max_depth: int = 0
+        self.__submitted: int = 0
+        self.__completed: int = 0
+        self.__failed: int = 0
+        self.__blocked: int = 0
+        self.__blocked_time: float = 0
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        Ставит задачу в очередь пула. Ошибки, возникшие при выполнении задачи, логируются.
+
+        :param func: функция.
+        :param args: позиционные аргументы функции.
+        :param kwargs: именованные аргументы функции.
+
+        :return: объект Future задачи.
+        :rtype: :class:`concurrent.futures.Future`
+        """
+        if not self.__slots.acquire(blocking=False):
+            start = time.time()
+            self.__slots.acquire()
+            with self.__lock:
+                self.__blocked += 1
+                self.__blocked_time += time.time() - start
+
+        with self.__lock:
+            self.__pending += 1
+            self.__submitted += 1
+            self.__max_depth = max(self.__max_depth, self.__pending - self.__active)
+        try:
+            return self.executor.submit(self.__run, func, args, kwargs)
+        except:
+            with self.__lock:
+                self.__pending -= 1
+            self.__slots.release()
+            raise
+
+    def __run(self, func: Callable, args: tuple, kwargs: dict):
+        with self.__lock:
+            self.__active += 1
+        try:
+            return func(*args, **kwargs)
+        except:
+            with self.__lock:
+                self.__failed += 1
+            logger.error(f"Произошла ошибка при выполнении задачи {getattr(func, '__name__', func)} "  # locale
+                         f"в пуле {self.name}.")  # locale
+            logger.debug("TRACEBACK", exc_info=True)
+            raise
+        finally:
+            with self.__lock:
+                self.__active -= 1
+                self.__pending -= 1
+                self.__completed += 1
+            self.__slots.release()
+
+    def get_stats(self) -> dict:
+        """
+        Возвращает статистику пула.
+
+        :return: словарь {"name": название, "max_workers": ..., "max_queue": ..., "active": выполняется задач,
+            "queued": ожидает задач, "max_queued": максимальная длина очереди, "submitted": поставлено задач,
+            "completed": завершено задач, "failed": завершено с ошибкой, "blocked": сколько раз :meth:`submit`
+            ждал освобождения места, "blocked_time": суммарное время ожидания (сек.)}.
+        :rtype: :obj:`dict`
+        """
+        with self.__lock:
+            return {"name": self.name, "max_workers": self.max_workers, "max_queue": self.max_queue,
+                    "active": self.__active, "queued": self.__pending - self.__active,
+                    "max_queued": self.__max_depth, "submitted": self.__submitted, "completed": self.__completed,
+                    "failed": self.__failed, "blocked": self.__blocked, "blocked_time": round(self.__blocked_time, 3)}
+
+    def shutdown(self, wait: bool = False):
+        """
+        Останавливает пул.
+
+        :param wait: ждать ли завершения уже поставленных задач.
+        """
+        self.executor.shutdown(wait=wait)
@@ -14,12 +14,15 @@ from types import ModuleType
 import Utils.exceptions
 from uuid import UUID
 import importlib.util
+import atexit
 import configparser
 import itertools
 import requests
 import datetime
 import logging
+import threading
 import random
+import heapq
 import time
 import sys
 import os
@@ -30,9 +33,15 @@ import announcements
 from locales.localizer import Localizer
 from FunPayAPI import utils as fp_utils
 from Utils import cardinal_tools
+from Utils.worker_pools import WorkerPool
+from Utils.event_dispatcher import EventDispatcher
+from Utils.handlers_profiler import HandlersProfiler
+from Utils import metrics
+from Utils import logger as logger_tools
 import tg_bot.bot
 
 from threading import Thread
+from concurrent.futures import ThreadPoolExecutor, Future
 
 logger = logging.getLogger("FPC")
 localizer = Localizer()
@@ -125,9 +134,15 @@ class Cardinal(object):
                 if self.MAIN_CFG["Proxy"].getboolean("check") and not cardinal_tools.check_proxy(self.proxy):
                     sys.exit()
 
+        # Соединений в пуле не меньше, чем потоков, одновременно отправляющих запросы к FunPay:
+        # каналы событий + пул funpay-io (4) + поднятие лотов (2) + Runner, обновление сессии и Telegram-ПУ (4)
+        pool_maxsize = int(self.MAIN_CFG["Other"]["handlersLanes"]) + 10
         self.account = FunPayAPI.Account(self.MAIN_CFG["FunPay"]["golden_key"],
                                          self.MAIN_CFG["FunPay"]["user_agent"],
-                                         proxy=self.proxy)
+                                         proxy=self.proxy,
+                                         adapter=FunPayAPI.Account.get_shared_adapter(self.proxy, pool_maxsize))
+        self.__chats_directory_version: int = self.account.chats_directory_version
+        self.__chats_directory_saved_time: float = 0
         self.runner: FunPayAPI.Runner | None = None
         self.telegram: tg_bot.bot.TGBot | None = None
 
@@ -136,8 +151,30 @@ class Cardinal(object):
         self.start_time = int(time.time())
 
         self.balance: FunPayAPI.types.Balance | None = None
-        self.raise_time = {}  # Временные метки поднятия категорий {id игры: след. время поднятия}
-        self.raised_time = {}  # Время последнего поднятия категории {id игры: время последнего поднятия}
+        # Временные метки поднятия категорий {id игры: след. время поднятия} и
+        # время последнего поднятия категории {id игры: время последнего поднятия} (переживают перезапуск).
+        self.raise_time, self.raised_time = cardinal_tools.load_raise_times()
+        self.raise_errors: dict[int, int] = {}  # Кол-во ошибок поднятия подряд {id игры: кол-во ошибок}
+        self.raise_workers = 2  # Кол-во категорий, поднимаемых одновременно
+        self.raise_interval = 2  # Минимальный интервал между запросами на поднятие (в секундах)
+        self.raise_max_backoff = 600  # Максимальная задержка перед повторной попыткой после ошибки (в секундах)
+        self.__raise_budget_lock = threading.Lock()
+        self.__last_raise_request = 0.0
+        self.__raise_paused_until = 0.0  # Время, до которого поднятие приостановлено после ответа 429 / 503 / 403
+        # Ограниченные пулы потоков для побочных действий хэндлеров {название: пул} (см. Cardinal.submit)
+        self.pools: dict[str, WorkerPool] = {}
+        self.add_pool("funpay-io", 4, 200)  # запросы к FunPay
+        self.add_pool("telegram-io", 4, 500)  # запросы к Telegram
+        self.add_pool("cpu", os.cpu_count() or 2, 100)  # вычисления
+        # Диспетчер событий: события одного собеседника обрабатываются по порядку, разных - параллельно
+        self.dispatcher = EventDispatcher(self, int(self.MAIN_CFG["Other"]["handlersLanes"]),
+                                          int(self.MAIN_CFG["Other"]["handlerTimeout"]))
+        self.slow_handlers: dict[str, list[int | float]] = {}  # Медленные хэндлеры {название: [кол-во, макс. время]}
+        self.profiler = HandlersProfiler()  # Профилировщик хэндлеров (выключен по умолчанию, см. /profiler)
+        # HTTP сервер метрик в формате Prometheus на metricsHost:metricsPort (None, если metricsPort = 0)
+        metrics_port = int(self.MAIN_CFG["Other"]["metricsPort"])
+        self.metrics_exporter = metrics.MetricsExporter(self, metrics_port, self.MAIN_CFG["Other"]["metricsHost"]) \
+            if metrics_port else None
         self.__exchange_rates = {}  # Курс валют {(валюта1, валюта2): (курс, время обновления)}
         self.profile: FunPayAPI.types.UserProfile | None = None  # FunPay профиль для всего кардинала (+ хэндлеров)
         self.tg_profile: FunPayAPI.types.UserProfile | None = None  # FunPay профиль (для Telegram-ПУ)
@@ -157,6 +194,8 @@ class Cardinal(object):
         self.blacklist = cardinal_tools.load_blacklist()  # ЧС.
         self.old_users = cardinal_tools.load_old_users(
             float(self.MAIN_CFG["Greetings"]["greetingsCooldown"]))  # Уже написавшие пользователи.
+        # Хэндлеры разных каналов диспетчера событий изменяют и сохраняют old_users одновременно.
+        self.old_users_lock = threading.Lock()
         self.greeting_chat_id_threshold = max(self.old_users.keys(), default=0)
         # пороговое значение для определения новых чатов (для приветствия)
 
@@ -215,6 +254,8 @@ class Cardinal(object):
         while True:
             try:
                 self.account.get()
+                self.account.load_chats_directory(cardinal_tools.load_chats_directory(self.account.id))
+                self.__chats_directory_version = self.account.chats_directory_version
                 self.balance = self.get_balance()
                 greeting_text = cardinal_tools.create_greeting_text(self)
                 cardinal_tools.set_console_title(f"FunPay Cardinal - {self.account.username} ({self.account.id})")
@@ -298,65 +339,111 @@ class Cardinal(object):
         return balance
 
     # Прочее
+    def __raise_backoff(self, category_id: int, base: int) -> int:
+        """
+        Увеличивает счетчик ошибок поднятия категории и возвращает задержку до следующей попытки.
+
+        :param category_id: ID категории.
+        :param base: базовая задержка (в секундах).
+
+        :return: задержка до следующей попытки (в секундах).
+        """
+        errors = self.raise_errors[category_id] = self.raise_errors.get(category_id, 0) + 1
+        return min(base * 2 ** (errors - 1), self.raise_max_backoff)
+
+    def __raise_category(self, category: types.Category) -> float:
+        """
+        Поднимает лоты категории (игры).
+
+        :param category: категория.
+
+        :return: время следующей попытки поднятия категории.
+        """
+        # Общий для всех потоков бюджет запросов: не чаще 1 запроса на поднятие в self.raise_interval секунд
+        # и ни одного запроса, пока поднятие приостановлено после ответа 429 / 503 / 403.
+        with self.__raise_budget_lock:
+            delay = max(self.__last_raise_request + self.raise_interval, self.__raise_paused_until) - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            self.__last_raise_request = time.time()
+
+        raise_ok = False
+        error_text = ""
+        time_delta = ""
+        try:
+            wait_time = self.account.raise_lots(category.id)
+            logger.info(_("crd_lots_raised", category.name))
+            raise_ok = True
+            self.raise_errors.pop(category.id, None)
+            last_time = self.raised_time.get(category.id)
+            self.raised_time[category.id] = new_time = int(time.time())  # locale
+            time_delta = "" if not last_time else f" Последнее поднятие: {cardinal_tools.time_to_str(new_time - last_time)} назад."
+            error_text = f"Подождите {cardinal_tools.time_to_str(wait_time)}."
+        except FunPayAPI.exceptions.RaiseError as e:
+            if e.error_message is not None:
+                error_text = e.error_message
+            if e.wait_time is not None:
+                logger.warning(_("crd_raise_time_err", category.name, error_text,
+                                 cardinal_tools.time_to_str(e.wait_time)))
+                self.raise_errors.pop(category.id, None)
+                wait_time = e.wait_time
+            else:
+                logger.error(_("crd_raise_unexpected_err", category.name))
+                wait_time = self.__raise_backoff(category.id, 10)
+        except Exception as e:
+            t = 10
+            if isinstance(e, FunPayAPI.exceptions.RequestFailedError) and e.status_code in (503, 403, 429):
+                logger.warning(_("crd_raise_status_code_err", e.status_code, category.name))
+                t = 60
+                self.__raise_paused_until = max(self.__raise_paused_until, time.time() + t)
+            else:
+                logger.error(_("crd_raise_unexpected_err", category.name))
+            logger.debug("TRACEBACK", exc_info=True)
+            wait_time = self.__raise_backoff(category.id, t)
+        next_time = time.time() + wait_time + 1
+        self.raise_time[category.id] = next_time
+        if raise_ok:
+            self.run_handlers(self.post_lots_raise_handlers, (self, category, error_text + time_delta))
+        return next_time
+
     def raise_lots(self) -> int:
         """
         Пытается поднять лоты.
 
+        Категории, время поднятия которых настало, ставятся в очередь с приоритетом по времени поднятия и
+        поднимаются параллельно (не более self.raise_workers одновременно, не чаще 1 запроса в
+        self.raise_interval секунд). Ошибка в одной категории не задерживает остальные: для нее лишь
+        откладывается следующая попытка (с экспоненциально растущей задержкой). Исключение - ответы
+        429 / 503 / 403: после них поднятие всех категорий приостанавливается на 60 секунд.
+
         :return: предположительное время, когда нужно снова запустить данную функцию.
         """
         # Время следующего вызова функции (по умолчанию - бесконечность).
         next_call = float("inf")
+        now = int(time.time())
+        queue = []
+        queued_categories = set()
 
         for subcat in sorted(list(self.curr_profile.get_sorted_lots(2).keys()), key=lambda x: x.category.position):
-            if subcat.type is SubCategoryTypes.CURRENCY:
+            category = subcat.category
+            if subcat.type is SubCategoryTypes.CURRENCY or category.id in queued_categories:
                 continue
-            # Если id категории текущей подкатегории уже находится в self.game_ids, но время поднятия подкатегорий
-            # данной категории еще не настало - пропускам эту подкатегорию.
-            if (saved_time := self.raise_time.get(subcat.category.id)) and saved_time > int(time.time()):
-                # Если записанное в self.game_ids время больше текущего времени
-                # обновляем время next_call'а на записанное время.
+            # Если время поднятия категории еще не настало - пропускам ее,
+            # обновляя время next_call'а на записанное время.
+            if (saved_time := self.raise_time.get(category.id)) and saved_time > now:
                 next_call = saved_time if saved_time < next_call else next_call
                 continue
-
-            # В любом другом случае пытаемся поднять лоты всех категорий, относящихся к игре
-            raise_ok = False
-            error_text = ""
-            time_delta = ""
-            try:
-                wait_time = self.account.raise_lots(subcat.category.id)
-                logger.info(_("crd_lots_raised", subcat.category.name))
-                raise_ok = True
-                last_time = self.raised_time.get(subcat.category.id)
-                self.raised_time[subcat.category.id] = new_time = int(time.time())  # locale
-                time_delta = "" if not last_time else f" Последнее поднятие: {cardinal_tools.time_to_str(new_time - last_time)} назад."
-                error_text = f"Подождите {cardinal_tools.time_to_str(wait_time)}."
-            except FunPayAPI.exceptions.RaiseError as e:
-                if e.error_message is not None:
-                    error_text = e.error_message
-                if e.wait_time is not None:
-                    logger.warning(_("crd_raise_time_err", subcat.category.name, error_text,
-                                     cardinal_tools.time_to_str(e.wait_time)))
-                    wait_time = e.wait_time
-                else:
-                    logger.error(_("crd_raise_unexpected_err", subcat.category.name))
-                    time.sleep(10)
-                    wait_time = 1
-            except Exception as e:
-                t = 10
-                if isinstance(e, FunPayAPI.exceptions.RequestFailedError) and e.status_code in (503, 403, 429):
-                    logger.warning(_("crd_raise_status_code_err", e.status_code, subcat.category.name))
-                    t = 60
-                else:
-                    logger.error(_("crd_raise_unexpected_err", subcat.category.name))
-                logger.debug("TRACEBACK", exc_info=True)
-                time.sleep(t)
-                wait_time = 1
-            next_time = time.time() + wait_time + 1
-            time.sleep(2)
-            self.raise_time[subcat.category.id] = next_time
-            next_call = next_time if next_time < next_call else next_call
-            if raise_ok:
-                self.run_handlers(self.post_lots_raise_handlers, (self, subcat.category, error_text + time_delta))
+            queued_categories.add(category.id)
+            heapq.heappush(queue, (saved_time or 0, category.position, category.id, category))
+
+        if queue:
+            with ThreadPoolExecutor(max_workers=self.raise_workers, thread_name_prefix="raise") as executor:
+                futures = [executor.submit(self.__raise_category, heapq.heappop(queue)[-1])
+                           for _ in range(len(queue))]
+                for future in futures:
+                    next_time = future.result()
+                    next_call = next_time if next_time < next_call else next_call
+            cardinal_tools.cache_raise_times(self.raise_time, self.raised_time)
         return next_call if next_call < float("inf") else 10
 
     def get_order_from_object(self, obj: types.OrderShortcut | types.Message | types.ChatShortcut,
@@ -576,6 +663,41 @@ class Cardinal(object):
             logger.error(_("crd_session_no_more_attempts_err"))
             return False
 
+    def add_pool(self, name: str, max_workers: int, max_queue: int) -> WorkerPool:
+        """
+        Создает именованный пул потоков (если пул с таким названием уже есть, возвращает его).
+
+        :param name: название пула.
+        :param max_workers: максимальное кол-во одновременно выполняемых задач.
+        :param max_queue: максимальное кол-во задач, ожидающих выполнения.
+
+        :return: пул потоков.
+        """
+        if name not in self.pools:
+            self.pools[name] = WorkerPool(name, max_workers, max_queue)
+        return self.pools[name]
+
+    def submit(self, pool_name: str, func: Callable, *args, **kwargs) -> Future:
+        """
+        Выполняет функцию в именованном пуле потоков ("funpay-io", "telegram-io", "cpu" или созданном через
+        Cardinal.add_pool). Используется вместо запуска отдельного потока на каждое действие.
+        Если очередь пула заполнена, ждет освобождения места.
+
+        :param pool_name: название пула.
+        :param func: функция.
+        :param args: позиционные аргументы функции.
+        :param kwargs: именованные аргументы функции.
+
+        :return: объект Future задачи.
+        """
+        return self.pools[pool_name].submit(func, *args, **kwargs)
+
+    def get_pools_stats(self) -> list[dict]:
+        """
+        Возвращает статистику всех пулов потоков (см. WorkerPool.get_stats).
+        """
+        return [pool.get_stats() for pool in list(self.pools.values())]
+
     # Бесконечные циклы
     def process_events(self):
         """
@@ -594,10 +716,33 @@ class Cardinal(object):
             FunPayAPI.events.EventTypes.ORDER_STATUS_CHANGED: self.order_status_changed_handlers,
         }
 
-        for event in self.runner.listen(requests_delay=int(self.MAIN_CFG["Other"]["requestsDelay"])):
+        self.dispatcher.start()
+        for event in self.runner.listen(requests_delay=int(self.MAIN_CFG["Other"]["requestsDelay"]),
+                                        min_delay=int(self.MAIN_CFG["Other"]["requestsDelayMin"]),
+                                        max_delay=int(self.MAIN_CFG["Other"]["requestsDelayMax"])):
             if instance_id != self.run_id:
                 break
-            self.run_handlers(events_handlers[event.type], (self, event))
+            self.dispatcher.dispatch(events_handlers[event.type], event)
+            self.save_chats_directory()
+
+    def save_chats_directory(self, force: bool = False):
+        """
+        Сохраняет справочник известных чатов аккаунта на диск (не чаще раза в 5 минут, если не force).
+        Принудительно сохраняется при завершении программы (atexit), перезапуске и выключении через Telegram.
+
+        :param force: сохранить, даже если с последнего сохранения прошло меньше 5 минут.
+        """
+        version = self.account.chats_directory_version
+        if self.account.id is None or version == self.__chats_directory_version or \
+                (not force and time.time() - self.__chats_directory_saved_time < 300):
+            return
+        try:
+            cardinal_tools.cache_chats_directory(self.account.id, self.account.get_chats_directory())
+            self.__chats_directory_version = version
+            self.__chats_directory_saved_time = time.time()
+        except:
+            logger.error("Произошла ошибка при сохранении справочника чатов.")  # locale
+            logger.debug("TRACEBACK", exc_info=True)
 
     def lots_raise_loop(self):
         """
@@ -643,13 +788,20 @@ class Cardinal(object):
         self.load_plugins()
         self.add_handlers()
 
+        # Хэндлеры до plugins_pre_init - хэндлеры плагинов (и встроенных модулей handlers / announcements).
+        plugins_pre_init = len(self.pre_init_handlers)
         if self.MAIN_CFG["Telegram"].getboolean("enabled"):
             self.__init_telegram()
             for module in [auto_response_cp, auto_delivery_cp, config_loader_cp, templates_cp, plugins_cp,
                            file_uploader, authorized_users_cp, proxy_cp, default_cp]:
                 self.add_handlers_from_plugin(module)
 
-        self.run_handlers(self.pre_init_handlers, (self,))
+        self.run_handlers(self.pre_init_handlers[:plugins_pre_init], (self,))
+        if self.MAIN_CFG["Telegram"].getboolean("enabled"):
+            # Callback хэндлеры плагинов с фильтрами проверяются раньше встроенных (маршрутизатора и
+            # default_cp, отвечающего на любой callback).
+            self.telegram.register_router()
+        self.run_handlers(self.pre_init_handlers[plugins_pre_init:], (self,))
 
         if self.MAIN_CFG["Telegram"].getboolean("enabled"):
             try:
@@ -675,6 +827,7 @@ class Cardinal(object):
             Thread(target=self.telegram.run, daemon=True).start()
 
         self.__init_account()
+        atexit.register(self.save_chats_directory, force=True)
         self.runner = FunPayAPI.Runner(self.account, self.old_mode_enabled)
         self.__update_profile()
         self.run_handlers(self.post_init_handlers, (self,))
@@ -686,6 +839,8 @@ class Cardinal(object):
         """
         self.run_id += 1
         self.start_time = int(time.time())
+        if self.metrics_exporter:
+            self.metrics_exporter.start()
         Thread(target=self.runner.loop, daemon=True).start()
         self.run_handlers(self.pre_start_handlers, (self,))
         self.run_handlers(self.post_start_handlers, (self,))
@@ -708,6 +863,7 @@ class Cardinal(object):
         Останавливает кардинал. Не используется.
         """
         self.run_id += 1
+        self.save_chats_directory(force=True)
         self.run_handlers(self.pre_stop_handlers, (self,))
         self.run_handlers(self.post_stop_handlers, (self,))
 
@@ -862,19 +1018,47 @@ class Cardinal(object):
                 logger.debug("TRACEBACK", exc_info=True)
                 self.plugins[i].enabled = False
 
-    def run_handlers(self, handlers_list: list[Callable], args) -> None:
+    def get_handler_name(self, func: Callable) -> str:
+        """
+        Возвращает название хэндлера для логов и отчетов ("<плагин>: <функция>" для хэндлеров плагинов).
+
+        :param func: хэндлер.
+        """
+        name = getattr(func, "__name__", str(func))
+        plugin_uuid = getattr(func, "plugin_uuid", None)
+        if plugin_uuid is not None and plugin_uuid in self.plugins:
+            return f"{self.plugins[plugin_uuid].name}: {name}"
+        return name
+
+    def run_handlers(self, handlers_list: list[Callable], args,
+                     on_handler: Callable[[Callable | None], None] | None = None) -> None:
         """
         Выполняет функции из списка handlers.
 
+        Хэндлеры, выполнявшиеся дольше handlerTimeout секунд, попадают в отчет self.slow_handlers.
+        Время выполнения и ошибки хэндлеров учитываются в метриках (см. Utils.metrics).
+        Если включен профилировщик (self.profiler.enabled), время выполнения каждого хэндлера записывается в него.
+        UUID плагина выполняемого хэндлера попадает в записи структурированного лога (см. Utils.log_store).
+
         :param handlers_list: Список хэндлеров.
         :param args: аргументы для хэндлеров.
+        :param on_handler: функция, вызываемая с хэндлером перед его выполнением и с None после
+            (используется диспетчером событий для отслеживания зависших хэндлеров).
         """
+        event_type = None
         for func in handlers_list:
+            start = time.perf_counter()
+            called, failed = False, False
             try:
                 plugin_uuid = getattr(func, "plugin_uuid")
                 if plugin_uuid is None or (plugin_uuid in self.plugins and self.plugins[plugin_uuid].enabled):
+                    called = True
+                    if on_handler:
+                        on_handler(func)
+                    logger_tools.LOG_CONTEXT.plugin_uuid = plugin_uuid
                     func(*args)
             except Exception as ex:
+                failed = True
                 text = _("crd_handler_err")
                 try:
                     text += f" {ex.short_str()}"
@@ -882,6 +1066,28 @@ class Cardinal(object):
                     pass
                 logger.error(text)
                 logger.debug("TRACEBACK", exc_info=True)
+            finally:
+                logger_tools.LOG_CONTEXT.plugin_uuid = None
+                if on_handler:
+                    on_handler(None)
+            if called:
+                duration = time.perf_counter() - start
+                if event_type is None:
+                    event = args[1] if len(args) > 1 else None
+                    event_type = event.type.name if isinstance(event, FunPayAPI.events.BaseEvent) else \
+                        type(event).__name__ if event is not None else "Cardinal"
+                metrics.HANDLER_DURATION.observe(event_type, value=duration)
+                if failed:
+                    metrics.HANDLER_ERRORS.inc(event_type)
+                if self.profiler.enabled:
+                    self.profiler.record(getattr(func, "__name__", str(func)), getattr(func, "plugin_uuid", None),
+                                         event_type, duration, failed)
+                if duration >= self.dispatcher.handler_timeout:
+                    name = self.get_handler_name(func)
+                    report = self.slow_handlers.setdefault(name, [0, 0])
+                    report[0] += 1
+                    report[1] = max(report[1], round(duration, 3))
+                    logger.warning(f"Хэндлер $YELLOW{name}$RESET выполнялся $YELLOW{duration:.1f}$RESET сек.")  # locale
 
     def add_telegram_commands(self, uuid: str, commands: list[tuple[str, str, bool]]):
         """
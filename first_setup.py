@@ -29,6 +29,7 @@ default_config = {
         "token": "",
         "secretKeyHash": "ХешСекретногоПароля",
         "blockLogin": "0",
+        "notificationsEditWindow": "0",
         "proxy": ""
     },
 
@@ -86,6 +87,13 @@ default_config = {
     "Other": {
         "watermark": "🐦",
         "requestsDelay": "4",
+        "requestsDelayMin": "4",
+        "requestsDelayMax": "4",
+        "handlersLanes": "4",
+        "handlerTimeout": "30",
+        "metricsPort": "0",
+        "metricsHost": "127.0.0.1",
+        "structuredLogs": "0",
         "language": "ru"
     }
 }
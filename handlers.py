@@ -15,16 +15,21 @@ from FunPayAPI.updater.events import *
 
 from tg_bot import utils, keyboards
 from Utils import cardinal_tools
+from Utils.config_loader import AutoDeliveryConfig
 from locales.localizer import Localizer
-from threading import Thread
 import configparser
 from datetime import datetime
+import threading
 import logging
 import time
 import re
 
-LAST_STACK_ID = ""
-MSG_LOG_LAST_STACK_ID = ""
+# ID последних обработанных стеков сообщений {ID чата: ID стека} (по чатам, т.к. события разных чатов
+# могут обрабатываться параллельно). Хранятся только STACK_IDS_LIMIT чатов с самыми свежими стеками.
+LAST_STACK_ID: dict[int | str, str] = {}
+MSG_LOG_LAST_STACK_ID: dict[int | str, str] = {}
+STACK_IDS_LIMIT = 1000
+_STACK_IDS_LOCK = threading.Lock()
 
 logger = logging.getLogger("FPC.handlers")
 localizer = Localizer()
@@ -63,9 +68,12 @@ def save_init_chats_handler(c: Cardinal, e: InitialChatEvent):
     """
     Кэширует существующие чаты (чтобы не отправлять приветственные сообщения).
     """
-    if c.MAIN_CFG["Greetings"].getboolean("sendGreetings") and e.chat.id not in c.old_users:
-        c.old_users[e.chat.id] = int(time.time())
-        cardinal_tools.cache_old_users(c.old_users)
+    if not c.MAIN_CFG["Greetings"].getboolean("sendGreetings"):
+        return
+    with c.old_users_lock:
+        if e.chat.id not in c.old_users:
+            c.old_users[e.chat.id] = int(time.time())
+            cardinal_tools.cache_old_users(c.old_users)
 
 
 def update_threshold_on_initial_chat(c: Cardinal, e: InitialChatEvent):
@@ -94,9 +102,24 @@ def old_log_msg_handler(c: Cardinal, e: LastChatMessageChangedEvent):
             logger.info(f"      $CYAN{line}")
 
 
+def remember_stack_id(stack_ids: dict[int | str, str], chat_id: int | str, stack_id: str):
+    """
+    Запоминает ID последнего обработанного стека сообщений чата. Чат переносится в конец словаря,
+    самые давние чаты сверх :data:`STACK_IDS_LIMIT` забываются.
+
+    :param stack_ids: словарь {ID чата: ID стека} (:data:`LAST_STACK_ID` / :data:`MSG_LOG_LAST_STACK_ID`).
+    :param chat_id: ID чата.
+    :param stack_id: ID стека.
+    """
+    with _STACK_IDS_LOCK:
+        stack_ids.pop(chat_id, None)
+        stack_ids[chat_id] = stack_id
+        while len(stack_ids) > STACK_IDS_LIMIT:
+            del stack_ids[next(iter(stack_ids))]
+
+
 def log_msg_handler(c: Cardinal, e: NewMessageEvent):
-    global MSG_LOG_LAST_STACK_ID
-    if e.stack.id() == MSG_LOG_LAST_STACK_ID:
+    if e.stack.id() == MSG_LOG_LAST_STACK_ID.get(e.message.chat_id):
         return
 
     chat_name, chat_id = e.message.chat_name, e.message.chat_id
@@ -111,7 +134,7 @@ def log_msg_handler(c: Cardinal, e: NewMessageEvent):
                 logger.info(f"      $YELLOW{username}: $CYAN{line}")
             else:
                 logger.info(f"      $CYAN{line}")
-    MSG_LOG_LAST_STACK_ID = e.stack.id()
+    remember_stack_id(MSG_LOG_LAST_STACK_ID, e.message.chat_id, e.stack.id())
 
 
 def update_threshold_on_last_message_change(c: Cardinal, e: LastChatMessageChangedEvent | NewMessageEvent):
@@ -158,7 +181,7 @@ def greetings_handler(c: Cardinal, e: NewMessageEvent | LastChatMessageChangedEv
 
     logger.info(_("log_sending_greetings", chat_name, chat_id))
     text = cardinal_tools.format_msg_text(c.MAIN_CFG["Greetings"]["greetingsText"], obj)
-    Thread(target=c.send_message, args=(chat_id, text, chat_name), daemon=True).start()
+    c.submit("funpay-io", c.send_message, chat_id, text, chat_name)
 
 
 def add_old_user_handler(c: Cardinal, e: NewMessageEvent | LastChatMessageChangedEvent):
@@ -178,8 +201,9 @@ def add_old_user_handler(c: Cardinal, e: NewMessageEvent | LastChatMessageChange
     if mtype == MessageTypes.DEAR_VENDORS:
         return
 
-    c.old_users[chat_id] = int(time.time())
-    cardinal_tools.cache_old_users(c.old_users)
+    with c.old_users_lock:
+        c.old_users[chat_id] = int(time.time())
+        cardinal_tools.cache_old_users(c.old_users)
 
 
 def send_response_handler(c: Cardinal, e: NewMessageEvent | LastChatMessageChangedEvent):
@@ -205,7 +229,7 @@ def send_response_handler(c: Cardinal, e: NewMessageEvent | LastChatMessageChang
 
     logger.info(_("log_new_cmd", command, chat_name, chat_id))
     response_text = cardinal_tools.format_msg_text(c.AR_CFG[command]["response"], obj)
-    Thread(target=c.send_message, args=(chat_id, response_text, chat_name), daemon=True).start()
+    c.submit("funpay-io", c.send_message, chat_id, response_text, chat_name)
 
 
 def old_send_new_msg_notification_handler(c: Cardinal, e: LastChatMessageChangedEvent):
@@ -223,18 +247,17 @@ def old_send_new_msg_notification_handler(c: Cardinal, e: LastChatMessageChanged
         user = f"👤 {user}"
     text = f"<i><b>{user}: </b></i><code>{utils.escape(str(e.chat))}</code>"
     kb = keyboards.reply(e.chat.id, e.chat.name, extend=True)
-    Thread(target=c.telegram.send_notification, args=(text, kb, utils.NotificationTypes.new_message),
-           daemon=True).start()
+    c.submit("telegram-io", c.telegram.send_notification, text, kb, utils.NotificationTypes.new_message,
+             coalesce_key=e.chat.id)
 
 
 def send_new_msg_notification_handler(c: Cardinal, e: NewMessageEvent) -> None:
     """
     Отправляет уведомление о новом сообщении в телеграм.
     """
-    global LAST_STACK_ID
-    if not c.telegram or e.stack.id() == LAST_STACK_ID:
+    if not c.telegram or e.stack.id() == LAST_STACK_ID.get(e.message.chat_id):
         return
-    LAST_STACK_ID = e.stack.id()
+    remember_stack_id(LAST_STACK_ID, e.message.chat_id, e.stack.id())
 
     chat_id, chat_name = e.message.chat_id, e.message.chat_name
     if c.bl_msg_notification_enabled and chat_name in c.blacklist:
@@ -272,20 +295,19 @@ def send_new_msg_notification_handler(c: Cardinal, e: NewMessageEvent) -> None:
 
     text = utils.format_messages(c, [i.message for i in events])
     kb = keyboards.reply(chat_id, chat_name, extend=True)
-    Thread(target=c.telegram.send_notification, args=(text, kb, utils.NotificationTypes.new_message),
-           daemon=True).start()
+    c.submit("telegram-io", c.telegram.send_notification, text, kb, utils.NotificationTypes.new_message,
+             coalesce_key=chat_id)
 
 
 def send_review_notification(c: Cardinal, order: Order, chat_id: int, reply_text: str | None):
     if not c.telegram:
         return
     reply_text = _("ntfc_review_reply_text").format(utils.escape(reply_text)) if reply_text else ""
-    Thread(target=c.telegram.send_notification,
-           args=(_("ntfc_new_review").format('⭐' * order.review.stars, order.id, utils.escape(order.review.text),
-                                             reply_text),
-                 keyboards.new_order(order.id, order.buyer_username, chat_id),
-                 utils.NotificationTypes.review),
-           daemon=True).start()
+    c.submit("telegram-io", c.telegram.send_notification,
+             _("ntfc_new_review").format('⭐' * order.review.stars, order.id, utils.escape(order.review.text),
+                                         reply_text),
+             keyboards.new_order(order.id, order.buyer_username, chat_id),
+             utils.NotificationTypes.review)
 
 
 def process_review_handler(c: Cardinal, e: NewMessageEvent | LastChatMessageChangedEvent):
@@ -353,7 +375,7 @@ def process_review_handler(c: Cardinal, e: NewMessageEvent | LastChatMessageChan
                 logger.debug("TRACEBACK", exc_info=True)
         send_review_notification(c, order, chat_id, reply_text)
 
-    Thread(target=send_reply, daemon=True).start()
+    c.submit("funpay-io", send_reply)
 
 
 def send_command_notification_handler(c: Cardinal, e: NewMessageEvent | LastChatMessageChangedEvent):
@@ -383,8 +405,8 @@ def send_command_notification_handler(c: Cardinal, e: NewMessageEvent | LastChat
     else:
         text = cardinal_tools.format_msg_text(c.AR_CFG[command]["notificationText"], obj)
 
-    Thread(target=c.telegram.send_notification, args=(text, keyboards.reply(chat_id, chat_name),
-                                                      utils.NotificationTypes.command), daemon=True).start()
+    c.submit("telegram-io", c.telegram.send_notification, text, keyboards.reply(chat_id, chat_name),
+             utils.NotificationTypes.command)
 
 
 def test_auto_delivery_handler(c: Cardinal, e: NewMessageEvent | LastChatMessageChangedEvent):
@@ -434,9 +456,8 @@ def send_categories_raised_notification_handler(c: Cardinal, cat: types.Category
         return
 
     text = f"""⤴️<b><i>Поднял все лоты категории</i></b> <code>{cat.name}</code>\n<tg-spoiler>{error_text}</tg-spoiler>"""  # locale
-    Thread(target=c.telegram.send_notification,
-           args=(text,),
-           kwargs={"notification_type": utils.NotificationTypes.lots_raise}, daemon=True).start()
+    c.submit("telegram-io", c.telegram.send_notification, text,
+             notification_type=utils.NotificationTypes.lots_raise)
 
 
 # Изменен список ордеров (REGISTER_TO_ORDERS_LIST_CHANGED)
@@ -449,6 +470,8 @@ def get_lot_config_by_name(c: Cardinal, name: str) -> configparser.SectionProxy
 
     :return: секцию конфига или None.
     """
+    if isinstance(c.AD_CFG, AutoDeliveryConfig):
+        return c.AD_CFG.get_lot_section(name)
     for i in c.AD_CFG.sections():
         if i in name:
             return c.AD_CFG[i]
@@ -550,8 +573,7 @@ def send_new_order_notification_handler(c: Cardinal, e: NewOrderEvent, *args):
     else:
         chat_id = e.order.chat_id
     keyboard = keyboards.new_order(e.order.id, e.order.buyer_username, chat_id)
-    Thread(target=c.telegram.send_notification, args=(text, keyboard, utils.NotificationTypes.new_order),
-           daemon=True).start()
+    c.submit("telegram-io", c.telegram.send_notification, text, keyboard, utils.NotificationTypes.new_order)
 
 
 def deliver_goods(c: Cardinal, e: NewOrderEvent, *args):
@@ -633,8 +655,8 @@ def send_delivery_notification_handler(c: Cardinal, e: NewOrderEvent):
 <code>{utils.escape(getattr(e, "delivery_text"))}</code>\n
 📋 <b><i>Осталось товаров: </i></b>{amount}"""  # locale
 
-    Thread(target=c.telegram.send_notification, args=(text,),
-           kwargs={"notification_type": utils.NotificationTypes.delivery}, daemon=True).start()
+    c.submit("telegram-io", c.telegram.send_notification, text,
+             notification_type=utils.NotificationTypes.delivery)
 
 def update_current_lots(c: Cardinal, e: NewOrderEvent):
     logger.info("Получаю информацию о лотах...")  # locale
@@ -768,15 +790,15 @@ def update_lots_states(cardinal: Cardinal, event: NewOrderEvent):
         text = f"""🔴 <b>Деактивировал лоты:</b>
         
 <code>{lots}</code>"""
-        Thread(target=cardinal.telegram.send_notification, args=(text,),
-               kwargs={"notification_type": utils.NotificationTypes.lots_deactivate}, daemon=True).start()
+        cardinal.submit("telegram-io", cardinal.telegram.send_notification, text,
+                        notification_type=utils.NotificationTypes.lots_deactivate)
     if restored:
         lots = "\n".join(restored)  # locale
         text = f"""🟢 <b>Активировал лоты:</b>
 
 <code>{lots}</code>"""
-        Thread(target=cardinal.telegram.send_notification, args=(text,),
-               kwargs={"notification_type": utils.NotificationTypes.lots_restore}, daemon=True).start()
+        cardinal.submit("telegram-io", cardinal.telegram.send_notification, text,
+                        notification_type=utils.NotificationTypes.lots_restore)
 
 
 def update_profiles_handler(cardinal: Cardinal, event: NewOrderEvent | OrdersListChangedEvent, *args):
@@ -792,7 +814,7 @@ def update_profiles_handler(cardinal: Cardinal, event: NewOrderEvent | OrdersLis
 
     if event.runner_tag != cardinal.last_profile_refresh_event_tag:
         cardinal.last_profile_refresh_event_tag = event.runner_tag
-        Thread(target=f, args=(cardinal, event), daemon=True).start()
+        cardinal.submit("funpay-io", f, cardinal, event)
 
 # BIND_TO_ORDER_STATUS_CHANGED
 def send_thank_u_message_handler(cardinal: Cardinal, event: OrderStatusChangedEvent):
@@ -811,8 +833,8 @@ def send_thank_u_message_handler(cardinal: Cardinal, event: OrderStatusChangedEv
     logger.info(f"Пользователь $YELLOW{event.order.buyer_username}$RESET подтвердил выполнение заказа "  # locale
                 f"$YELLOW{event.order.id}.$RESET")  # locale
     logger.info(f"Отправляю ответное сообщение ...")  # locale
-    Thread(target=cardinal.send_message, args=(chat_id, text, event.order.buyer_username),
-           kwargs={'watermark': cardinal.MAIN_CFG["OrderConfirm"].getboolean("watermark")}, daemon=True).start()
+    cardinal.submit("funpay-io", cardinal.send_message, chat_id, text, event.order.buyer_username,
+                    watermark=cardinal.MAIN_CFG["OrderConfirm"].getboolean("watermark"))
 
 
 def send_order_confirmed_notification_handler(cardinal: Cardinal, event: OrderStatusChangedEvent):
@@ -827,13 +849,11 @@ def send_order_confirmed_notification_handler(cardinal: Cardinal, event: OrderSt
         chat_id = chat.id
     else:
         chat_id = event.order.chat_id
-    Thread(target=cardinal.telegram.send_notification,  # locale
-           args=(
-               f"""🪙 Пользователь <a href="https://funpay.com/chat/?node={chat_id}">{event.order.buyer_username}</a> """
-               f"""подтвердил выполнение заказа <code>{event.order.id}</code>. (<code>{event.order.price} {event.order.currency}</code>)""",
-               keyboards.new_order(event.order.id, event.order.buyer_username, chat_id),
-               utils.NotificationTypes.order_confirmed),
-           daemon=True).start()
+    cardinal.submit("telegram-io", cardinal.telegram.send_notification,  # locale
+                    f"""🪙 Пользователь <a href="https://funpay.com/chat/?node={chat_id}">{event.order.buyer_username}</a> """
+                    f"""подтвердил выполнение заказа <code>{event.order.id}</code>. (<code>{event.order.price} {event.order.currency}</code>)""",
+                    keyboards.new_order(event.order.id, event.order.buyer_username, chat_id),
+                    utils.NotificationTypes.order_confirmed)
 
 
 def send_bot_started_notification_handler(c: Cardinal, *args):
@@ -293,6 +293,18 @@ logfile_not_found = "❌ Log file not found."
 logfile_sending = "Sending log file (it may take some time)..."
 logfile_error = "❌ Failed to send log file."
 logfile_deleted = "🗑️ Deleted {} logfile(s)."
+profiler_state_on = "enabled"
+profiler_state_off = "disabled"
+profiler_enabled = "⏱️ Handlers profiler enabled."
+profiler_disabled = "⏱️ Handlers profiler disabled."
+profiler_reset = "🗑️ Handlers statistics cleared."
+profiler_no_data = "⏱️ Handlers profiler is {}. No data yet.\n\n/profiler on | off | reset | dump"
+profiler_report = "⏱️ <b>Handlers</b> (profiler is {}):\n\n{}\n\n/profiler on | off | reset | dump"
+profiler_line = "<code>{}</code> ({}): {} calls, {} errors, total {:.2f} s, p50 {:.1f} ms, p99 {:.1f} ms"
+log_search_disabled = "🔍 Structured log is disabled (structuredLogs parameter in [Other] of _main.cfg)."
+log_search_usage = "🔍 /log_search order=ABCD1234 chat=123 level=W|E plugin=UUID since=2h until=30m text=word limit=50"
+log_search_not_found = "🔍 No records found."
+log_search_error = "❌ Search failed. See the log for details."
 
 update_no_tags = "❌ Failed to get the version list. Try again later."
 update_lasted = "✅ You have the latest version FunPayCardinal {}"
@@ -391,6 +403,7 @@ gf_uses = "Used in lots"
 gf_send_new_goods = "Enter the goods you want to add to goods file.\n\nEach new line (<code>Shift+Enter</code>) is a new item."
 gf_add_goods_err = "❌ Failed to add new goods."
 gf_new_goods = "✅ <code>{}</code> item(s) added to <code>storage/products/{}</code>."
+gf_goods_skipped = "♻️ Duplicates skipped: <code>{}</code>, lines rejected: <code>{}</code>."
 gf_empty_error = "❌ File storage/products/{} is empty."
 gf_linked_err = "❌ File <code>storage/products/{}</code> is linked to one ore more lots.\n" \
                 "Before deleting this goods file, unlink it from all lots."
@@ -494,6 +507,8 @@ cmd_about = "about current version"
 cmd_check_updates = "check for updates"
 cmd_update = "upgrade to the next version"
 cmd_sys = "system load information"
+cmd_profiler = "handlers profiler"
+cmd_log_search = "search the structured log"
 cmd_create_backup = "create backup"
 cmd_get_backup = "get backup"
 cmd_upload_backup = "upload backup"
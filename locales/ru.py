@@ -294,6 +294,18 @@ logfile_not_found = "❌ Лог-файл не обнаружен."
 logfile_sending = "Отправлю лог-файл (это может занять какое-то время)..."
 logfile_error = "❌ Не удалось отправить лог-файл."
 logfile_deleted = "🗑️ Удалено {} лог-файл(-а, -ов)."
+profiler_state_on = "включен"
+profiler_state_off = "выключен"
+profiler_enabled = "⏱️ Профилировщик хэндлеров включен."
+profiler_disabled = "⏱️ Профилировщик хэндлеров выключен."
+profiler_reset = "🗑️ Статистика хэндлеров очищена."
+profiler_no_data = "⏱️ Профилировщик хэндлеров {}. Данных пока нет.\n\n/profiler on | off | reset | dump"
+profiler_report = "⏱️ <b>Хэндлеры</b> (профилировщик {}):\n\n{}\n\n/profiler on | off | reset | dump"
+profiler_line = "<code>{}</code> ({}): {} выз., {} ош., всего {:.2f} с, p50 {:.1f} мс, p99 {:.1f} мс"
+log_search_disabled = "🔍 Структурированный лог выключен (параметр structuredLogs в [Other] _main.cfg)."
+log_search_usage = "🔍 /log_search order=ABCD1234 chat=123 level=W|E plugin=UUID since=2h until=30m text=слово limit=50"
+log_search_not_found = "🔍 Записей не найдено."
+log_search_error = "❌ Не удалось выполнить поиск. Подробнее в логе."
 
 update_no_tags = "❌ Не удалось получить список версий. Попробуй позже."
 update_lasted = "✅ У тебя стоит последняя версия FunPayCardinal {}"
@@ -393,6 +405,7 @@ gf_uses = "Используется в лотах"
 gf_send_new_goods = "Отправь товары, которые хочешь добавить в товарный файл.\n\nКаждая новая строка (<code>Shift+Enter</code>) - новый товар."
 gf_add_goods_err = "❌ Не удалось добавить товары в файл."
 gf_new_goods = "✅ <code>{}</code> товар(-а / -ов) добавлен(-о) в файл  <code>storage/products/{}</code>."
+gf_goods_skipped = "♻️ Пропущено дубликатов: <code>{}</code>, отклонено строк: <code>{}</code>."
 gf_empty_error = "❌ Файл storage/products/{} пуст."
 gf_linked_err = "❌ Файл <code>storage/products/{}</code> привязан к одному или нескольким лотам.\n" \
                 "Перед удалением этого товарного файла отвяжи его от всех лотов."
@@ -497,6 +510,8 @@ cmd_about = "об текущей версии"
 cmd_check_updates = "проверить на наличие обновлений"
 cmd_update = "обновиться до след. версии"
 cmd_sys = "информация о нагрузке на систему"
+cmd_profiler = "профилировщик хэндлеров"
+cmd_log_search = "поиск по структурированному логу"
 cmd_create_backup = "создать бэкап"
 cmd_get_backup = "получить бэкап"
 cmd_upload_backup = "выгрузить бэкап"
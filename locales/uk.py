@@ -294,6 +294,18 @@ logfile_not_found = "❌ Лог-файл не знайдено."
 logfile_sending = "Відправляю лог-файл (це може зайняти деякий час)..."
 logfile_error = "❌ Не вдалося відправити лог-файл."
 logfile_deleted = "🗑️ Видалено {} лог-файл(-и, -ів)."
+profiler_state_on = "увімкнений"
+profiler_state_off = "вимкнений"
+profiler_enabled = "⏱️ Профілювальник хендлерів увімкнено."
+profiler_disabled = "⏱️ Профілювальник хендлерів вимкнено."
+profiler_reset = "🗑️ Статистику хендлерів очищено."
+profiler_no_data = "⏱️ Профілювальник хендлерів {}. Даних поки немає.\n\n/profiler on | off | reset | dump"
+profiler_report = "⏱️ <b>Хендлери</b> (профілювальник {}):\n\n{}\n\n/profiler on | off | reset | dump"
+profiler_line = "<code>{}</code> ({}): {} викл., {} пом., всього {:.2f} с, p50 {:.1f} мс, p99 {:.1f} мс"
+log_search_disabled = "🔍 Структурований лог вимкнений (параметр structuredLogs в [Other] _main.cfg)."
+log_search_usage = "🔍 /log_search order=ABCD1234 chat=123 level=W|E plugin=UUID since=2h until=30m text=слово limit=50"
+log_search_not_found = "🔍 Записів не знайдено."
+log_search_error = "❌ Не вдалося виконати пошук. Детальніше в лозі."
 
 update_no_tags = "❌ Не вдалося отримати список версій. Спробуй пізніше."
 update_lasted = "✅ У тебе стоїть остання версія FunPayCardinal {}"
@@ -393,6 +405,7 @@ gf_uses = "Використовується у лотах"
 gf_send_new_goods = "Відправ товари, які ти хочеш додати у товарний файл.\n\nКожен новий рядок (<code>Shift+Enter</code>) - новий товар."
 gf_add_goods_err = "❌ Не вдалося додати товари у файл."
 gf_new_goods = "✅ <code>{}</code> товар(-и, -ів) додано(-і) у файл  <code>storage/products/{}</code>."
+gf_goods_skipped = "♻️ Пропущено дублікатів: <code>{}</code>, відхилено рядків: <code>{}</code>."
 gf_empty_error = "❌ Файл storage/products/{} порожній."
 gf_linked_err = "❌ Файл <code>storage/products/{}</code> прив'язаний до одного або кількох лотів.\n" \
                 "Перед видаленням цього товарного файлу відв'яжи його від усіх лотів."
@@ -496,6 +509,8 @@ cmd_about = "про поточну версію"
 cmd_check_updates = "перевірити на наявність оновлень"
 cmd_update = "оновитися до наст. версії"
 cmd_sys = "інформація про навантаження на систему"
+cmd_profiler = "профілювальник хендлерів"
+cmd_log_search = "пошук по структурованому логу"
 cmd_create_backup = "створити бекап"
 cmd_get_backup = "отримати бекап"
 cmd_upload_backup = "вивантажити бекап"
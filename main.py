@@ -25,7 +25,7 @@ import Utils.cardinal_tools
 import Utils.config_loader as cfg_loader
 from first_setup import first_setup
 from colorama import Fore, Style
-from Utils.logger import configure_logging
+from Utils.logger import configure_logging, add_structured_sink
 import logging
 import colorama
 import sys
@@ -83,7 +83,7 @@ for i in files:
 
 colorama.init()
 
-configure_logging()
+log_listener = configure_logging()
 logging.raiseExceptions = False
 logger = logging.getLogger("main")
 logger.debug("------------------------------------------------------------------")
@@ -146,6 +146,9 @@ except:
 
 localizer = Localizer(MAIN_CFG["Other"]["language"])
 
+if MAIN_CFG["Other"].getboolean("structuredLogs"):
+    add_structured_sink(log_listener)
+
 try:
     Cardinal(MAIN_CFG, AD_CFG, AR_CFG, RAW_AR_CFG, VERSION).init().run()
 except KeyboardInterrupt:
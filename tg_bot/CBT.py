@@ -211,7 +211,7 @@ EDIT_PRODUCTS_FILE = "20"
 Callback для открытия меню редактирования файла с товарами.
 Использование: CBT.EDIT_PRODUCTS_FILE:file_index:offset
 
-file_index: int - числовой индекс файла с товарами.
+file_index: int - ID файла с товарами (см. Utils.products_catalog).
 offset: int - смещение списка файлов с товарами.
 """
 
@@ -236,7 +236,7 @@ ADD_PRODUCTS_TO_FILE = "23"
 Callback для активации режима ввода товаров для последующего добавления их в товарный файл.
 Использование: CBT.ADD_PRODUCTS_TO_FILE:file_index:index:offset:previous_page
 
-file_index: int - числовой индекс файла с товарами.
+file_index: int - ID файла с товарами (см. Utils.products_catalog).
 element_index: int - числовой индекс файла с товарами / лота с автовыдачей.
 offset: int - смещение списка файлов с товарами / списка лотов с автовыдачей.
 previous_page: int - предыдущая страница.
@@ -246,7 +246,7 @@ previous_page: int - предыдущая страница.
 
 User-state: ожидается сообщение товарами для последующего добавления их в товарный файл.
 data:
-file_index: int - числовой индекс файла с товарами.
+file_index: int - ID файла с товарами (см. Utils.products_catalog).
 element_index: int - числовой индекс файла с товарами / лота с автовыдачей.
 offset: int - смещение списка файлов с товарами.
 previous_page: int - предыдущая страница.
@@ -51,8 +51,8 @@ def init_authorized_users_cp(crd: Cardinal, *args):
             bot.edit_message_text(text, c.message.chat.id, c.message.id,
                                   reply_markup=kb.authorized_user_settings(crd, user_id, offset, False))
 
-    tg.cbq_handler(open_authorized_users_list, lambda c: c.data.startswith(f"{CBT.AUTHORIZED_USERS}:"))
-    tg.cbq_handler(open_authorized_user_settings, lambda c: c.data.startswith(f"{CBT.AUTHORIZED_USER_SETTINGS}:"))
+    tg.cbq_handler(open_authorized_users_list, prefix=CBT.AUTHORIZED_USERS)
+    tg.cbq_handler(open_authorized_user_settings, prefix=CBT.AUTHORIZED_USER_SETTINGS)
 
 
 BIND_TO_PRE_INIT = [init_authorized_users_cp]
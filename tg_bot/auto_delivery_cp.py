@@ -16,9 +16,9 @@ from tg_bot.static_keyboards import CLEAR_STATE_BTN
 from telebot.types import InlineKeyboardMarkup as K, InlineKeyboardButton as B, Message, CallbackQuery
 
 from Utils import cardinal_tools
+from Utils.products_catalog import CATALOG
 from locales.localizer import Localizer
 
-import itertools
 import random
 import string
 import logging
@@ -58,14 +58,12 @@ def init_auto_delivery_cp(crd: Cardinal, *args):
             return False
         return True
 
-    def check_products_file_exists(index: int, files_list: list[str],
-                                   message_obj: Message, reply_mode: bool = True) -> bool:
+    def check_products_file_exists(index: int, message_obj: Message, reply_mode: bool = True) -> bool:
         """
-        Проверяет, существует ли файл с товарами с переданным индексом.
+        Проверяет, существует ли файл с товарами с переданным ID (см. :class:`Utils.products_catalog.ProductsCatalog`).
         Если файда не существует - отправляет сообщение с кнопкой обновления списка файлов с товарами.
 
-        :param index: числовой индекс файла с товарами.
-        :param files_list: список файлов.
+        :param index: ID файла с товарами.
         :param message_obj: экземпляр Telegram-сообщения.
         :param reply_mode: режим ответа на переданное сообщение.
             True - отвечает на переданное сообщение,
@@ -73,7 +71,7 @@ def init_auto_delivery_cp(crd: Cardinal, *args):
 
         :return: True, если файл существует, False, если нет.
         """
-        if index > len(files_list) - 1:
+        if CATALOG.get_name(index) is None:
             update_button = K().add(B(_("gl_refresh"), callback_data=f"{CBT.PRODUCTS_FILES_LIST}:0"))
             if reply_mode:
                 bot.reply_to(message_obj, _("gf_not_found_err", index), reply_markup=update_button)
@@ -176,8 +174,12 @@ $product""")  # todo
 
         file_name += ".txt"
         if os.path.exists(f"storage/products/{file_name}"):
-            file_index = os.listdir("storage/products").index(file_name)
-            offset = file_index - 4 if file_index - 4 > 0 else 0
+            file_index = CATALOG.get_id(file_name)
+            if file_index is None:
+                bot.reply_to(m, _("gf_not_found_err", file_name), reply_markup=error_keyboard)
+                return
+            position = CATALOG.get_position(file_name)
+            offset = position - 4 if position - 4 > 0 else 0
             keyboard = K() \
                 .row(B(_("gl_back"), callback_data=f"{CBT.CATEGORY}:ad"),
                      B(_("gf_create_another"), callback_data=CBT.CREATE_PRODUCTS_FILE),
@@ -191,9 +193,15 @@ $product""")  # todo
         except:
             logger.debug("TRACEBACK", exc_info=True)
             bot.reply_to(m, _("gf_creation_err", file_name), reply_markup=error_keyboard)
+            return
 
-        file_index = os.listdir("storage/products").index(file_name)
-        offset = file_index - 4 if file_index - 4 > 0 else 0
+        CATALOG.invalidate()
+        file_index = CATALOG.get_id(file_name)
+        if file_index is None:
+            bot.reply_to(m, _("gf_not_found_err", file_name), reply_markup=error_keyboard)
+            return
+        position = CATALOG.get_position(file_name)
+        offset = position - 4 if position - 4 > 0 else 0
         keyboard = K() \
             .row(B(_("gl_back"), callback_data=f"{CBT.CATEGORY}:ad"),
                  B(_("gf_create_more"), callback_data=CBT.CREATE_PRODUCTS_FILE),
@@ -451,12 +459,11 @@ $product""")  # todo
         """
         split = c.data.split(":")
         file_index, offset = int(split[1]), int(split[2])
-        files = [i for i in os.listdir("storage/products") if i.endswith(".txt")]
-        if not check_products_file_exists(file_index, files, c.message, reply_mode=False):
+        if not check_products_file_exists(file_index, c.message, reply_mode=False):
             bot.answer_callback_query(c.id)
             return
 
-        file_name = files[file_index]
+        file_name = CATALOG.get_name(file_index)
         products_amount = cardinal_tools.count_products(f"storage/products/{file_name}")
         nl = "\n"
         delivery_objs = [i for i in crd.AD_CFG.sections() if crd.AD_CFG[i].get("productsFileName") == file_name]
@@ -492,8 +499,8 @@ $product""")  # todo
                                                    state["offset"], state["previous_page"])
         tg.clear_state(m.chat.id, m.from_user.id, True)
 
-        files = [i for i in os.listdir("storage/products") if i.endswith(".txt")]
-        if file_index > len(files) - 1:
+        file_name = CATALOG.get_name(file_index)
+        if file_name is None:
 
             if prev_page == 0:
                 update_btn = B(_("gl_refresh"), callback_data=f"{CBT.PRODUCTS_FILES_LIST}:0")
@@ -504,9 +511,6 @@ $product""")  # todo
             bot.reply_to(m, _("gf_not_found_err", file_index), reply_markup=error_keyboard)
             return
 
-        file_name = files[file_index]
-        products = list(itertools.filterfalse(lambda el: not el, m.text.strip().split("\n")))
-
         if prev_page == 0:
             back_btn = B(_("gl_back"), callback_data=f"{CBT.EDIT_PRODUCTS_FILE}:{file_index}:{offset}")
         else:
@@ -518,22 +522,21 @@ $product""")  # todo
         add_more_btn = B(_("gf_add_more"),
                          callback_data=f"{CBT.ADD_PRODUCTS_TO_FILE}:{file_index}:{el_index}:{offset}:{prev_page}")
 
-        products_text = "\n".join(products)
-
         try:
-            with cardinal_tools.get_products_file_lock(f"storage/products/{file_name}"):
-                with open(f"storage/products/{file_name}", "a", encoding="utf-8") as f:
-                    f.write("\n")
-                    f.write(products_text)
+            report = cardinal_tools.ingest_products(f"storage/products/{file_name}", [m.text.encode("utf-8")],
+                                                    dedupe=False)
         except:
             logger.debug("TRACEBACK", exc_info=True)
             keyboard = K().row(back_btn, try_again_btn)
             bot.reply_to(m, _("gf_add_goods_err"), reply_markup=keyboard)
             return
 
-        logger.info(_("log_gf_new_goods", m.from_user.username, m.from_user.id, len(products), file_name))
+        logger.info(_("log_gf_new_goods", m.from_user.username, m.from_user.id, report["added"], file_name))
         keyboard = K().row(back_btn, add_more_btn)
-        bot.reply_to(m, _("gf_new_goods", len(products), file_name), reply_markup=keyboard)
+        text = _("gf_new_goods", report["added"], file_name)
+        if report["duplicates"] or report["rejected"]:
+            text += "\n" + _("gf_goods_skipped", report["duplicates"], report["rejected"])
+        bot.reply_to(m, text, reply_markup=keyboard)
 
     def send_products_file(c: CallbackQuery):
         """
@@ -541,12 +544,11 @@ $product""")  # todo
         """
         split = c.data.split(":")
         file_index, offset = int(split[1]), int(split[2])
-        files = [i for i in os.listdir("storage/products") if i.endswith(".txt")]
-        if not check_products_file_exists(file_index, files, c.message, reply_mode=False):
+        if not check_products_file_exists(file_index, c.message, reply_mode=False):
             bot.answer_callback_query(c.id)
             return
 
-        file_name = files[file_index]
+        file_name = CATALOG.get_name(file_index)
         with cardinal_tools.get_products_file_lock(f"storage/products/{file_name}"):
             with open(f"storage/products/{file_name}", "r", encoding="utf-8") as f:
                 data = f.read().strip()
@@ -565,8 +567,7 @@ $product""")  # todo
         """
         split = c.data.split(":")
         file_index, offset = int(split[1]), int(split[2])
-        files = [i for i in os.listdir("storage/products") if i.endswith(".txt")]
-        if not check_products_file_exists(file_index, files, c.message, reply_mode=False):
+        if not check_products_file_exists(file_index, c.message, reply_mode=False):
             bot.answer_callback_query(c.id)
             return
         bot.edit_message_reply_markup(c.message.chat.id, c.message.id,
@@ -580,12 +581,11 @@ $product""")  # todo
 
         split = c.data.split(":")
         file_index, offset = int(split[1]), int(split[2])
-        files = [i for i in os.listdir("storage/products") if i.endswith(".txt")]
-        if not check_products_file_exists(file_index, files, c.message, reply_mode=False):
+        if not check_products_file_exists(file_index, c.message, reply_mode=False):
             tg.answer_callback_query(c.id)
             return
 
-        file_name = files[file_index]
+        file_name = CATALOG.get_name(file_index)
 
         delivery_objs = [i for i in crd.AD_CFG.sections() if
                          crd.AD_CFG[i].get("productsFileName") == file_name]
@@ -599,6 +599,8 @@ $product""")  # todo
         try:
             with cardinal_tools.get_products_file_lock(f"storage/products/{file_name}"):
                 os.remove(f"storage/products/{file_name}")
+                cardinal_tools.invalidate_products_count(f"storage/products/{file_name}")
+            CATALOG.invalidate()
 
             logger.info(_("log_gf_deleted", c.from_user.username, c.from_user.id, file_name))
             bot.edit_message_text(_("desc_gf"), c.message.chat.id, c.message.id,
@@ -615,46 +617,46 @@ $product""")  # todo
             return
 
     # Основное меню настроек автовыдачи.
-    tg.cbq_handler(open_ad_lots_list, lambda c: c.data.startswith(f"{CBT.AD_LOTS_LIST}:"))
-    tg.cbq_handler(open_fp_lots_list, lambda c: c.data.startswith(f"{CBT.FP_LOTS_LIST}:"))
-    tg.cbq_handler(act_add_lot_manually, lambda c: c.data.startswith(f"{CBT.ADD_AD_TO_LOT_MANUALLY}:"))
+    tg.cbq_handler(open_ad_lots_list, prefix=CBT.AD_LOTS_LIST)
+    tg.cbq_handler(open_fp_lots_list, prefix=CBT.FP_LOTS_LIST)
+    tg.cbq_handler(act_add_lot_manually, prefix=CBT.ADD_AD_TO_LOT_MANUALLY)
     tg.msg_handler(add_lot_manually,
                    func=lambda m: tg.check_state(m.chat.id, m.from_user.id, CBT.ADD_AD_TO_LOT_MANUALLY))
 
-    tg.cbq_handler(open_gf_list, lambda c: c.data.startswith(f"{CBT.PRODUCTS_FILES_LIST}:"))
+    tg.cbq_handler(open_gf_list, prefix=CBT.PRODUCTS_FILES_LIST)
 
-    tg.cbq_handler(act_create_gf, lambda c: c.data == CBT.CREATE_PRODUCTS_FILE)
+    tg.cbq_handler(act_create_gf, exact=CBT.CREATE_PRODUCTS_FILE)
     tg.msg_handler(create_gf, func=lambda m: tg.check_state(m.chat.id, m.from_user.id,
                                                             CBT.CREATE_PRODUCTS_FILE))
 
     # Меню настройки лотов.
-    tg.cbq_handler(open_edit_lot_cp, lambda c: c.data.startswith(f"{CBT.EDIT_AD_LOT}:"))
+    tg.cbq_handler(open_edit_lot_cp, prefix=CBT.EDIT_AD_LOT)
 
-    tg.cbq_handler(act_edit_delivery_text, lambda c: c.data.startswith(f"{CBT.EDIT_LOT_DELIVERY_TEXT}:"))
+    tg.cbq_handler(act_edit_delivery_text, prefix=CBT.EDIT_LOT_DELIVERY_TEXT)
     tg.msg_handler(edit_delivery_text,
                    func=lambda m: tg.check_state(m.chat.id, m.from_user.id, CBT.EDIT_LOT_DELIVERY_TEXT))
 
-    tg.cbq_handler(act_link_gf, lambda c: c.data.startswith(f"{CBT.BIND_PRODUCTS_FILE}:"))
+    tg.cbq_handler(act_link_gf, prefix=CBT.BIND_PRODUCTS_FILE)
     tg.msg_handler(link_gf, func=lambda m: tg.check_state(m.chat.id, m.from_user.id, CBT.BIND_PRODUCTS_FILE))
 
-    tg.cbq_handler(switch_lot_setting, lambda c: c.data.startswith("switch_lot:"))
-    tg.cbq_handler(create_lot_delivery_test, lambda c: c.data.startswith("test_auto_delivery:"))
-    tg.cbq_handler(del_lot, lambda c: c.data.startswith(f"{CBT.DEL_AD_LOT}:"))
+    tg.cbq_handler(switch_lot_setting, prefix="switch_lot")
+    tg.cbq_handler(create_lot_delivery_test, prefix="test_auto_delivery")
+    tg.cbq_handler(del_lot, prefix=CBT.DEL_AD_LOT)
 
     # Меню добавления лота с FunPay
-    tg.cbq_handler(add_ad_to_lot, lambda c: c.data.startswith(f"{CBT.ADD_AD_TO_LOT}:"))
-    tg.cbq_handler(update_funpay_lots_list, lambda c: c.data.startswith("update_funpay_lots:"))
+    tg.cbq_handler(add_ad_to_lot, prefix=CBT.ADD_AD_TO_LOT)
+    tg.cbq_handler(update_funpay_lots_list, prefix="update_funpay_lots")
 
     # Меню управления файлов с товарами.
-    tg.cbq_handler(open_gf_settings, lambda c: c.data.startswith(f"{CBT.EDIT_PRODUCTS_FILE}:"))
+    tg.cbq_handler(open_gf_settings, prefix=CBT.EDIT_PRODUCTS_FILE)
 
-    tg.cbq_handler(act_add_products_to_file, lambda c: c.data.startswith(f"{CBT.ADD_PRODUCTS_TO_FILE}:"))
+    tg.cbq_handler(act_add_products_to_file, prefix=CBT.ADD_PRODUCTS_TO_FILE)
     tg.msg_handler(add_products_to_file,
                    func=lambda m: tg.check_state(m.chat.id, m.from_user.id, CBT.ADD_PRODUCTS_TO_FILE))
 
-    tg.cbq_handler(send_products_file, lambda c: c.data.startswith("download_products_file:"))
-    tg.cbq_handler(ask_del_products_file, lambda c: c.data.startswith("del_products_file:"))
-    tg.cbq_handler(del_products_file, lambda c: c.data.startswith("confirm_del_products_file:"))
+    tg.cbq_handler(send_products_file, prefix="download_products_file")
+    tg.cbq_handler(ask_del_products_file, prefix="del_products_file")
+    tg.cbq_handler(del_products_file, prefix="confirm_del_products_file")
 
 
 BIND_TO_PRE_INIT = [init_auto_delivery_cp]
@@ -262,23 +262,23 @@ def init_auto_response_cp(cardinal: Cardinal, *args):
         bot.answer_callback_query(c.id)
 
     # Регистрируем хэндлеры
-    tg.cbq_handler(open_commands_list, lambda c: c.data.startswith(f"{CBT.CMD_LIST}:"))
+    tg.cbq_handler(open_commands_list, prefix=CBT.CMD_LIST)
 
-    tg.cbq_handler(act_add_command, lambda c: c.data == CBT.ADD_CMD)
+    tg.cbq_handler(act_add_command, exact=CBT.ADD_CMD)
     tg.msg_handler(add_command, func=lambda m: tg.check_state(m.chat.id, m.from_user.id, CBT.ADD_CMD))
 
-    tg.cbq_handler(open_edit_command_cp, lambda c: c.data.startswith(f"{CBT.EDIT_CMD}:"))
+    tg.cbq_handler(open_edit_command_cp, prefix=CBT.EDIT_CMD)
 
-    tg.cbq_handler(act_edit_command_response, lambda c: c.data.startswith(f"{CBT.EDIT_CMD_RESPONSE_TEXT}:"))
+    tg.cbq_handler(act_edit_command_response, prefix=CBT.EDIT_CMD_RESPONSE_TEXT)
     tg.msg_handler(edit_command_response,
                    func=lambda m: tg.check_state(m.chat.id, m.from_user.id, CBT.EDIT_CMD_RESPONSE_TEXT))
 
-    tg.cbq_handler(act_edit_command_notification, lambda c: c.data.startswith(f"{CBT.EDIT_CMD_NOTIFICATION_TEXT}:"))
+    tg.cbq_handler(act_edit_command_notification, prefix=CBT.EDIT_CMD_NOTIFICATION_TEXT)
     tg.msg_handler(edit_command_notification,
                    func=lambda m: tg.check_state(m.chat.id, m.from_user.id, CBT.EDIT_CMD_NOTIFICATION_TEXT))
 
-    tg.cbq_handler(switch_command_settings, lambda c: c.data.startswith(f"{CBT.SWITCH_CMD_SETTING}:"))
-    tg.cbq_handler(del_command, lambda c: c.data.startswith(f"{CBT.DEL_CMD}:"))
+    tg.cbq_handler(switch_command_settings, prefix=CBT.SWITCH_CMD_SETTING)
+    tg.cbq_handler(del_command, prefix=CBT.DEL_CMD)
 
 
 BIND_TO_PRE_INIT = [init_auto_response_cp]
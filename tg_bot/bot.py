@@ -5,7 +5,7 @@
 from __future__ import annotations
 
 import re
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable
 
 from FunPayAPI import Account
 from tg_bot.utils import NotificationTypes
@@ -13,6 +13,7 @@ from tg_bot.utils import NotificationTypes
 if TYPE_CHECKING:
     from cardinal import Cardinal
 
+import io
 import os
 import sys
 import time
@@ -20,13 +21,15 @@ import random
 import string
 import psutil
 import telebot
-from telebot.apihelper import ApiTelegramException
 import logging
 
 from telebot.types import InlineKeyboardMarkup as K, InlineKeyboardButton as B, Message, CallbackQuery, BotCommand, \
     InputFile
 from tg_bot import utils, static_keyboards as skb, keyboards as kb, CBT
-from Utils import cardinal_tools, updater
+from tg_bot.notifications import NotificationQueue
+from tg_bot.router import CallbackRouter, parse_callback_args
+from Utils import cardinal_tools, updater, log_reader, log_store
+from Utils import logger as logger_tools
 from locales.localizer import Localizer
 
 logger = logging.getLogger("TGBot")
@@ -68,6 +71,10 @@ class TGBot:
         # }
         #
         self.notification_settings = utils.load_notification_settings()  # настройки уведомлений.
+        self.notifications = NotificationQueue(self)  # очередь отправки уведомлений.
+        self.notifications.coalesce_window = int(self.cardinal.MAIN_CFG["Telegram"]["notificationsEditWindow"])
+        self.router = CallbackRouter()  # маршрутизатор callback'ов (см. cbq_handler).
+        self.__router_registered = False
         self.answer_templates = utils.load_answer_templates()  # заготовки ответов.
         self.authorized_users = utils.load_authorized_users()  # авторизированные пользователи.
 
@@ -88,6 +95,8 @@ class TGBot:
             "logs": "cmd_logs",
             "about": "cmd_about",
             "sys": "cmd_sys",
+            "profiler": "cmd_profiler",
+            "log_search": "cmd_log_search",
             "get_backup": "cmd_get_backup",
             "create_backup": "cmd_create_backup",
             "upload_backup": "cmd_upload_backup",
@@ -233,14 +242,34 @@ class TGBot:
                 logger.error(_("log_tg_handler_error"))
                 logger.debug("TRACEBACK", exc_info=True)
 
-    def cbq_handler(self, handler, func, **kwargs):
+    def cbq_handler(self, handler, func: Callable[[CallbackQuery], bool] | None = None, prefix: str | None = None,
+                    exact: str | None = None, **kwargs):
         """
         Регистрирует хэндлер, срабатывающий при новом callback'е.
 
+        Если указан prefix (CBT-префикс, хэндлер срабатывает на callback data вида "префикс:аргументы") или exact
+        (точное значение callback data), хэндлер добавляется в маршрутизатор self.router, который находит его
+        поиском по словарю (func в этом случае - дополнительный фильтр). Иначе хэндлер регистрируется в telebot
+        с функцией-фильтром func (используется, например, плагинами).
+        Маршрутизатор регистрируется в telebot в :meth:`register_router` после хэндлеров плагинов, привязанных
+        к BIND_TO_PRE_INIT, поэтому хэндлеры плагинов с фильтрами проверяются раньше встроенных хэндлеров.
+
+        Разобранные аргументы callback'а (см. :func:`tg_bot.router.parse_callback_args`) доступны хэндлерам
+        маршрутизатора в call.args.
+
         :param handler: хэндлер.
         :param func: функция-фильтр.
+        :param prefix: CBT-префикс (без ":").
+        :param exact: точное значение callback data.
         :param kwargs: аргументы для хэндлера.
         """
+        if (prefix is not None or exact is not None) and not kwargs:
+            self.router.add(handler, prefix, exact, func)
+            return
+        if prefix is not None:
+            func = (lambda c, f=func: c.data.startswith(f"{prefix}:") and (f is None or f(c)))
+        elif exact is not None:
+            func = (lambda c, f=func: c.data == exact and (f is None or f(c)))
         bot_instance = self.bot
 
         @bot_instance.callback_query_handler(func, **kwargs)
@@ -251,6 +280,30 @@ class TGBot:
                 logger.error(_("log_tg_handler_error"))
                 logger.debug("TRACEBACK", exc_info=True)
 
+    def register_router(self):
+        """
+        Регистрирует маршрутизатор callback'ов (self.router) в telebot. Хэндлеры с фильтрами, зарегистрированные
+        до вызова, проверяются раньше маршрутизатора, после вызова - позже. Хэндлеры можно добавлять в
+        маршрутизатор и после регистрации.
+        """
+        if self.__router_registered:
+            return
+        self.__router_registered = True
+        self.bot.register_callback_query_handler(self.__run_routed_handler, self.__resolve_route)
+
+    def __resolve_route(self, call: CallbackQuery) -> bool:
+        call.route = self.router.resolve(call)
+        return call.route is not None
+
+    @staticmethod
+    def __run_routed_handler(call: CallbackQuery):
+        call.args = parse_callback_args(call.data)
+        try:
+            call.route(call)
+        except:
+            logger.error(_("log_tg_handler_error"))
+            logger.debug("TRACEBACK", exc_info=True)
+
     def mdw_handler(self, handler, **kwargs):
         """
         Регистрирует промежуточный хэндлер.
@@ -356,7 +409,8 @@ class TGBot:
             return
         self.bot.delete_message(m.chat.id, m.id)
         new_account = Account(golden_key, self.cardinal.account.user_agent, proxy=self.cardinal.proxy,
-                              locale=self.cardinal.account.locale)
+                              locale=self.cardinal.account.locale,
+                              adapter=Account.get_shared_adapter(self.cardinal.proxy))
         try:
             new_account.get()
         except:
@@ -506,33 +560,43 @@ class TGBot:
 
     def send_logs(self, m: Message):
         """
-        Отправляет файл логов.
+        Отправляет файл логов и текст последних ошибок.
+
+        /logs - файл лога и текст последней ошибки, /logs N - текст N последних ошибок (до 10),
+        /logs gz - сжатый файл лога, /logs all - архив с текущим и ротированными файлами лога.
         """
         if not os.path.exists("logs/log.log"):
             self.bot.send_message(m.chat.id, _("logfile_not_found"))
-        else:
-            self.bot.send_message(m.chat.id, _("logfile_sending"))
-            try:
+            return
+        args = m.text.split()[1:]
+        errors_count = min(10, int(args[0])) if args and args[0].isdigit() and int(args[0]) > 0 else 1
+        self.bot.send_message(m.chat.id, _("logfile_sending"))
+        try:
+            caption = f'{_("gs_old_msg_mode").replace("{} ", "") if self.cardinal.old_mode_enabled else ""}'
+            if args and args[0] == "all":
+                archive = log_reader.compress_logs()
+                self.bot.send_document(m.chat.id, archive, caption=caption, visible_file_name=archive.name)
+            elif args and args[0] == "gz":
+                archive = log_reader.compress_log()
+                self.bot.send_document(m.chat.id, archive, caption=caption, visible_file_name=archive.name)
+            elif not args:
                 with open("logs/log.log", "r", encoding="utf-8") as f:
-                    self.bot.send_document(m.chat.id, f,
-                                           caption=f'{_("gs_old_msg_mode").replace("{} ", "") if self.cardinal.old_mode_enabled else ""}')
-                    f.seek(0)
-                    file_content = f.read()
-                    if "TRACEBACK" in file_content:
-                        file_content, right = file_content.rsplit("TRACEBACK", 1)
-                        file_content = "\n[".join(file_content.rsplit("\n[", 2)[-2:])
-                        right = right.split("\n[", 1)[0]  # locale
-                        result = f"<b>Текст последней ошибки:</b>\n\n[{utils.escape(file_content)}TRACEBACK{utils.escape(right)}"
-                        while result:
-                            text, result = result[:4096], result[4096:]
-                            self.bot.send_message(m.chat.id, text)
-                            time.sleep(0.5)
-                    else:
-                        self.bot.send_message(m.chat.id, "<b>Ошибок в последнем лог-файле не обнаружено.</b>")  # locale
-            except:
-                logger.warning("Не удалось отправить лог-файл")
-                logger.debug("TRACEBACK", exc_info=True)
-                self.bot.send_message(m.chat.id, _("logfile_error"))
+                    self.bot.send_document(m.chat.id, f, caption=caption)
+
+            errors = log_reader.get_last_errors("logs/log.log", errors_count)
+            if not errors:
+                self.bot.send_message(m.chat.id, "<b>Ошибок в последнем лог-файле не обнаружено.</b>")  # locale
+                return
+            for error in errors:
+                result = f"<b>Текст последней ошибки:</b>\n\n{utils.escape(error)}"  # locale
+                while result:
+                    text, result = result[:4096], result[4096:]
+                    self.bot.send_message(m.chat.id, text)
+                    time.sleep(0.5)
+        except:
+            logger.warning("Не удалось отправить лог-файл")
+            logger.debug("TRACEBACK", exc_info=True)
+            self.bot.send_message(m.chat.id, _("logfile_error"))
 
     def del_logs(self, m: Message):
         """
@@ -642,11 +706,90 @@ class TGBot:
                                            psutil.Process().memory_info().rss // 1048576,
                                            cardinal_tools.time_to_str(uptime), m.chat.id))
 
+    def send_profiler_report(self, m: Message):
+        """
+        Управляет профилировщиком хэндлеров (/profiler on | off | reset | dump) или отправляет его отчет.
+        """
+        profiler = self.cardinal.profiler
+        action = m.text.split()[1].lower() if len(m.text.split()) > 1 else ""
+        if action in ("on", "off"):
+            profiler.enabled = action == "on"
+            logger.info(f"Пользователь $MAGENTA@{m.from_user.username} (id: {m.from_user.id})$RESET "  # locale
+                        f"{'включил' if profiler.enabled else 'выключил'} профилировщик хэндлеров.")  # locale
+            self.bot.send_message(m.chat.id, _("profiler_enabled" if profiler.enabled else "profiler_disabled"))
+            return
+        elif action == "reset":
+            profiler.reset()
+            self.bot.send_message(m.chat.id, _("profiler_reset"))
+            return
+        elif action == "dump":
+            try:
+                with open(profiler.dump(), "r", encoding="utf-8") as f:
+                    self.bot.send_document(m.chat.id, f)
+            except:
+                logger.warning("Не удалось отправить статистику хэндлеров.")  # locale
+                logger.debug("TRACEBACK", exc_info=True)
+            return
+
+        state = _("profiler_state_on" if profiler.enabled else "profiler_state_off")
+        stats = profiler.get_stats()
+        if not stats:
+            self.bot.send_message(m.chat.id, _("profiler_no_data", state))
+            return
+        lines = []
+        for i in stats[:15]:
+            name = i["name"]
+            if i["plugin_uuid"] in self.cardinal.plugins:
+                name = f"{self.cardinal.plugins[i['plugin_uuid']].name}: {name}"
+            lines.append(_("profiler_line", utils.escape(name), i["event_type"], i["calls"], i["errors"], i["total"],
+                           i["p50"] * 1000, i["p99"] * 1000))
+        self.bot.send_message(m.chat.id, _("profiler_report", state, "\n".join(lines)))
+
+    def send_log_search(self, m: Message):
+        """
+        Ищет записи в структурированном логе (/log_search order=ID chat=ID level=W plugin=UUID since=2h until=30m
+        text=слово limit=N). Если результат не помещается в сообщение, он отправляется файлом.
+        """
+        if logger_tools.STRUCTURED_HANDLER is None:
+            self.bot.send_message(m.chat.id, _("log_search_disabled"))
+            return
+        args = dict(i.split("=", 1) for i in m.text.split()[1:] if "=" in i)
+        if not args:
+            self.bot.send_message(m.chat.id, _("log_search_usage"))
+            return
+        try:
+            entries = log_store.query_logs(
+                logger_tools.STRUCTURED_HANDLER.folder, order=args.get("order"),
+                chat=int(args["chat"]) if "chat" in args else None, level=args.get("level"),
+                plugin=args.get("plugin"), since=log_store.parse_time(args["since"]) if "since" in args else None,
+                until=log_store.parse_time(args["until"]) if "until" in args else None, text=args.get("text"),
+                limit=max(min(int(args.get("limit", 50)), 1000), 1))
+        except ValueError:
+            self.bot.send_message(m.chat.id, _("log_search_usage"))
+            return
+        except:
+            logger.error("Не удалось выполнить поиск по структурированному логу.")  # locale
+            logger.debug("TRACEBACK", exc_info=True)
+            self.bot.send_message(m.chat.id, _("log_search_error"))
+            return
+
+        if not entries:
+            self.bot.send_message(m.chat.id, _("log_search_not_found"))
+            return
+        text = "\n".join(log_store.format_entry(i) for i in entries)
+        if len(text) < 4000:
+            self.bot.send_message(m.chat.id, f"<code>{utils.escape(text)}</code>")
+            return
+        result = io.BytesIO(text.encode("utf-8"))
+        result.name = "log_search.log"
+        self.bot.send_document(m.chat.id, result, visible_file_name=result.name)
+
     def restart_cardinal(self, m: Message):
         """
         Перезапускает кардинал.
         """
         self.bot.send_message(m.chat.id, _("restarting"))
+        self.cardinal.save_chats_directory(force=True)
         cardinal_tools.restart_program()
 
     def ask_power_off(self, m: Message):
@@ -666,9 +809,7 @@ class TGBot:
         """
         Отключает FPC.
         """
-        split = c.data.split(":")
-        state = int(split[1])
-        instance_id = int(split[2])
+        state, instance_id = c.args[:2]
 
         if instance_id != self.cardinal.instance_id:
             self.bot.edit_message_text(_("power_off_error"), c.message.chat.id, c.message.id)
@@ -678,6 +819,7 @@ class TGBot:
         if state == 6:
             self.bot.edit_message_text(_("power_off_6"), c.message.chat.id, c.message.id)
             self.bot.answer_callback_query(c.id)
+            self.cardinal.save_chats_directory(force=True)
             cardinal_tools.shut_down()
             return
 
@@ -1069,20 +1211,20 @@ class TGBot:
         self.msg_handler(self.act_change_cookie, commands=["change_cookie", "golden_key"])
         self.msg_handler(self.change_cookie, func=lambda m: self.check_state(m.chat.id, m.from_user.id,
                                                                              CBT.CHANGE_GOLDEN_KEY))
-        self.cbq_handler(self.update_profile, lambda c: c.data == CBT.UPDATE_PROFILE)
+        self.cbq_handler(self.update_profile, exact=CBT.UPDATE_PROFILE)
         self.msg_handler(self.act_manual_delivery_test, commands=["test_lot"])
         self.msg_handler(self.act_upload_image, commands=["upload_chat_img", "upload_offer_img"])
         self.msg_handler(self.act_upload_backup, commands=["upload_backup"])
-        self.cbq_handler(self.act_edit_greetings_text, lambda c: c.data == CBT.EDIT_GREETINGS_TEXT)
+        self.cbq_handler(self.act_edit_greetings_text, exact=CBT.EDIT_GREETINGS_TEXT)
         self.msg_handler(self.edit_greetings_text,
                          func=lambda m: self.check_state(m.chat.id, m.from_user.id, CBT.EDIT_GREETINGS_TEXT))
-        self.cbq_handler(self.act_edit_greetings_cooldown, lambda c: c.data == CBT.EDIT_GREETINGS_COOLDOWN)
+        self.cbq_handler(self.act_edit_greetings_cooldown, exact=CBT.EDIT_GREETINGS_COOLDOWN)
         self.msg_handler(self.edit_greetings_cooldown,
                          func=lambda m: self.check_state(m.chat.id, m.from_user.id, CBT.EDIT_GREETINGS_COOLDOWN))
-        self.cbq_handler(self.act_edit_order_confirm_reply_text, lambda c: c.data == CBT.EDIT_ORDER_CONFIRM_REPLY_TEXT)
+        self.cbq_handler(self.act_edit_order_confirm_reply_text, exact=CBT.EDIT_ORDER_CONFIRM_REPLY_TEXT)
         self.msg_handler(self.edit_order_confirm_reply_text,
                          func=lambda m: self.check_state(m.chat.id, m.from_user.id, CBT.EDIT_ORDER_CONFIRM_REPLY_TEXT))
-        self.cbq_handler(self.act_edit_review_reply_text, lambda c: c.data.startswith(f"{CBT.EDIT_REVIEW_REPLY_TEXT}:"))
+        self.cbq_handler(self.act_edit_review_reply_text, prefix=CBT.EDIT_REVIEW_REPLY_TEXT)
         self.msg_handler(self.edit_review_reply_text,
                          func=lambda m: self.check_state(m.chat.id, m.from_user.id, CBT.EDIT_REVIEW_REPLY_TEXT))
         self.msg_handler(self.manual_delivery_text,
@@ -1103,77 +1245,54 @@ class TGBot:
         self.msg_handler(self.get_backup, commands=["get_backup"])
         self.msg_handler(self.create_backup, commands=["create_backup"])
         self.msg_handler(self.send_system_info, commands=["sys"])
+        self.msg_handler(self.send_profiler_report, commands=["profiler"])
+        self.msg_handler(self.send_log_search, commands=["log_search"])
         self.msg_handler(self.restart_cardinal, commands=["restart"])
         self.msg_handler(self.ask_power_off, commands=["power_off"])
         self.msg_handler(self.send_announcements_kb, commands=["announcements"])
-        self.cbq_handler(self.send_review_reply_text, lambda c: c.data.startswith(f"{CBT.SEND_REVIEW_REPLY_TEXT}:"))
+        self.cbq_handler(self.send_review_reply_text, prefix=CBT.SEND_REVIEW_REPLY_TEXT)
 
-        self.cbq_handler(self.act_send_funpay_message, lambda c: c.data.startswith(f"{CBT.SEND_FP_MESSAGE}:"))
-        self.cbq_handler(self.open_reply_menu, lambda c: c.data.startswith(f"{CBT.BACK_TO_REPLY_KB}:"))
-        self.cbq_handler(self.extend_new_message_notification, lambda c: c.data.startswith(f"{CBT.EXTEND_CHAT}:"))
+        self.cbq_handler(self.act_send_funpay_message, prefix=CBT.SEND_FP_MESSAGE)
+        self.cbq_handler(self.open_reply_menu, prefix=CBT.BACK_TO_REPLY_KB)
+        self.cbq_handler(self.extend_new_message_notification, prefix=CBT.EXTEND_CHAT)
         self.msg_handler(self.send_funpay_message,
                          func=lambda m: self.check_state(m.chat.id, m.from_user.id, CBT.SEND_FP_MESSAGE))
-        self.cbq_handler(self.ask_confirm_refund, lambda c: c.data.startswith(f"{CBT.REQUEST_REFUND}:"))
-        self.cbq_handler(self.cancel_refund, lambda c: c.data.startswith(f"{CBT.REFUND_CANCELLED}:"))
-        self.cbq_handler(self.refund, lambda c: c.data.startswith(f"{CBT.REFUND_CONFIRMED}:"))
-        self.cbq_handler(self.open_order_menu, lambda c: c.data.startswith(f"{CBT.BACK_TO_ORDER_KB}:"))
-        self.cbq_handler(self.open_cp, lambda c: c.data == CBT.MAIN)
-        self.cbq_handler(self.open_cp2, lambda c: c.data == CBT.MAIN2)
-        self.cbq_handler(self.open_settings_section, lambda c: c.data.startswith(f"{CBT.CATEGORY}:"))
-        self.cbq_handler(self.switch_param, lambda c: c.data.startswith(f"{CBT.SWITCH}:"))
-        self.cbq_handler(self.switch_chat_notification, lambda c: c.data.startswith(f"{CBT.SWITCH_TG_NOTIFICATIONS}:"))
-        self.cbq_handler(self.power_off, lambda c: c.data.startswith(f"{CBT.SHUT_DOWN}:"))
-        self.cbq_handler(self.cancel_power_off, lambda c: c.data == CBT.CANCEL_SHUTTING_DOWN)
-        self.cbq_handler(self.cancel_action, lambda c: c.data == CBT.CLEAR_STATE)
-        self.cbq_handler(self.send_old_mode_help_text, lambda c: c.data == CBT.OLD_MOD_HELP)
-        self.cbq_handler(self.empty_callback, lambda c: c.data == CBT.EMPTY)
-        self.cbq_handler(self.switch_lang, lambda c: c.data.startswith(f"{CBT.LANG}:"))
+        self.cbq_handler(self.ask_confirm_refund, prefix=CBT.REQUEST_REFUND)
+        self.cbq_handler(self.cancel_refund, prefix=CBT.REFUND_CANCELLED)
+        self.cbq_handler(self.refund, prefix=CBT.REFUND_CONFIRMED)
+        self.cbq_handler(self.open_order_menu, prefix=CBT.BACK_TO_ORDER_KB)
+        self.cbq_handler(self.open_cp, exact=CBT.MAIN)
+        self.cbq_handler(self.open_cp2, exact=CBT.MAIN2)
+        self.cbq_handler(self.open_settings_section, prefix=CBT.CATEGORY)
+        self.cbq_handler(self.switch_param, prefix=CBT.SWITCH)
+        self.cbq_handler(self.switch_chat_notification, prefix=CBT.SWITCH_TG_NOTIFICATIONS)
+        self.cbq_handler(self.power_off, prefix=CBT.SHUT_DOWN)
+        self.cbq_handler(self.cancel_power_off, exact=CBT.CANCEL_SHUTTING_DOWN)
+        self.cbq_handler(self.cancel_action, exact=CBT.CLEAR_STATE)
+        self.cbq_handler(self.send_old_mode_help_text, exact=CBT.OLD_MOD_HELP)
+        self.cbq_handler(self.empty_callback, exact=CBT.EMPTY)
+        self.cbq_handler(self.switch_lang, prefix=CBT.LANG)
 
     def send_notification(self, text: str | None, keyboard: K | None = None,
                           notification_type: str = utils.NotificationTypes.other, photo: bytes | None = None,
-                          pin: bool = False):
+                          pin: bool = False, coalesce_key: str | int | None = None):
         """
-        Отправляет сообщение во все чаты для уведомлений из self.notification_settings.
+        Ставит уведомление в очередь отправки (self.notifications) для всех чатов из self.notification_settings,
+        в которых включен данный тип уведомлений.
 
         :param text: текст уведомления.
         :param keyboard: экземпляр клавиатуры.
         :param notification_type: тип уведомления.
         :param photo: фотография (если нужна).
         :param pin: закреплять ли сообщение.
+        :param coalesce_key: ключ объединения уведомлений (например, ID FunPay чата), см.
+            :class:`tg_bot.notifications.NotificationQueue`.
         """
-        kwargs = {}
-        if keyboard is not None:
-            kwargs["reply_markup"] = keyboard
-        to_delete = []
-        for chat_id in self.notification_settings:
+        for chat_id in list(self.notification_settings):
             if notification_type != utils.NotificationTypes.important_announcement and \
                     not self.is_notification_enabled(chat_id, notification_type):
                 continue
-
-            try:
-                if photo:
-                    msg = self.bot.send_photo(chat_id, photo, text, **kwargs)
-                else:
-                    msg = self.bot.send_message(chat_id, text, **kwargs)
-
-                if notification_type == utils.NotificationTypes.bot_start:
-                    self.init_messages.append((msg.chat.id, msg.id))
-
-                if pin:
-                    self.bot.pin_chat_message(msg.chat.id, msg.id)
-            except Exception as e:
-                logger.error(_("log_tg_notification_error", chat_id))
-                logger.debug("TRACEBACK", exc_info=True)
-                if isinstance(e, ApiTelegramException) and (
-                        e.result.status_code == 403 or e.result.status_code == 400 and
-                        (e.result_json.get('description') in \
-                         ("Bad Request: group chat was upgraded to a supergroup chat", "Bad Request: chat not found"))):
-                    to_delete.append(chat_id)
-                continue
-        for chat_id in to_delete:
-            if chat_id in self.notification_settings:
-                del self.notification_settings[chat_id]
-                utils.save_notification_settings(self.notification_settings)
+            self.notifications.put(chat_id, text, keyboard, notification_type, photo, pin, coalesce_key)
 
     def add_command_to_menu(self, command: str, help_text: str) -> None:
         """
@@ -1230,6 +1349,7 @@ class TGBot:
         """
         Запускает поллинг.
         """
+        self.notifications.start()
         self.send_notification(_("bot_started"), notification_type=utils.NotificationTypes.bot_start)
         k_err = 0
         while True:
@@ -68,8 +68,8 @@ def init_config_loader_cp(cardinal: Cardinal, *args):
         logger.info(_("log_cfg_downloaded", c.from_user.username, c.from_user.id, path))
         bot.answer_callback_query(c.id)
 
-    tg.cbq_handler(open_config_loader, lambda c: c.data == CBT.CONFIG_LOADER)
-    tg.cbq_handler(send_config, lambda c: c.data.startswith(f"{CBT.DOWNLOAD_CFG}:"))
+    tg.cbq_handler(open_config_loader, exact=CBT.CONFIG_LOADER)
+    tg.cbq_handler(send_config, prefix=CBT.DOWNLOAD_CFG)
 
 
 BIND_TO_PRE_INIT = [init_config_loader_cp]
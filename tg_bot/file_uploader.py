@@ -10,10 +10,12 @@ if TYPE_CHECKING:
     from tg_bot.bot import TGBot
 
 from Utils import config_loader as cfg_loader, exceptions as excs, cardinal_tools, updater
+from Utils.products_catalog import CATALOG
 from telebot.types import InlineKeyboardButton as Button
 from tg_bot import utils, keyboards, CBT
 from tg_bot.static_keyboards import CLEAR_STATE_BTN
 from telebot import types
+import tempfile
 import logging
 import os
 
@@ -85,41 +87,67 @@ def init_uploader(cardinal: Cardinal):
     bot = tg.bot
 
     def act_upload_products_file(c: types.CallbackQuery):
-        result = bot.send_message(c.message.chat.id, "Отправьте мне файл с товарами.",
+        result = bot.send_message(c.message.chat.id, "Отправьте мне файл с товарами.\n"
+                                                     "Если файл с таким названием уже есть, товары будут добавлены "
+                                                     "в его конец (дубликаты пропускаются).",  # locale
                                   reply_markup=CLEAR_STATE_BTN())
         tg.set_state(c.message.chat.id, result.id, c.from_user.id, CBT.UPLOAD_PRODUCTS_FILE)
         bot.answer_callback_query(c.id)
 
     def upload_products_file(m: types.Message):
         """
-        Загружает файл с товарами.
+        Загружает файл с товарами. Если файл с таким названием уже существует, товары добавляются в его конец
+        (см. :func:`Utils.cardinal_tools.ingest_products`): дубликаты и некорректные строки пропускаются.
         """
         tg.clear_state(m.chat.id, m.from_user.id, True)
         if not check_file(tg, m, type_="txt"):
             return
-        with cardinal_tools.get_products_file_lock(f"storage/products/{m.document.file_name}"):
-            if not download_file(tg, m, m.document.file_name,
-                                 custom_path=f"storage/products"):
-                return
-
+        if m.document.file_name.startswith("."):
+            # такие имена у временных файлов (см. Utils.cardinal_tools._replace_file), в каталог они не попадают
+            bot.send_message(m.chat.id, "❌ Название файла не должно начинаться с точки.")  # locale
+            return
+        # Уникальное имя: несколько файлов могут загружаться одновременно.
+        fd, upload_path = tempfile.mkstemp(dir="storage/cache", prefix="products_upload_", suffix=".txt")
+        os.close(fd)
         try:
-            products_count = cardinal_tools.count_products(f"storage/products/{utils.escape(m.document.file_name)}")
+            if not download_file(tg, m, os.path.basename(upload_path)):
+                return
+            merged = os.path.exists(f"storage/products/{m.document.file_name}")
+            with open(upload_path, "rb") as f:
+                report = cardinal_tools.ingest_products(f"storage/products/{m.document.file_name}", f)
         except:
-            bot.send_message(m.chat.id, "❌ Произошла ошибка при подсчете товаров.")
+            bot.send_message(m.chat.id, "❌ Произошла ошибка при добавлении товаров.")
             logger.debug("TRACEBACK", exc_info=True)
             return
+        finally:
+            if os.path.exists(upload_path):
+                os.remove(upload_path)
+        CATALOG.invalidate()
 
-        file_number = os.listdir("storage/products").index(m.document.file_name)
+        file_number = CATALOG.get_id(m.document.file_name)
 
-        keyboard = types.InlineKeyboardMarkup() \
-            .add(Button("✏️ Редактировать файл", callback_data=f"{CBT.EDIT_PRODUCTS_FILE}:{file_number}:0"))
+        keyboard = types.InlineKeyboardMarkup()
+        if file_number is not None:
+            keyboard.add(Button("✏️ Редактировать файл", callback_data=f"{CBT.EDIT_PRODUCTS_FILE}:{file_number}:0"))
 
         logger.info(f"Пользователь $MAGENTA@{m.from_user.username} (id: {m.from_user.id})$RESET "
-                    f"загрузил в бота файл с товарами $YELLOWstorage/products/{m.document.file_name}$RESET.")
-
+                    f"загрузил в бота файл с товарами $YELLOWstorage/products/{m.document.file_name}$RESET "
+                    f"(добавлено: {report['added']}, дубликатов: {report['duplicates']}, "
+                    f"отклонено: {report['rejected']}).")
+
+        rejected = ""
+        if report["rejected"]:
+            rejected = f"\nНомера отклоненных строк: <code>{', '.join(str(i) for i in report['rejected_lines'])}" \
+                       f"{'...' if report['rejected'] > len(report['rejected_lines']) else ''}</code>"
+        merged_hint = "ℹ️ Файл с таким названием уже был, товары добавлены в его конец.\n" if merged else ""
         bot.send_message(m.chat.id,
-                         f"✅ Файл с товарами <code>storage/products/{m.document.file_name}</code> успешно загружен. "
-                         f"Товаров в файле: <code>{products_count}.</code>",
+                         f"✅ Файл с товарами <code>storage/products/{utils.escape(m.document.file_name)}</code> "
+                         f"успешно загружен.\n"
+                         f"{merged_hint}"
+                         f"Добавлено товаров: <code>{report['added']}</code>, "
+                         f"пропущено дубликатов: <code>{report['duplicates']}</code>, "
+                         f"отклонено строк: <code>{report['rejected']}</code>.{rejected}\n"
+                         f"Товаров в файле: <code>{report['total']}</code>.",
                          reply_markup=keyboard)
 
     def act_upload_main_config(c: types.CallbackQuery):
@@ -350,10 +378,10 @@ def init_uploader(cardinal: Cardinal):
             return
         tg.bot.send_message(m.chat.id, "✅ Бекап использован. Используй команду /restart.")
 
-    tg.cbq_handler(act_upload_products_file, lambda c: c.data == CBT.UPLOAD_PRODUCTS_FILE)
-    tg.cbq_handler(act_upload_auto_response_config, lambda c: c.data == "upload_auto_response_config")
-    tg.cbq_handler(act_upload_auto_delivery_config, lambda c: c.data == "upload_auto_delivery_config")
-    tg.cbq_handler(act_upload_main_config, lambda c: c.data == "upload_main_config")
+    tg.cbq_handler(act_upload_products_file, exact=CBT.UPLOAD_PRODUCTS_FILE)
+    tg.cbq_handler(act_upload_auto_response_config, exact="upload_auto_response_config")
+    tg.cbq_handler(act_upload_auto_delivery_config, exact="upload_auto_delivery_config")
+    tg.cbq_handler(act_upload_main_config, exact="upload_main_config")
 
     tg.file_handler(CBT.UPLOAD_PRODUCTS_FILE, upload_products_file)
     tg.file_handler("upload_auto_response_config", upload_auto_response_config)
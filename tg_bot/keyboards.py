@@ -13,7 +13,7 @@ from telebot.types import InlineKeyboardMarkup as K, InlineKeyboardButton as B
 from tg_bot import CBT, MENU_CFG
 from tg_bot.utils import NotificationTypes, bool_to_text, add_navigation_buttons
 
-import Utils
+from Utils.products_catalog import CATALOG
 from locales.localizer import Localizer
 
 import logging
@@ -411,17 +411,16 @@ def products_files_list(offset: int) -> K:
     :return: объект клавиатуры со списком товарных файлов.
     """
     keyboard = K()
-    files = os.listdir("storage/products")[offset:offset + MENU_CFG.PF_BTNS_AMOUNT]
+    files = CATALOG.get_page(offset, MENU_CFG.PF_BTNS_AMOUNT)
     if not files and offset != 0:
         offset = 0
-        files = os.listdir("storage/products")[offset:offset + 5]
+        files = CATALOG.get_page(offset, MENU_CFG.PF_BTNS_AMOUNT)
 
-    for index, name in enumerate(files):
-        amount = Utils.cardinal_tools.count_products(f"storage/products/{name}")
-        keyboard.add(B(f"{amount} {_('gl_pcs')}, {name}", None, f"{CBT.EDIT_PRODUCTS_FILE}:{offset + index}:{offset}"))
+    for file_id, name, amount in files:
+        keyboard.add(B(f"{amount} {_('gl_pcs')}, {name}", None, f"{CBT.EDIT_PRODUCTS_FILE}:{file_id}:{offset}"))
 
     keyboard = add_navigation_buttons(keyboard, offset, MENU_CFG.PF_BTNS_AMOUNT, len(files),
-                                      len(os.listdir("storage/products")), CBT.PRODUCTS_FILES_LIST)
+                                      len(CATALOG), CBT.PRODUCTS_FILES_LIST)
 
     keyboard.add(B(_("ad_to_ad"), None, f"{CBT.CATEGORY}:ad")) \
         .add(B(_("ad_to_mm"), None, CBT.MAIN))
@@ -433,7 +432,7 @@ def products_file_edit(file_number: int, offset: int, confirmation: bool = False
     """
     Генерирует клавиатуру изменения товарного файла (CBT.EDIT_PRODUCTS_FILE:<file_index>:<offset>).
 
-    :param file_number: номер файла.
+    :param file_number: ID файла (см. :class:`Utils.products_catalog.ProductsCatalog`).
     :param offset: смещение списка товарных файлов.
     :param confirmation: включить ли в клавиатуру подтверждение удаления файла.
 
@@ -525,13 +524,17 @@ def edit_lot(c: Cardinal, lot_number: int, offset: int) -> K:
     if not file_name:
         kb.add(B(_("ea_link_goods_file"), None, f"{CBT.BIND_PRODUCTS_FILE}:{lot_number}:{offset}"))
     else:
-        if file_name not in os.listdir("storage/products"):
+        if not os.path.exists(f"storage/products/{file_name}"):
             with open(f"storage/products/{file_name}", "w", encoding="utf-8"):
                 pass
-        file_number = os.listdir("storage/products").index(file_name)
+        file_number = CATALOG.get_id(file_name)
 
-        kb.row(B(_("ea_link_goods_file"), None, f"{CBT.BIND_PRODUCTS_FILE}:{lot_number}:{offset}"),
-               B(_("gf_add_goods"), None, f"{CBT.ADD_PRODUCTS_TO_FILE}:{file_number}:{lot_number}:{offset}:1"))
+        # Файлы, которых нет в каталоге (имя без .txt или начинается с "."), можно только перепривязать.
+        if file_number is None:
+            kb.add(B(_("ea_link_goods_file"), None, f"{CBT.BIND_PRODUCTS_FILE}:{lot_number}:{offset}"))
+        else:
+            kb.row(B(_("ea_link_goods_file"), None, f"{CBT.BIND_PRODUCTS_FILE}:{lot_number}:{offset}"),
+                   B(_("gf_add_goods"), None, f"{CBT.ADD_PRODUCTS_TO_FILE}:{file_number}:{lot_number}:{offset}:1"))
 
     p = {
         "ad": (c.MAIN_CFG["FunPay"].getboolean("autoDelivery"), "disable"),
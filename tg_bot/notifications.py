@@ -0,0 +1,411 @@
+"""
+В данном модуле описана очередь Telegram уведомлений: ограничение частоты отправки (общее и для каждого чата),
+приоритет уведомлений о заказах, объединение уведомлений о новых сообщениях из одного FunPay чата и сохранение
+неотправленных уведомлений на диск (чтобы они пережили перезапуск).
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+import threading
+import logging
+import base64
+import bisect
+import time
+
+if TYPE_CHECKING:
+    from tg_bot.bot import TGBot
+
+from telebot.apihelper import ApiTelegramException
+from telebot.types import InlineKeyboardMarkup as K
+from tg_bot import utils
+from Utils import metrics
+from locales.localizer import Localizer
+
+logger = logging.getLogger("TGBot")
+localizer = Localizer()
+_ = localizer.translate
+
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты ("ведро токенов").
+
+    :param rate: кол-во токенов, добавляемых в секунду.
+    :type rate: :obj:`int` or :obj:`float`
+
+    :param capacity: максимальное кол-во токенов (размер пачки, которую можно отправить без ожидания).
+    :type capacity: :obj:`int` or :obj:`float`
+    """
+
+    def __init__(self, rate: int | float, capacity: int | float):
+        self.rate: int | float = rate
+        self.capacity: int | float = capacity
+        self.tokens: float = capacity
+        self.updated: float = time.time()
+        self.blocked_until: float = 0
+
+    def delay(self, now: float) -> float:
+        """
+        Возвращает время (в секундах), через которое будет доступен токен (0 - доступен сейчас).
+
+        :param now: текущее время.
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        """
+        Забирает токен (вызывать после :meth:`delay`, вернувшего 0).
+        """
+        self.tokens -= 1
+
+    def block(self, seconds: int | float):
+        """
+        Запрещает выдачу токенов на указанное время (например, после ответа 429 с retry_after).
+
+        :param seconds: время (в секундах).
+        """
+        self.blocked_until = max(self.blocked_until, time.time() + seconds)
+        self.tokens = 0
+
+
+class Notification:
+    """
+    Уведомление для одного Telegram чата.
+    """
+    __slots__ = ("id", "chat_id", "text", "keyboard", "notification_type", "photo", "pin", "priority",
+                 "coalesce_key", "created", "attempts")
+
+    def __init__(self, id_: int, chat_id: int | str, text: str | None, keyboard: K | None, notification_type: str,
+                 photo: bytes | None, pin: bool, priority: int, coalesce_key: str | int | None,
+                 created: float | None = None, attempts: int = 0):
+        self.id: int = id_
+        self.chat_id: int | str = chat_id
+        self.text: str | None = text
+        self.keyboard: K | None = keyboard
+        self.notification_type: str = notification_type
+        self.photo: bytes | None = photo
+        self.pin: bool = pin
+        self.priority: int = priority
+        """Приоритет (0 - наивысший)."""
+        self.coalesce_key: str | int | None = coalesce_key
+        """Ключ объединения: уведомления с одинаковым ключом для одного чата объединяются в одно сообщение."""
+        self.created: float = created or time.time()
+        self.attempts: int = attempts
+
+    def __lt__(self, other: Notification):
+        return (self.priority, self.id) < (other.priority, other.id)
+
+    @property
+    def persistent(self) -> bool:
+        """
+        Можно ли сохранить уведомление на диск. Восстанавливаются только клавиатуры
+        :class:`telebot.types.InlineKeyboardMarkup`, уведомления с другими клавиатурами (например,
+        ReplyKeyboardMarkup из плагинов) отправляются без сохранения.
+        """
+        return self.keyboard is None or type(self.keyboard) is K
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "chat_id": self.chat_id, "text": self.text,
+                "keyboard": self.keyboard.to_json() if self.keyboard is not None else None,
+                "notification_type": self.notification_type,
+                "photo": base64.b64encode(self.photo).decode() if self.photo else None, "pin": self.pin,
+                "priority": self.priority, "coalesce_key": self.coalesce_key, "created": self.created,
+                "attempts": self.attempts}
+
+    @staticmethod
+    def from_dict(data: dict) -> Notification:
+        return Notification(data["id"], data["chat_id"], data["text"],
+                            K.de_json(data["keyboard"]) if data.get("keyboard") else None,
+                            data["notification_type"], base64.b64decode(data["photo"]) if data.get("photo") else None,
+                            data["pin"], data["priority"], data["coalesce_key"], data["created"],
+                            data.get("attempts", 0))
+
+
+class NotificationQueue:
+    """
+    Очередь Telegram уведомлений.
+
+    Уведомления отправляются в порядке приоритета (уведомления о заказах и выдаче товара - раньше остальных), но
+    не чаще :attr:`global_rate` сообщений в секунду всего и :attr:`chat_rate` сообщений в секунду в один чат
+    (лимиты Telegram Bot API). Уведомления одного чата отправляются по порядку.
+
+    Уведомления о новых сообщениях из одного FunPay чата (с одинаковым coalesce_key) объединяются, пока уведомление
+    ждет в очереди: к нему дописывается текст новых уведомлений. Если :attr:`coalesce_window` больше 0, уже
+    отправленное не более :attr:`coalesce_window` секунд назад сообщение редактируется вместо отправки нового:
+    это экономит лимиты Telegram, но редактирование не присылает push-уведомление, поэтому новые сообщения
+    покупателя в этом окне можно не заметить. По умолчанию окно выключено ([Telegram] notificationsEditWindow).
+
+    Очередь сохраняется на диск не реже раза в секунду при изменениях (см. :func:`tg_bot.utils.save_notifications_queue`)
+    и загружается при создании. Уведомления с клавиатурами, отличными от InlineKeyboardMarkup, не сохраняются
+    (см. :attr:`Notification.persistent`).
+
+    :param tg: экземпляр Telegram бота.
+    :type tg: :class:`tg_bot.bot.TGBot`
+
+    :param workers: кол-во потоков отправки.
+    :type workers: :obj:`int`, опционально
+    """
+    HIGH_PRIORITY_TYPES = {utils.NotificationTypes.bot_start, utils.NotificationTypes.new_order,
+                           utils.NotificationTypes.delivery, utils.NotificationTypes.order_confirmed,
+                           utils.NotificationTypes.critical}
+
+    def __init__(self, tg: TGBot, workers: int = 3):
+        self.tg: TGBot = tg
+        self.workers: int = workers
+        """Кол-во потоков отправки."""
+        self.global_rate: int | float = 25
+        """Максимальное кол-во сообщений в секунду (всего)."""
+        self.chat_rate: int | float = 1
+        """Максимальное кол-во сообщений в секунду в один чат."""
+        self.chat_burst: int = 3
+        """Кол-во сообщений, которое можно отправить в чат подряд без ожидания."""
+        self.coalesce_window: int | float = 0
+        """Время (в секундах), в течение которого отправленное уведомление дополняется (редактируется). 0 - не
+        редактировать отправленные уведомления."""
+        self.max_size: int = 5000
+        """Максимальное кол-во уведомлений в очереди."""
+        self.max_attempts: int = 5
+        """Максимальное кол-во попыток отправки одного уведомления."""
+
+        self.__items: list[Notification] = []
+        self.__in_flight: set[int | str] = set()
+        self.__buckets: dict[int | str, TokenBucket] = {}
+        self.__global_bucket: TokenBucket = TokenBucket(self.global_rate, self.global_rate)
+        self.__sent: dict[tuple[int | str, str | int], tuple[int, str, float]] = {}
+        """Последние отправленные объединяемые уведомления {(чат, ключ): (ID сообщения, текст, время)}."""
+        self.__sent_lock: threading.Lock = threading.Lock()
+        self.__condition: threading.Condition = threading.Condition()
+        self.__last_id: int = 0
+        self.__dirty: bool = False
+        self.__saved_time: float = 0
+        self.__threads: list[threading.Thread] = []
+        self.__coalesced: int = 0
+        self.__edited: int = 0
+        self.__retries: int = 0
+        self.__load()
+
+    def __load(self):
+        try:
+            items = [Notification.from_dict(i) for i in utils.load_notifications_queue()]
+        except:
+            logger.error("Не удалось загрузить очередь Telegram уведомлений.")  # locale
+            logger.debug("TRACEBACK", exc_info=True)
+            return
+        self.__items = sorted(items)
+        self.__last_id = max((i.id for i in items), default=0)
+        if items:
+            logger.info(f"Загружено $YELLOW{len(items)}$RESET неотправленных Telegram уведомлений.")  # locale
+
+    def __save(self):
+        with self.__condition:
+            if not self.__dirty:
+                return
+            data = [i.to_dict() for i in self.__items if i.persistent]
+            self.__dirty = False
+            self.__saved_time = time.time()
+        try:
+            utils.save_notifications_queue(data)
+        except:
+            logger.error("Не удалось сохранить очередь Telegram уведомлений.")  # locale
+            logger.debug("TRACEBACK", exc_info=True)
+
+    def start(self):
+        """
+        Запускает потоки отправки.
+        """
+        if self.__threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.__worker_loop, daemon=True, name=f"tg-notifications-{i}")
+            thread.start()
+            self.__threads.append(thread)
+
+    def put(self, chat_id: int | str, text: str | None, keyboard: K | None = None,
+            notification_type: str = utils.NotificationTypes.other, photo: bytes | None = None, pin: bool = False,
+            coalesce_key: str | int | None = None):
+        """
+        Ставит уведомление в очередь.
+
+        :param chat_id: ID Telegram чата.
+        :param text: текст уведомления.
+        :param keyboard: экземпляр клавиатуры.
+        :param notification_type: тип уведомления.
+        :param photo: фотография (если нужна).
+        :param pin: закреплять ли сообщение.
+        :param coalesce_key: ключ объединения (например, ID FunPay чата для уведомлений о новых сообщениях).
+        """
+        with self.__condition:
+            if coalesce_key is not None and not photo and text:
+                for item in self.__items:
+                    if item.chat_id == chat_id and item.coalesce_key == coalesce_key and \
+                            len(item.text) + len(text) + 2 <= MAX_MESSAGE_LENGTH:
+                        item.text = f"{item.text}\n\n{text}"
+                        item.keyboard = keyboard
+                        self.__coalesced += 1
+                        self.__dirty = True
+                        metrics.NOTIFICATIONS.inc(notification_type, "coalesced")
+                        return
+
+            priority = 0 if notification_type in self.HIGH_PRIORITY_TYPES else 1
+            if len(self.__items) >= self.max_size:
+                if priority or self.__items[-1].priority == 0:
+                    logger.warning(f"Очередь Telegram уведомлений переполнена, уведомление для чата "  # locale
+                                   f"$YELLOW{chat_id}$RESET пропущено.")  # locale
+                    metrics.NOTIFICATIONS.inc(notification_type, "dropped")
+                    return
+                dropped = self.__items.pop()
+                metrics.NOTIFICATIONS.inc(dropped.notification_type, "dropped")
+
+            self.__last_id += 1
+            bisect.insort(self.__items, Notification(self.__last_id, chat_id, text, keyboard, notification_type,
+                                                     photo, pin, priority, coalesce_key))
+            self.__dirty = True
+            metrics.NOTIFICATIONS_QUEUED.set(value=len(self.__items))
+            self.__condition.notify()
+
+    def __take(self) -> Notification:
+        with self.__condition:
+            while True:
+                now = time.time()
+                wait = 1
+                global_delay = self.__global_bucket.delay(now)
+                if global_delay:
+                    wait = global_delay
+                else:
+                    for index, item in enumerate(self.__items):
+                        if item.chat_id in self.__in_flight:
+                            continue
+                        bucket = self.__buckets.get(item.chat_id)
+                        if bucket is None:
+                            bucket = self.__buckets[item.chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+                        delay = bucket.delay(now)
+                        if not delay:
+                            bucket.consume()
+                            self.__global_bucket.consume()
+                            self.__in_flight.add(item.chat_id)
+                            self.__dirty = True
+                            metrics.NOTIFICATIONS_QUEUED.set(value=len(self.__items) - 1)
+                            return self.__items.pop(index)
+                        wait = min(wait, delay)
+                if self.__dirty and now - self.__saved_time >= 1:
+                    self.__condition.release()
+                    try:
+                        self.__save()
+                    finally:
+                        self.__condition.acquire()
+                    continue
+                self.__condition.wait(wait)
+
+    def __release(self, item: Notification, retry_after: int | float | None = None):
+        with self.__condition:
+            self.__in_flight.discard(item.chat_id)
+            if retry_after is not None:
+                item.attempts += 1
+                if item.attempts < self.max_attempts:
+                    self.__retries += 1
+                    self.__buckets[item.chat_id].block(retry_after)
+                    bisect.insort(self.__items, item)
+                    self.__dirty = True
+                else:
+                    metrics.NOTIFICATIONS.inc(item.notification_type, "error")
+            self.__condition.notify_all()
+
+    def __worker_loop(self):
+        while True:
+            item = self.__take()
+            retry_after = None
+            start = time.perf_counter()
+            try:
+                self.deliver(item)
+            except ApiTelegramException as e:
+                if e.error_code == 429:
+                    retry_after = (e.result_json.get("parameters") or {}).get("retry_after", 5)
+                    logger.warning(f"Telegram ограничил отправку сообщений в чат $YELLOW{item.chat_id}$RESET, "  # locale
+                                   f"повтор через $YELLOW{retry_after}$RESET сек.")  # locale
+                else:
+                    self.__handle_error(item, e)
+            except Exception:
+                retry_after = 5 * (item.attempts + 1)
+                logger.error(_("log_tg_notification_error", item.chat_id))
+                logger.debug("TRACEBACK", exc_info=True)
+            finally:
+                metrics.NOTIFICATION_DURATION.observe(item.notification_type, value=time.perf_counter() - start)
+                self.__release(item, retry_after)
+
+    def __handle_error(self, item: Notification, e: ApiTelegramException):
+        metrics.NOTIFICATIONS.inc(item.notification_type, "error")
+        logger.error(_("log_tg_notification_error", item.chat_id))
+        logger.debug("TRACEBACK", exc_info=True)
+        if e.result.status_code == 403 or e.result.status_code == 400 and \
+                (e.result_json.get('description') in
+                 ("Bad Request: group chat was upgraded to a supergroup chat", "Bad Request: chat not found")):
+            if str(item.chat_id) in self.tg.notification_settings:
+                del self.tg.notification_settings[str(item.chat_id)]
+                utils.save_notification_settings(self.tg.notification_settings)
+
+    def deliver(self, item: Notification):
+        """
+        Отправляет уведомление (без учета ограничений частоты). Если уведомление объединяемое, окно
+        :attr:`coalesce_window` включено и предыдущее уведомление с тем же ключом отправлено недавно, редактирует его.
+
+        :param item: уведомление.
+        """
+        bot = self.tg.bot
+        kwargs = {"reply_markup": item.keyboard} if item.keyboard is not None else {}
+        sent_key = (item.chat_id, item.coalesce_key) if item.coalesce_key is not None and self.coalesce_window > 0 \
+            else None
+        sent = self.__sent.get(sent_key) if sent_key else None
+        if sent and time.time() - sent[2] <= self.coalesce_window and \
+                len(sent[1]) + len(item.text) + 2 <= MAX_MESSAGE_LENGTH:
+            text = f"{sent[1]}\n\n{item.text}"
+            try:
+                bot.edit_message_text(text, item.chat_id, sent[0], **kwargs)
+                with self.__sent_lock:
+                    self.__sent[sent_key] = (sent[0], text, time.time())
+                    self.__edited += 1
+                metrics.NOTIFICATIONS.inc(item.notification_type, "edited")
+                return
+            except ApiTelegramException as e:
+                if e.error_code == 429:
+                    raise
+
+        if item.photo:
+            msg = bot.send_photo(item.chat_id, item.photo, item.text, **kwargs)
+        else:
+            msg = bot.send_message(item.chat_id, item.text, **kwargs)
+        metrics.NOTIFICATIONS.inc(item.notification_type, "ok")
+        if sent_key:
+            now = time.time()
+            with self.__sent_lock:
+                for key in [k for k, v in self.__sent.items() if now - v[2] > self.coalesce_window]:
+                    del self.__sent[key]
+                self.__sent[sent_key] = (msg.id, item.text, now)
+        if item.notification_type == utils.NotificationTypes.bot_start:
+            self.tg.init_messages.append((msg.chat.id, msg.id))
+        if item.pin:
+            try:
+                bot.pin_chat_message(msg.chat.id, msg.id)
+            except:
+                logger.warning(f"Не удалось закрепить уведомление в чате $YELLOW{item.chat_id}$RESET.")  # locale
+                logger.debug("TRACEBACK", exc_info=True)
+
+    def get_stats(self) -> dict:
+        """
+        Возвращает статистику очереди.
+
+        :return: словарь {"queued": уведомлений в очереди, "high_priority": из них приоритетных, "in_flight": чатов,
+            в которые сейчас отправляются уведомления, "coalesced": объединено в очереди, "edited": объединено
+            редактированием отправленного сообщения, "retries": повторных попыток после ошибок / 429}.
+        """
+        with self.__condition:
+            return {"queued": len(self.__items), "high_priority": len([i for i in self.__items if not i.priority]),
+                    "in_flight": len(self.__in_flight), "coalesced": self.__coalesced, "edited": self.__edited,
+                    "retries": self.__retries}
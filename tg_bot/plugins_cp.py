@@ -190,17 +190,17 @@ def init_plugins_cp(cardinal: Cardinal, *args):
             result = bot.send_message(obj.chat.id, _("pl_new"), reply_markup=UPLOAD_PLUGIN())
             tg.set_state(obj.chat.id, result.id, obj.from_user.id, CBT.UPLOAD_PLUGIN, {"offset": 0})
 
-    tg.cbq_handler(open_plugins_list, lambda c: c.data.startswith(f"{CBT.PLUGINS_LIST}:"))
-    tg.cbq_handler(open_edit_plugin_cp, lambda c: c.data.startswith(f"{CBT.EDIT_PLUGIN}:"))
-    tg.cbq_handler(open_plugin_commands, lambda c: c.data.startswith(f"{CBT.PLUGIN_COMMANDS}:"))
-    tg.cbq_handler(toggle_plugin, lambda c: c.data.startswith(f"{CBT.TOGGLE_PLUGIN}:"))
+    tg.cbq_handler(open_plugins_list, prefix=CBT.PLUGINS_LIST)
+    tg.cbq_handler(open_edit_plugin_cp, prefix=CBT.EDIT_PLUGIN)
+    tg.cbq_handler(open_plugin_commands, prefix=CBT.PLUGIN_COMMANDS)
+    tg.cbq_handler(toggle_plugin, prefix=CBT.TOGGLE_PLUGIN)
 
-    tg.cbq_handler(ask_delete_plugin, lambda c: c.data.startswith(f"{CBT.DELETE_PLUGIN}:"))
-    tg.cbq_handler(cancel_delete_plugin, lambda c: c.data.startswith(f"{CBT.CANCEL_DELETE_PLUGIN}:"))
-    tg.cbq_handler(delete_plugin, lambda c: c.data.startswith(f"{CBT.CONFIRM_DELETE_PLUGIN}:"))
-    tg.cbq_handler(pin_plugin, lambda c: c.data.startswith(f"{CBT.PIN_PLUGIN}:"))
+    tg.cbq_handler(ask_delete_plugin, prefix=CBT.DELETE_PLUGIN)
+    tg.cbq_handler(cancel_delete_plugin, prefix=CBT.CANCEL_DELETE_PLUGIN)
+    tg.cbq_handler(delete_plugin, prefix=CBT.CONFIRM_DELETE_PLUGIN)
+    tg.cbq_handler(pin_plugin, prefix=CBT.PIN_PLUGIN)
 
-    tg.cbq_handler(act_upload_plugin, lambda c: c.data.startswith(f"{CBT.UPLOAD_PLUGIN}:"))
+    tg.cbq_handler(act_upload_plugin, prefix=CBT.UPLOAD_PLUGIN)
     tg.msg_handler(act_upload_plugin, commands=["upload_plugin"])
 
 
@@ -141,10 +141,10 @@ def init_proxy_cp(crd: Cardinal, *args):
 
         open_proxy_list(c)
 
-    tg.cbq_handler(open_proxy_list, lambda c: c.data.startswith(f"{CBT.PROXY}:"))
-    tg.cbq_handler(act_add_proxy, lambda c: c.data.startswith(f"{CBT.ADD_PROXY}:"))
-    tg.cbq_handler(choose_proxy, lambda c: c.data.startswith(f"{CBT.CHOOSE_PROXY}:"))
-    tg.cbq_handler(delete_proxy, lambda c: c.data.startswith(f"{CBT.DELETE_PROXY}:"))
+    tg.cbq_handler(open_proxy_list, prefix=CBT.PROXY)
+    tg.cbq_handler(act_add_proxy, prefix=CBT.ADD_PROXY)
+    tg.cbq_handler(choose_proxy, prefix=CBT.CHOOSE_PROXY)
+    tg.cbq_handler(delete_proxy, prefix=CBT.DELETE_PROXY)
     tg.msg_handler(add_proxy, func=lambda m: crd.telegram.check_state(m.chat.id, m.from_user.id, CBT.ADD_PROXY))
 
 
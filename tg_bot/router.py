@@ -0,0 +1,108 @@
+"""
+В данном модуле описан маршрутизатор callback'ов Telegram бота: хэндлеры ищутся по CBT-префиксу
+(части callback data до первого ":") в словаре, а не перебором функций-фильтров.
+"""
+from __future__ import annotations
+
+from typing import Callable
+import re
+
+from telebot.types import CallbackQuery
+
+_INT_ARG = re.compile(r"^-?\d+$")
+
+
+def parse_callback_args(data: str) -> list[int | str]:
+    """
+    Разбирает аргументы callback'а (части callback data после CBT-префикса, разделенные ":").
+    Целые числа преобразуются в :obj:`int`, остальные аргументы остаются строками.
+
+    Например, "21:12345:0" -> [12345, 0].
+
+    :param data: callback data.
+
+    :return: список аргументов.
+    """
+    parts = data.split(":")[1:]
+    return [int(i) if _INT_ARG.match(i) else i for i in parts]
+
+
+class CallbackRouter:
+    """
+    Маршрутизатор callback'ов.
+
+    Хэндлеры регистрируются на точное значение callback data (:meth:`add` с exact) или на CBT-префикс
+    (:meth:`add` с prefix, срабатывает на callback data вида "префикс:аргументы"). Если на один ключ
+    зарегистрировано несколько хэндлеров, срабатывает первый, чья дополнительная функция-фильтр вернула True
+    (или у которого ее нет).
+    """
+
+    def __init__(self):
+        self.__exact: dict[str, list[tuple[Callable, Callable | None]]] = {}
+        self.__prefixes: dict[str, list[tuple[Callable, Callable | None]]] = {}
+
+    def add(self, handler: Callable[[CallbackQuery], None], prefix: str | None = None, exact: str | None = None,
+            func: Callable[[CallbackQuery], bool] | None = None):
+        """
+        Регистрирует хэндлер.
+
+        :param handler: хэндлер.
+        :param prefix: CBT-префикс (без ":").
+        :param exact: точное значение callback data.
+        :param func: дополнительная функция-фильтр, опционально.
+        """
+        if (prefix is None) == (exact is None):
+            raise ValueError("Нужно указать либо prefix, либо exact.")
+        routes = self.__prefixes if prefix is not None else self.__exact
+        routes.setdefault(prefix if prefix is not None else exact, []).append((handler, func))
+
+    def resolve(self, call: CallbackQuery) -> Callable[[CallbackQuery], None] | None:
+        """
+        Ищет хэндлер для callback'а.
+
+        :param call: callback.
+
+        :return: хэндлер или None, если подходящего хэндлера нет.
+        """
+        data = call.data
+        if data is None:
+            return None
+        prefix, sep, _ = data.partition(":")
+        for routes in (self.__exact.get(data), self.__prefixes.get(prefix) if sep else None):
+            if not routes:
+                continue
+            for handler, func in routes:
+                if func is None or func(call):
+                    return handler
+        return None
+
+    def __len__(self):
+        return sum(len(i) for i in self.__exact.values()) + sum(len(i) for i in self.__prefixes.values())
+
+
+if __name__ == "__main__":
+    # Сравнение поиска хэндлера маршрутизатором с перебором функций-фильтров (как в telebot):
+    # python -m tg_bot.router [кол-во хэндлеров]
+    import timeit
+    import sys
+
+    from telebot.types import User
+
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    router = CallbackRouter()
+    predicates = []
+    for i in range(amount):
+        router.add(print, prefix=f"p{i}")
+        predicates.append((lambda c, i=i: c.data.startswith(f"p{i}:"), print))
+
+    def linear(call: CallbackQuery):
+        for func, handler in predicates:
+            if func(call):
+                return handler
+
+    for key in ("p0", f"p{amount - 1}"):
+        call = CallbackQuery(1, User(1, False, "u"), f"{key}:12:x", "ci", "{}")
+        for name, resolve in (("predicates", linear), ("router", router.resolve)):
+            number = 20000
+            result = timeit.timeit(lambda: resolve(call), number=number) / number * 1e6
+            print(f"{name:<10} {key:>5}: {result:.2f} us")
@@ -157,13 +157,13 @@ def init_templates_cp(cardinal: Cardinal, *args):
                              message_thread_id=c.message.message_thread_id)
         bot.answer_callback_query(c.id)
 
-    tg.cbq_handler(open_templates_list, lambda c: c.data.startswith(f"{CBT.TMPLT_LIST}:"))
-    tg.cbq_handler(open_templates_list_in_ans_mode, lambda c: c.data.startswith(f"{CBT.TMPLT_LIST_ANS_MODE}:"))
-    tg.cbq_handler(open_edit_template_cp, lambda c: c.data.startswith(f"{CBT.EDIT_TMPLT}:"))
-    tg.cbq_handler(act_add_template, lambda c: c.data.startswith(f"{CBT.ADD_TMPLT}:"))
+    tg.cbq_handler(open_templates_list, prefix=CBT.TMPLT_LIST)
+    tg.cbq_handler(open_templates_list_in_ans_mode, prefix=CBT.TMPLT_LIST_ANS_MODE)
+    tg.cbq_handler(open_edit_template_cp, prefix=CBT.EDIT_TMPLT)
+    tg.cbq_handler(act_add_template, prefix=CBT.ADD_TMPLT)
     tg.msg_handler(add_template, func=lambda m: tg.check_state(m.chat.id, m.from_user.id, CBT.ADD_TMPLT))
-    tg.cbq_handler(del_template, lambda c: c.data.startswith(f"{CBT.DEL_TMPLT}:"))
-    tg.cbq_handler(send_template, lambda c: c.data.startswith(f"{CBT.SEND_TMPLT}:"))
+    tg.cbq_handler(del_template, prefix=CBT.DEL_TMPLT)
+    tg.cbq_handler(send_template, prefix=CBT.SEND_TMPLT)
 
 
 BIND_TO_PRE_INIT = [init_templates_cp]
@@ -143,6 +143,35 @@ def save_answer_templates(templates: list[str]) -> None:
         f.write(json.dumps(templates))
 
 
+def load_notifications_queue() -> list[dict]:
+    """
+    Загружает очередь неотправленных Telegram уведомлений из кэша.
+
+    :return: список уведомлений (см. :meth:`tg_bot.notifications.Notification.to_dict`).
+    """
+    if not os.path.exists("storage/cache/notifications_queue.json"):
+        return []
+    try:
+        with open("storage/cache/notifications_queue.json", "r", encoding="utf-8") as f:
+            return json.loads(f.read())
+    except json.JSONDecodeError:
+        return []
+
+
+def save_notifications_queue(notifications: list[dict]) -> None:
+    """
+    Сохраняет очередь неотправленных Telegram уведомлений (через временный файл, чтобы при падении процесса
+    не остался наполовину записанный файл).
+
+    :param notifications: список уведомлений (см. :meth:`tg_bot.notifications.Notification.to_dict`).
+    """
+    if not os.path.exists("storage/cache/"):
+        os.makedirs("storage/cache")
+    with open("storage/cache/notifications_queue.json.tmp", "w", encoding="utf-8") as f:
+        f.write(json.dumps(notifications, ensure_ascii=False))
+    os.replace("storage/cache/notifications_queue.json.tmp", "storage/cache/notifications_queue.json")
+
+
 def escape(text: str) -> str:
     """
     Форматирует текст под HTML разметку.